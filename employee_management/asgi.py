@@ -12,5 +12,19 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "employee_management.settings")
+# Servers run the write-ahead-logging profile (see employee_management/database.py)
+os.environ.setdefault("DATABASE_PROFILE", "production")
+# Async views run their queries in a new thread per request, so connections
+# kept open for reuse would never be reused
+os.environ.setdefault("DATABASE_CONN_MAX_AGE", "0")
 
 application = get_asgi_application()
+
+# Compile templates, connect and fill the in-process caches (uniqueness
+# index, lookups, dashboard) before the first request needs them
+from django.conf import settings  # noqa: E402
+
+if settings.WARM_UP_ON_START:
+    from employees import warmup
+
+    warmup.warm_up()
@@ -0,0 +1,83 @@
+"""
+SQLite connection profiles.
+
+`sqlite_database()` builds a DATABASES entry for one of the PROFILES
+below. 'production' switches the file to write-ahead logging, so readers
+never wait for a writer, and relaxes fsyncs to checkpoints. It also
+gives every connection a larger page cache and memory-mapped reads, and
+keeps connections open between requests. 'development' has the same
+connection settings but leaves the journal mode alone: WAL is a property
+of the file, and switching to it rewrites the database header, so a
+checked-out db.sqlite3 is only converted where a server opts in.
+'default' leaves SQLite's own settings (rollback journal, full fsync, a
+connection per request) and is the baseline `manage.py loadtest`
+compares against.
+"""
+
+# PRAGMAs run on every new connection, per profile
+PROFILES = {
+    'default': {
+        'pragmas': [],
+        'conn_max_age': 0,
+    },
+    'production': {
+        'pragmas': [
+            'PRAGMA journal_mode = WAL',
+            # Durable at every checkpoint; a power loss can only drop the last transactions
+            'PRAGMA synchronous = NORMAL',
+            'PRAGMA busy_timeout = 20000',
+            'PRAGMA cache_size = -65536',  # 64 MiB
+            'PRAGMA mmap_size = 268435456',  # 256 MiB
+            'PRAGMA temp_store = MEMORY',
+        ],
+        'conn_max_age': 600,
+    },
+    'development': {
+        'pragmas': [
+            'PRAGMA busy_timeout = 20000',
+            'PRAGMA cache_size = -65536',
+            'PRAGMA mmap_size = 268435456',
+            'PRAGMA temp_store = MEMORY',
+        ],
+        'conn_max_age': 600,
+    },
+}
+
+# Seconds SQLite waits for a lock before raising "database is locked"
+LOCK_TIMEOUT = 20
+
+
+def sqlite_database(name, profile='production', read_only=False, test_mirror=None, conn_max_age=None, test_name=None):
+    """A DATABASES entry for the SQLite file `name` using the given profile"""
+    try:
+        config = PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown database profile '{profile}'; choose from {', '.join(PROFILES)}")
+
+    if conn_max_age is None:
+        conn_max_age = config['conn_max_age']
+    pragmas = list(config['pragmas'])
+    options = {'timeout': LOCK_TIMEOUT}
+    if read_only:
+        # The journal mode belongs to the file and is set by the writer
+        pragmas = [pragma for pragma in pragmas if 'journal_mode' not in pragma]
+        pragmas.append('PRAGMA query_only = ON')
+    else:
+        # Take the write lock when a transaction starts so concurrent writers
+        # (web requests, job worker threads) wait for it instead of failing
+        options['transaction_mode'] = 'IMMEDIATE'
+    if pragmas:
+        options['init_command'] = '; '.join(pragmas)
+
+    database = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'OPTIONS': options,
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': conn_max_age > 0,
+    }
+    if test_mirror:
+        database['TEST'] = {'MIRROR': test_mirror}
+    elif test_name:
+        database['TEST'] = {'NAME': test_name}
+    return database
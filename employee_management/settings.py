@@ -5,6 +5,8 @@ Django settings for employee_management project.
 import os
 from pathlib import Path
 
+from .database import sqlite_database
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -29,10 +31,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Static and media files are answered before anything below runs
+    'employees.middleware.StaticMediaMiddleware',
+    'employees.middleware.PerformanceMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'employees.middleware.AuditActorMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -43,7 +49,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -51,18 +56,131 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Templates are compiled once per process (also with DEBUG on) and
+            # kept; employees/warmup.py compiles the app's at worker start
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'employee_management.wsgi.application'
 
-# Database
+# Database - see employee_management/database.py for the profiles. Read-only
+# views (records, dashboard, exports) read employee data through the
+# 'replica' connection; point READ_DATABASE_NAME at a snapshot copy kept
+# fresh by `manage.py refresh_read_snapshot` to move those reads off the
+# main file entirely. wsgi.py and asgi.py default to the 'production'
+# profile (WAL); management commands, the shell and tests use 'development',
+# which leaves the journal mode of the file as it is. On a server, set
+# DATABASE_PROFILE=production for the job worker as well.
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'development')
+READ_DATABASE_NAME = os.environ.get('READ_DATABASE_NAME', BASE_DIR / 'db.sqlite3')
+# Overrides the profile's persistent connection lifetime; asgi.py sets it to 0
+# because async views query from a fresh thread per request
+DATABASE_CONN_MAX_AGE = os.environ.get('DATABASE_CONN_MAX_AGE')
+if DATABASE_CONN_MAX_AGE is not None:
+    DATABASE_CONN_MAX_AGE = int(DATABASE_CONN_MAX_AGE)
+
 DATABASES = {
+    # Tests run against a file rather than :memory: so concurrent connections
+    # lock each other as they do in production
+    'default': sqlite_database(
+        BASE_DIR / 'db.sqlite3', DATABASE_PROFILE, conn_max_age=DATABASE_CONN_MAX_AGE,
+        test_name=BASE_DIR / 'test_db.sqlite3',
+    ),
+    'replica': sqlite_database(
+        READ_DATABASE_NAME, DATABASE_PROFILE, read_only=True, test_mirror='default',
+        conn_max_age=DATABASE_CONN_MAX_AGE,
+    ),
+}
+DATABASE_ROUTERS = ['employees.routers.ReadReplicaRouter']
+
+# Rendered employee rows and detail pages (employees/fragments.py). 'locmem'
+# keeps them per process; 'file' shares them between worker processes, so
+# an edit made in one process invalidates the page every process serves.
+EMPLOYEE_CACHE = os.environ.get('EMPLOYEE_CACHE', 'locmem')
+EMPLOYEE_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'employees',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'employees',
+    },
+}
+
+# Caches - the dashboard alias holds computed statistics per filter combination
+# and last employee change, so it needs no cross-process invalidation
+# (LocMemCache evicts least recently used entries once MAX_ENTRIES is reached;
+# FileBasedCache culls a CULL_FREQUENCY fraction of its files)
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dashboard': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dashboard',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 256,
+        },
+    },
+    'employees': {
+        **EMPLOYEE_CACHE_BACKENDS[EMPLOYEE_CACHE],
+        'TIMEOUT': 3600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 20_000,
+            'CULL_FREQUENCY': 4,
+        },
+    },
+}
+
+# Columnar copy of the employee table for analytics (employees/columnar.py),
+# kept current by `manage.py refresh_columnar_snapshot` run from cron. The
+# dashboard counts from it while its watermark is at most
+# DASHBOARD_SNAPSHOT_MAX_AGE seconds old and no employee has changed since,
+# and from the rollup table otherwise.
+COLUMNAR_SNAPSHOT_PATH = os.environ.get('COLUMNAR_SNAPSHOT_PATH', BASE_DIR / 'snapshots' / 'employees.columns')
+DASHBOARD_SNAPSHOT_MAX_AGE = 15 * 60
+
+# Request performance metrics, served to superusers at /metrics/ in the
+# Prometheus text format. Requests slower than SLOW_REQUEST_SECONDS are
+# logged to the file named by the SLOW_REQUEST_LOG environment variable.
+PERFORMANCE_METRICS = True
+SLOW_REQUEST_SECONDS = 1.0
+SLOW_REQUEST_LOG = os.environ.get('SLOW_REQUEST_LOG')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'timestamped': {
+            'format': '{asctime} {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'slow_requests': {
+            'class': 'logging.FileHandler',
+            'filename': SLOW_REQUEST_LOG,
+            'formatter': 'timestamped',
+        } if SLOW_REQUEST_LOG else {
+            'class': 'logging.NullHandler',
+        },
+    },
+    'loggers': {
+        'employees.performance': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
 }
 
 # Password validation
@@ -94,19 +212,43 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic writes content-hashed copies with gzip/brotli variants and a
+# manifest that {% static %} reads when DEBUG is off, so deploys must run
+# `manage.py collectstatic`. Until it has run (a fresh checkout, tests) pages
+# link and serve the plain source files, without long-lived caching.
+# StaticMediaMiddleware serves the hashed names with a one-year
+# immutable Cache-Control, and everything else for STATIC_MAX_AGE/MEDIA_MAX_AGE
+# seconds (see employees/assets.py).
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'employees.assets.CompressedManifestStaticFilesStorage',
+    },
+}
+STATIC_MAX_AGE = 60 * 60
+
 # Media files (Uploaded files like profile pictures)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Media directories served to anyone; job results under exports/ are only
+# handed out by the job download view
+PUBLIC_MEDIA_DIRS = ['profile_pictures']
+MEDIA_MAX_AGE = 60 * 60 * 24
+
+# Monthly files of archived change history (manage.py archive_audit_log)
+AUDIT_ARCHIVE_DIR = BASE_DIR / 'audit_archive'
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# WARM_UP_ON_START=1 makes wsgi.py and asgi.py prepare a new worker for its
+# first request (see employees/warmup.py, which also covers servers that
+# fork workers after importing the application)
+WARM_UP_ON_START = os.environ.get('WARM_UP_ON_START', '0') == '1'
+
 # Authentication URLs
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'view_records'
 LOGOUT_REDIRECT_URL = 'employee_form'
-
-# Create directories if they don't exist
-os.makedirs(BASE_DIR / 'templates', exist_ok=True)
-os.makedirs(BASE_DIR / 'static', exist_ok=True)
-os.makedirs(BASE_DIR / 'media', exist_ok=True)  # Add this for media files
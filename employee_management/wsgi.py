@@ -12,5 +12,16 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "employee_management.settings")
+# Servers run the write-ahead-logging profile (see employee_management/database.py)
+os.environ.setdefault("DATABASE_PROFILE", "production")
 
 application = get_wsgi_application()
+
+# Compile templates, connect and fill the in-process caches (uniqueness
+# index, lookups, dashboard) before the first request needs them
+from django.conf import settings  # noqa: E402
+
+if settings.WARM_UP_ON_START:
+    from employees import warmup
+
+    warmup.warm_up()
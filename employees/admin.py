@@ -1,5 +1,15 @@
-from django.contrib import admin
-from .models import Employee
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
+from django.template.response import TemplateResponse
+from . import bulk
+from .models import ApiToken, Employee
+from .search import filter_search
+
+class EmployeeChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        # Read only the columns the changelist shows
+        return super().get_queryset(request, exclude_parameters).for_changelist()
+
 
 @admin.register(Employee)
 class EmployeeAdmin(admin.ModelAdmin):
@@ -21,7 +31,7 @@ class EmployeeAdmin(admin.ModelAdmin):
         'first_name', 
         'surname', 
         'email', 
-        'department'
+        'department__name'
     ]
     
     # Filters for the right sidebar
@@ -35,6 +45,9 @@ class EmployeeAdmin(admin.ModelAdmin):
     
     # Fields that are read-only (can't be edited)
     readonly_fields = ['created_at', 'updated_at']
+
+    # There are thousands of LGAs and wards, too many for a dropdown
+    raw_id_fields = ['lga', 'ward']
     
     # Fieldsets for organizing the detail form
     fieldsets = [
@@ -75,4 +88,63 @@ class EmployeeAdmin(admin.ModelAdmin):
     ]
     
     # Ordering of records in admin
-    ordering = ['-created_at']
\ No newline at end of file
+    ordering = ['-created_at']
+
+    # Set-based bulk operations (see employees/bulk.py)
+    actions = ['delete_selected_employees', 'edit_selected_employees']
+
+    def get_changelist(self, request, **kwargs):
+        return EmployeeChangeList
+
+    def get_actions(self, request):
+        # The built-in delete action loads every selected object; ours deletes in chunks
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    @admin.action(permissions=['delete'], description='Delete selected employees')
+    def delete_selected_employees(self, request, queryset):
+        deleted = bulk.delete_employees(queryset)
+        self.message_user(request, f"Deleted {deleted} employees.", messages.SUCCESS)
+
+    @admin.action(permissions=['change'], description='Reassign department, role or location')
+    def edit_selected_employees(self, request, queryset):
+        values = {field: request.POST.get(field, '') for field in bulk.BULK_EDIT_FIELDS}
+        if 'apply' in request.POST:
+            try:
+                changes = bulk.clean_changes(values)
+            except ValueError as e:
+                self.message_user(request, str(e), messages.ERROR)
+            else:
+                updated = bulk.update_employees(queryset, changes)
+                self.message_user(request, f"Updated {updated} employees.", messages.SUCCESS)
+                return None
+
+        # Intermediate page asking for the new values
+        return TemplateResponse(request, 'admin/employees/employee/bulk_edit.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Reassign employees',
+            'opts': self.model._meta,
+            'queryset': queryset,
+            'count': queryset.count(),
+            'values': values,
+            'action_checkbox_name': admin.helpers.ACTION_CHECKBOX_NAME,
+            'select_across': request.POST.get('select_across', '0'),
+        })
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of icontains scans over search_fields
+        if not search_term.strip():
+            return queryset, False
+        return filter_search(queryset, search_term), False
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    # Tokens are issued by manage.py create_api_token; deleting one revokes it
+    list_display = ['name', 'user', 'created_at', 'last_used_at']
+    readonly_fields = ['user', 'name', 'created_at', 'last_used_at']
+    exclude = ['digest']
+
+    def has_add_permission(self, request):
+        return False
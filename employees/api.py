@@ -0,0 +1,241 @@
+"""
+JSON representation of employees for the /api/employees/ endpoints.
+
+Rows are read with values() and serialized as plain dicts, never as model
+instances. Lists are keyset paginated: by id, or with `updated_since` by
+(updated_at, id) so an incremental sync can follow the `next` links and
+keep the returned `watermark` as the `updated_since` of its next run (a
+first full sync can start from any early date).
+
+Every response carries an ETag computed from the ids and `updated_at` of
+the rows it holds, and a Last-Modified (for a list page, the last change
+to any employee, see exports.last_change), so polling clients get 304s. A list page's validators
+are checked before its rows are read.
+
+Machine clients authenticate with an API token instead of a session.
+"""
+import hashlib
+import secrets
+from datetime import date, datetime, time, timedelta
+
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import lookups
+from .filters import search_employees
+from .imports import IMPORT_FIELDS, clean_row
+from .locations import LocationError, get_index as get_locations
+from .models import ApiToken, Employee
+
+# Every field a client can read, in output order
+API_FIELDS = [
+    'id', 'employee_id', 'first_name', 'surname', 'other_name', 'email', 'contact_number',
+    'date_of_birth', 'gender', 'address', 'state', 'lga', 'ward', 'department', 'role',
+    'profile_picture', 'created_at', 'updated_at',
+]
+
+# Fields a client can write; pictures are uploaded through the employee form
+WRITABLE_FIELDS = IMPORT_FIELDS
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Seconds between writes of a token's last use
+TOKEN_TOUCH_INTERVAL = 60
+
+
+def parse_fields(value):
+    """The fields asked for with `fields=a,b,c` (all by default); id is always included"""
+    if not value:
+        return API_FIELDS
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in API_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}.")
+    return ['id', *dict.fromkeys(field for field in fields if field != 'id')]
+
+
+def parse_limit(value):
+    if not value:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid limit '{value}'.")
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def parse_updated_since(value):
+    """An ISO 8601 datetime (or date) as an aware datetime, or None"""
+    if not value:
+        return None
+    try:
+        moment = parse_datetime(value)
+        if moment is None and (day := parse_date(value)) is not None:
+            moment = datetime.combine(day, time.min)
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValueError(f"Invalid updated_since '{value}' (expected an ISO 8601 date or datetime).")
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def _json_value(field, value):
+    if field == 'profile_picture':
+        return default_storage.url(value) if value else None
+    if isinstance(value, (date, datetime)):
+        # Full precision, so a watermark read back from a row matches it exactly
+        return value.isoformat()
+    return value
+
+
+def _path(field):
+    """The values() path of an API field; lookups are read as their names"""
+    return f'{field}__name' if field in lookups.LOOKUP_MODELS else field
+
+
+def serialize(row, fields):
+    return {field: _json_value(field, row[_path(field)]) for field in fields}
+
+
+def _etag(*parts):
+    return '"%s"' % hashlib.blake2b('|'.join(map(str, parts)).encode(), digest_size=16).hexdigest()
+
+
+class Page:
+    """One keyset page of the employee list"""
+
+    def __init__(self, keys, has_next, fields, updated_since):
+        self.keys = keys
+        self.has_next = has_next
+        self.fields = fields
+        self.updated_since = updated_since
+
+    @property
+    def etag(self):
+        return _etag(','.join(self.fields), self.updated_since, *(f'{pk}@{updated_at}' for pk, updated_at in self.keys))
+
+    @property
+    def watermark(self):
+        """`updated_since` for the next incremental sync (id ordered pages have none)"""
+        if self.updated_since is None:
+            return None
+        return self.keys[-1][1] if self.keys else self.updated_since
+
+    def next_params(self):
+        """Query parameters of the following page, or None on the last one"""
+        if not self.has_next:
+            return None
+        pk, updated_at = self.keys[-1]
+        if self.updated_since is not None:
+            return {'updated_since': updated_at.isoformat(), 'after': pk}
+        return {'after': pk}
+
+    def rows(self):
+        """The page's rows, serialized in page order"""
+        ids = [pk for pk, _ in self.keys]
+        rows = {row['id']: row for row in Employee.objects.filter(id__in=ids).order_by().values(*map(_path, self.fields))}
+        # A row deleted since the keys were read is left out
+        return [serialize(rows[pk], self.fields) for pk in ids if pk in rows]
+
+
+def employee_queryset(params):
+    """Employees matching the list filters (q, gender, department, role)"""
+    return search_employees(Employee.objects.all(), params)
+
+
+def page(queryset, fields, after=None, limit=DEFAULT_LIMIT, updated_since=None):
+    """
+    Read the keys (id, updated_at) of one page. Rows are fetched separately
+    with Page.rows() once the client's ETag turned out to be stale.
+    """
+    try:
+        after = int(after) if after else None
+    except ValueError:
+        raise ValueError(f"Invalid cursor '{after}'.")
+
+    if updated_since is None:
+        if after is not None:
+            queryset = queryset.filter(id__gt=after)
+        queryset = queryset.order_by('id')
+    else:
+        queryset = queryset.filter(
+            Q(updated_at__gt=updated_since) | Q(updated_at=updated_since, id__gt=after or 0)
+        ).order_by('updated_at', 'id')
+
+    keys = list(queryset.values_list('id', 'updated_at')[:limit + 1])
+    return Page(keys[:limit], len(keys) > limit, fields, updated_since)
+
+
+def get_row(employee_id, fields):
+    """One serialized employee with its (etag, updated_at), or None"""
+    row = Employee.objects.filter(id=employee_id).values(*dict.fromkeys([*map(_path, fields), 'updated_at'])).first()
+    if row is None:
+        return None
+    return serialize(row, fields), row_etag(employee_id, row['updated_at'], fields), row['updated_at']
+
+
+def row_etag(employee_id, updated_at, fields=API_FIELDS):
+    return _etag(','.join(fields), f'{employee_id}@{updated_at}')
+
+
+def clean_payload(payload, current=None):
+    """
+    Validate a create (or, with the `current` values, a partial update)
+    body; return (field values, list of error messages).
+    """
+    if not isinstance(payload, dict):
+        return {}, ["Expected a JSON object."]
+    unknown = sorted(set(payload) - set(WRITABLE_FIELDS))
+    if unknown:
+        return {}, [f"Fields that cannot be written: {', '.join(unknown)}."]
+
+    data, errors = clean_row({**(current or {}), **payload})
+    if not errors:
+        try:
+            data['state'], data['lga'], data['ward'] = get_locations().clean(data['state'], data['lga'], data['ward'])
+        except LocationError as e:
+            errors.append(str(e))
+    return data, errors
+
+
+def model_values(data):
+    """Cleaned values as Employee attributes, with lookup names replaced by their ids"""
+    values = {field: value for field, value in data.items() if field not in lookups.LOOKUP_MODELS}
+    values.update(lookups.lookup_ids(data, create=True))
+    return values
+
+
+def current_values(employee):
+    """The writable fields of an employee, as a client would send them"""
+    values = {}
+    for field in WRITABLE_FIELDS:
+        if field in lookups.LOOKUP_MODELS:
+            values[field] = lookups.name(field, getattr(employee, f'{field}_id')) or ''
+        else:
+            values[field] = getattr(employee, field)
+    return values
+
+
+def _digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def create_token(user, name):
+    """Issue an API token for `user`; return the key, which is not stored"""
+    key = secrets.token_urlsafe(32)
+    ApiToken.objects.create(user=user, name=name, digest=_digest(key))
+    return key
+
+
+def token_user(key):
+    """The active user an API token key belongs to, or None"""
+    token = ApiToken.objects.select_related('user').filter(digest=_digest(key)).first()
+    if token is None or not token.user.is_active:
+        return None
+    now = timezone.now()
+    if token.last_used_at is None or now - token.last_used_at > timedelta(seconds=TOKEN_TOUCH_INTERVAL):
+        ApiToken.objects.filter(pk=token.pk).update(last_used_at=now)
+    return token.user
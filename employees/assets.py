@@ -0,0 +1,195 @@
+"""
+Static and media file delivery.
+
+`collectstatic` stores every static file under a content-hashed name
+(css/records.3f2a9c1b7d4e.css) through CompressedManifestStaticFilesStorage,
+and writes gzip and, if the brotli package is installed, brotli copies of
+the text files next to them. employees.middleware.StaticMediaMiddleware
+serves STATIC_ROOT and the public MEDIA_ROOT directories with serve_file().
+Hashed names never change content, so browsers may keep them for a year
+without asking again. Other files carry validators for cheap revalidation,
+and byte ranges are honoured for resumable downloads and media seeking.
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Files worth compressing: smaller ones gain less than their headers cost
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.json', '.map', '.svg', '.txt', '.html', '.xml'}
+COMPRESS_MIN_SIZE = 512
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def compress_file(path):
+    """Write .gz (and .br) copies of a text file that shrink it; return the paths written"""
+    if os.path.splitext(path)[1] not in COMPRESSIBLE_EXTENSIONS or os.path.getsize(path) < COMPRESS_MIN_SIZE:
+        return []
+    with open(path, 'rb') as file:
+        data = file.read()
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, mode=brotli.MODE_TEXT)
+
+    written = []
+    for suffix, compressed in variants.items():
+        # A copy that is not smaller is useless
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as file:
+                file.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Content-hashed static files, each text file with precompressed copies"""
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # No manifest entry or collected file yet (a fresh checkout, the test
+            # runner): link the plain name rather than failing the page
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for hashed_name in set(self.hashed_files.values()):
+            compress_file(self.path(hashed_name))
+
+
+def immutable_names(storage):
+    """Names the static files storage wrote under a content hash (none without a manifest)"""
+    return set(getattr(storage, 'hashed_files', {}).values())
+
+
+def _byte_range(header, size):
+    """(start, length) of a single-range Range header, None to send the whole file, or 'unsatisfiable'"""
+    match = _RANGE.match(header.strip())
+    if match is None:
+        # Several ranges or another unit: answering with the whole file is allowed
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # The last N bytes
+        length = min(int(last), size)
+        return (size - length, length) if length else 'unsatisfiable'
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return 'unsatisfiable'
+    return start, end - start + 1
+
+
+class _RangeReader:
+    """Reads `length` bytes of an open file from `start`, for FileResponse"""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _accepted_encoding(request, path):
+    """The preferred Content-Encoding the client accepts and that has a precompressed copy"""
+    accepted = {
+        value.split(';')[0].strip().lower()
+        for value in request.headers.get('Accept-Encoding', '').split(',')
+        if not value.strip().endswith(';q=0')
+    }
+    for encoding, suffix in ENCODINGS.items():
+        if encoding in accepted and os.path.isfile(path + suffix):
+            return encoding, path + suffix
+    return None, path
+
+
+def serve_file(request, path, immutable=False, max_age=0):
+    """
+    Response for a GET or HEAD of the file at `path`, or None if there is no
+    such file. `immutable` files are cached by browsers for a year; others
+    for `max_age` seconds, then revalidated with the ETag.
+    """
+    try:
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    if not os.path.isfile(path):
+        return None
+
+    content_type, original_encoding = mimetypes.guess_type(path)
+    content_type = content_type or 'application/octet-stream'
+    compressible = os.path.splitext(path)[1] in COMPRESSIBLE_EXTENSIONS
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+    range_header = request.headers.get('Range')
+    # If-Range: only send the range if the file is still the one the client has part of
+    if range_header and request.headers.get('If-Range', etag) != etag:
+        range_header = None
+    # Ranges count bytes of the file itself, so they are served uncompressed
+    encoding, served_path = (None, path) if range_header or not compressible else _accepted_encoding(request, path)
+    if encoding:
+        etag = f'{etag[:-1]}-{encoding}"'
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        size = os.path.getsize(served_path)
+        byte_range = _byte_range(range_header, size) if range_header else None
+        if byte_range == 'unsatisfiable':
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        file = open(served_path, 'rb')
+        if byte_range is None:
+            response = FileResponse(file, content_type=content_type)
+            response['Content-Length'] = size
+        else:
+            start, length = byte_range
+            response = FileResponse(_RangeReader(file, start, length), content_type=content_type, status=206)
+            response['Content-Range'] = f'bytes {start}-{start + length - 1}/{size}'
+            response['Content-Length'] = length
+        if encoding:
+            response['Content-Encoding'] = encoding
+        elif original_encoding:
+            # e.g. a .gz download: the body is the file as stored
+            response['Content-Type'] = 'application/octet-stream'
+        response['Accept-Ranges'] = 'bytes'
+        response['Last-Modified'] = http_date(stat.st_mtime)
+
+    response['ETag'] = etag
+    response['Cache-Control'] = (
+        f'public, max-age={IMMUTABLE_MAX_AGE}, immutable' if immutable else f'public, max-age={max_age}'
+    )
+    if compressible:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    return response
@@ -0,0 +1,201 @@
+"""
+Field-level change history of employees.
+
+Every edit and delete is written as an append-only AuditEvent holding a
+compact JSON diff, plus one small AuditEntry row per employee touched so
+"history of employee X" is an index lookup. Single saves and deletes are
+recorded by signals; bulk operations record one event per chunk, written
+with a couple of INSERT statements however many rows the chunk holds.
+
+The acting user comes from `acting_as()`, set per request by
+AuditActorMiddleware and per job by the job worker.
+
+SQLite has no table partitioning; instead `archive_before()` (the
+archive_audit_log command) moves old events out to one gzipped JSON lines
+file per month, keeping the live tables small.
+"""
+import gzip
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime
+from pathlib import Path
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.db.models.fields.files import FieldFile
+
+from . import lookups
+from .models import AuditEntry, AuditEvent, Employee
+
+# Columns whose changes are recorded; updated_at changes with every save anyway
+AUDITED_FIELDS = [field.name for field in Employee._meta.concrete_fields if field.name not in ('id', 'updated_at')]
+
+# The same columns as values() keys ('department_id' for the lookup foreign keys)
+AUDITED_COLUMNS = [Employee._meta.get_field(name).attname for name in AUDITED_FIELDS]
+
+# Lookup foreign key columns; the log records their names, not ids
+_LOOKUP_COLUMNS = {f'{field}_id': field for field in lookups.LOOKUP_MODELS}
+
+# Events moved to the archive per transaction
+ARCHIVE_BATCH = 500
+
+
+class _Actor:
+    # asgiref compares context values when switching threads; a box with
+    # identity equality keeps that from loading a lazy request.user inside
+    # the event loop
+    __slots__ = ('user',)
+
+    def __init__(self, user):
+        self.user = user
+
+
+_actor = ContextVar('audit_actor', default=_Actor(None))
+
+
+@contextmanager
+def acting_as(user):
+    """Attribute changes made inside the block to `user`"""
+    token = _actor.set(_Actor(user))
+    try:
+        yield
+    finally:
+        _actor.reset(token)
+
+
+def _actor_id():
+    user = _actor.get().user
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return None
+    return user.pk
+
+
+def _plain(value):
+    """A JSON friendly form of a model field value"""
+    if isinstance(value, FieldFile):
+        return value.name or None
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _recorded(column, value):
+    """(field name, value as logged) of a values() column"""
+    field = _LOOKUP_COLUMNS.get(column)
+    if field is None:
+        return column, _plain(value)
+    return field, lookups.name(field, value)
+
+
+def _field_value(instance, name):
+    field = Employee._meta.get_field(name)
+    if field.is_relation:
+        return lookups.name(name, getattr(instance, field.attname))
+    # Views assign raw form strings (e.g. dates); compare them as the database will store them
+    return _plain(field.to_python(field.value_from_object(instance)))
+
+
+def diff(previous, instance):
+    """{field: (old, new)} of the audited fields that differ between two versions of an employee"""
+    changes = {}
+    for name in AUDITED_FIELDS:
+        old, new = _field_value(previous, name), _field_value(instance, name)
+        if old != new:
+            changes[name] = (old, new)
+    return changes
+
+
+def _write(action, changes, employee_pks, using):
+    event = AuditEvent.objects.using(using).create(
+        action=action, actor_id=_actor_id(), employee_count=len(employee_pks), changes=changes,
+    )
+    AuditEntry.objects.using(using).bulk_create(
+        [AuditEntry(event=event, employee_pk=pk) for pk in employee_pks]
+    )
+    return event
+
+
+def record_update(employee_pk, changes, using='default'):
+    """Record one employee's {field: (old, new)} changes"""
+    return _write('update', {
+        'set': {field: new for field, (old, new) in changes.items()},
+        'old': {str(employee_pk): {field: old for field, (old, new) in changes.items()}},
+    }, [employee_pk], using)
+
+
+def record_bulk_update(rows, new_values, using='default'):
+    """
+    Record one chunk of a bulk edit: `rows` are the employees' values()
+    before the update (with 'id'), `new_values` what every one was set to,
+    both keyed by column.
+    Employees that already had the new values are left out.
+    """
+    old = {}
+    for row in rows:
+        changed = dict(
+            _recorded(column, row[column]) for column, value in new_values.items()
+            if _plain(row[column]) != _plain(value)
+        )
+        if changed:
+            old[str(row['id'])] = changed
+    if old:
+        new_values = dict(_recorded(column, value) for column, value in new_values.items())
+        return _write('update', {'set': new_values, 'old': old}, [int(pk) for pk in old], using)
+
+
+def record_deletes(rows, using='default'):
+    """Record deleted employees from their values() (with 'id' and every AUDITED_COLUMNS key)"""
+    if rows:
+        return _write('delete', {
+            'old': {str(row['id']): dict(_recorded(column, row[column]) for column in AUDITED_COLUMNS) for row in rows},
+        }, [row['id'] for row in rows], using)
+
+
+def record_delete(instance, using='default'):
+    """Record a single deleted employee"""
+    return _write('delete', {
+        'old': {str(instance.pk): {name: _field_value(instance, name) for name in AUDITED_FIELDS}},
+    }, [instance.pk], using)
+
+
+def history(employee_pk, limit=100, using='default'):
+    """The newest audit events that touched an employee"""
+    return AuditEvent.objects.using(using).filter(entries__employee_pk=employee_pk) \
+        .select_related('actor').order_by('-id')[:limit]
+
+
+def recent_events(since, limit=200, using='default'):
+    """Audit events recorded since a datetime, newest first"""
+    return AuditEvent.objects.using(using).filter(at__gte=since).select_related('actor').order_by('-id')[:limit]
+
+
+def archive_before(cutoff, directory, using='default'):
+    """
+    Move the events recorded before `cutoff` to `<directory>/<YYYY-MM>.jsonl.gz`,
+    appending to existing months. Returns {month: events archived}.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    connection = connections[using]
+    events = AuditEvent.objects.using(using).filter(at__lt=cutoff).order_by('id') \
+        .values('id', 'at', 'action', 'actor_id', 'employee_count', 'changes')
+    archived = defaultdict(int)
+
+    while batch := list(events[:ARCHIVE_BATCH]):
+        by_month = defaultdict(list)
+        for event in batch:
+            by_month[f"{event['at']:%Y-%m}"].append(event)
+        with transaction.atomic(using=using):
+            # Written before the rows go; a failed delete leaves duplicates, never gaps
+            for month, rows in by_month.items():
+                with gzip.open(directory / f'{month}.jsonl.gz', 'at', encoding='utf-8') as file:
+                    file.writelines(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows)
+                archived[month] += len(rows)
+            ids = [event['id'] for event in batch]
+            placeholders = ', '.join(['%s'] * len(ids))
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {AuditEntry._meta.db_table} WHERE event_id IN ({placeholders})", ids)
+                cursor.execute(f"DELETE FROM {AuditEvent._meta.db_table} WHERE id IN ({placeholders})", ids)
+    return dict(archived)
@@ -0,0 +1,578 @@
+"""
+Benchmark harness for the employee views.
+
+`generate_employees` inserts synthetic but realistic employees (real
+state/LGA/ward combinations, hire dates spread over several years) and
+`run_scenarios` times the main views through the Django test client,
+recording latency percentiles, query counts and peak memory. `run_load`
+drives concurrent mixed traffic to compare database profiles, and
+`run_concurrency` compares one ASGI worker with one synchronous worker
+under many concurrent sessions. They are driven by `manage.py benchmark`,
+`manage.py loadtest` and `manage.py concurrencytest`, which run
+everything against a scratch database.
+"""
+import asyncio
+import math
+import multiprocessing
+import platform
+import random
+import sqlite3
+import statistics
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from datetime import date, datetime, timedelta
+from datetime import time as clock_time
+from time import perf_counter
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.cache import caches
+from django.db import connections
+from django.test import Client
+from django.utils import timezone
+
+from . import imports, lookups, stats
+from .locations import get_index
+from .metrics import QueryRecorder
+from .models import Employee
+
+GENERATE_BATCH_SIZE = 5000
+
+# Hire dates are spread uniformly over this many days before today
+HIRE_DAYS = 5 * 365
+
+FIRST_NAMES = [
+    'Adaeze', 'Adebayo', 'Aisha', 'Amaka', 'Babajide', 'Bola', 'Chidi', 'Chinedu', 'Chioma', 'Damilola',
+    'Emeka', 'Fatima', 'Folake', 'Funmilayo', 'Ibrahim', 'Ifeoma', 'Ikechukwu', 'Kemi', 'Kunle', 'Musa',
+    'Ngozi', 'Nkechi', 'Obinna', 'Olumide', 'Oluwaseun', 'Sadiq', 'Segun', 'Tolu', 'Uche', 'Yetunde',
+    'Yusuf', 'Zainab',
+]
+
+SURNAMES = [
+    'Abubakar', 'Adeleke', 'Adeyemi', 'Afolabi', 'Akande', 'Balogun', 'Bello', 'Chukwu', 'Danjuma', 'Eze',
+    'Ibekwe', 'Idowu', 'Lawal', 'Mohammed', 'Nwachukwu', 'Nwosu', 'Obi', 'Odukoya', 'Ogunleye', 'Okafor',
+    'Okeke', 'Okonkwo', 'Okoro', 'Olawale', 'Onyekachi', 'Salami', 'Suleiman', 'Usman', 'Uzor', 'Yakubu',
+]
+
+# The options offered by the employee form
+DEPARTMENTS = [
+    'HR', 'Finance', 'IT', 'Sales', 'Marketing', 'Operations', 'Customer Service', 'Administration',
+    'Research and Development', 'Legal', 'Procurement', 'Logistics', 'Public Relations', 'Quality Assurance',
+    'Training and Development', 'Health and Safety', 'Facilities Management', 'Executive Management',
+    'Data Analysis', 'Content Creation', 'Social Media', 'Research', 'Consulting', 'Data Science',
+    'Internship', 'Support', 'Development', 'Management', 'Engineering', 'Accounting', 'Audit',
+    'Customer Relations', 'Technical Support', 'Project Management', 'Business Analysis', 'Service Delivery',
+    'Supply Chain', 'Coordination', 'Other',
+]
+
+ROLES = [
+    'Admin', 'Software Engineer', 'Accountant', 'HR Manager', 'Sales Executive', 'Marketing Specialist',
+    'Customer Support', 'IT Support', 'Operations Manager', 'Cyber Security', 'Project Manager',
+    'Business Analyst', 'Customer Service', 'Procurement Officer', 'Logistics Coordinator',
+    'Public Relations Officer', 'Quality Assurance', 'Training Coordinator', 'Health and Safety Officer',
+    'Facilities Manager', 'Executive Assistant', 'Data Analyst', 'Content Writer', 'Social Media Manager',
+    'Researcher', 'Consultant', 'Data Specialist', 'Cleaner', 'Intern', 'Other',
+]
+
+GENDERS = [choice for choice, _ in Employee.GENDER_CHOICES]
+
+
+def _location_triples():
+    index = get_index()
+    return [
+        (state, lga, ward)
+        for state in index.states()
+        for lga in index.lgas(state)
+        for ward in index.wards(state, lga)
+    ]
+
+
+def employee_rows(count, start=0, seed=0):
+    """Yield `count` synthetic employee rows numbered from `start`; the same seed gives the same rows"""
+    rng = random.Random(f"{seed}:{start}")
+    locations = _location_triples()
+    today = timezone.localdate()
+    tz = timezone.get_current_timezone()
+
+    for number in range(start, start + count):
+        first_name = rng.choice(FIRST_NAMES)
+        surname = rng.choice(SURNAMES)
+        state, lga, ward = rng.choice(locations)
+        hire_day = today - timedelta(days=rng.randrange(HIRE_DAYS))
+        yield {
+            'first_name': first_name,
+            'surname': surname,
+            'other_name': rng.choice(FIRST_NAMES) if rng.random() < 0.4 else None,
+            'employee_id': f"BENCH-{number:07d}",
+            'email': f"{first_name}.{surname}.{number}@example.com".lower(),
+            'contact_number': f"080{rng.randrange(10 ** 8):08d}",
+            'date_of_birth': date(1960, 1, 1) + timedelta(days=rng.randrange(40 * 365)),
+            'address': f"{rng.randrange(1, 200)} {rng.choice(SURNAMES)} Street, {lga}",
+            'gender': rng.choice(GENDERS),
+            'state': state,
+            'lga': lga,
+            'ward': ward,
+            'department': rng.choice(DEPARTMENTS),
+            'role': rng.choice(ROLES),
+            'created_at': timezone.make_aware(
+                datetime.combine(hire_day, clock_time(rng.randrange(8, 18), rng.randrange(60))), tz
+            ),
+        }
+
+
+def generate_employees(count, start=0, seed=0, batch_size=GENERATE_BATCH_SIZE, using='default'):
+    """Insert `count` synthetic employees (with rollups and search index) and return the seconds taken"""
+    started = perf_counter()
+    batch = []
+    for row in employee_rows(count, start, seed):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            imports.insert_employees(batch, using=using)
+            batch = []
+    if batch:
+        imports.insert_employees(batch, using=using)
+    return perf_counter() - started
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _consume(response):
+    # Streamed responses do their work while being iterated
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+class Scenario:
+    """One timed request; `prepare(context)` runs untimed before every repetition"""
+
+    def __init__(self, name, method, url, data=None, prepare=None):
+        self.name = name
+        self.method = method
+        self.url = url
+        self.data = data
+        self.prepare = prepare
+
+    def request(self, client, context):
+        url = self.url(context) if callable(self.url) else self.url
+        data = self.data(context) if callable(self.data) else self.data
+        response = getattr(client, self.method)(url, data or {})
+        size = _consume(response)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{self.name}: {url} returned {response.status_code}")
+        return size
+
+
+def _clear_dashboard_cache(context):
+    caches[stats.DASHBOARD_CACHE].clear()
+
+
+def _deep_page(context):
+    last_page = max(1, math.ceil(context['total'] / 10))
+    return f"/records/?page={last_page}"
+
+
+def _deep_keyset_page(context):
+    after = Employee.objects.order_by('-id').values_list('id', flat=True)[10:11].first() or 0
+    return f"/records/?paging=keyset&after={after}"
+
+
+def _form_fields(row):
+    """Employee form POST data for a generated row"""
+    return {
+        'firstname': row['first_name'],
+        'surname': row['surname'],
+        'othername': row['other_name'] or '',
+        'employeeid': f"{row['employee_id']}-F",
+        'email': f"form.{row['email']}",
+        'contactnumber': row['contact_number'],
+        'dob': row['date_of_birth'].isoformat(),
+        'gender': row['gender'],
+        'address': row['address'],
+        'state': row['state'],
+        'lga': row['lga'],
+        'ward': row['ward'],
+        'department': row['department'],
+        'role': row['role'],
+    }
+
+
+def _form_post(context):
+    context['form_posts'] += 1
+    start = 10 ** 8 + context['total'] * 100 + context['form_posts']
+    return _form_fields(next(employee_rows(1, start=start, seed=context['seed'])))
+
+
+def _select_for_delete(context):
+    context['delete_ids'] = list(Employee.objects.order_by('id').values_list('id', flat=True)[:100])
+
+
+def _bulk_delete_post(context):
+    return {'employee_ids': context['delete_ids']}
+
+
+def default_scenarios():
+    last_month = (timezone.localdate() - timedelta(days=30)).isoformat()
+    return [
+        Scenario('records_first_page', 'get', '/records/'),
+        Scenario('records_deep_page', 'get', _deep_page),
+        Scenario('records_deep_page_keyset', 'get', _deep_keyset_page),
+        Scenario('records_search', 'get', '/records/?q=okafor&department=IT'),
+        Scenario('dashboard', 'get', '/dashboard/', prepare=_clear_dashboard_cache),
+        Scenario('dashboard_filtered', 'get', f'/dashboard/?department=Finance&date_from={last_month}',
+                 prepare=_clear_dashboard_cache),
+        Scenario('dashboard_cached', 'get', '/dashboard/'),
+        Scenario('export_csv', 'get', '/export/csv/'),
+        Scenario('employee_form_post', 'post', '/', data=_form_post),
+        Scenario('bulk_delete_100', 'post', '/bulk-delete/', data=_bulk_delete_post, prepare=_select_for_delete),
+    ]
+
+
+def run_scenario(scenario, client, context, repeat, using='default'):
+    """Time `repeat` requests, then one more under tracemalloc for peak memory"""
+    durations = []
+    queries = []
+    size = 0
+    for _ in range(repeat):
+        if scenario.prepare:
+            scenario.prepare(context)
+        recorder = QueryRecorder(perf_counter)
+        with ExitStack() as stack:
+            # Read-only views query the replica alias
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            started = perf_counter()
+            size = scenario.request(client, context)
+            durations.append(perf_counter() - started)
+        queries.append(recorder.count)
+
+    # Measured separately because tracing allocations slows everything down
+    if scenario.prepare:
+        scenario.prepare(context)
+    tracemalloc.start()
+    try:
+        scenario.request(client, context)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    durations.sort()
+    return {
+        'repeat': repeat,
+        'min': durations[0],
+        'mean': statistics.fmean(durations),
+        'p50': percentile(durations, 0.5),
+        'p95': percentile(durations, 0.95),
+        'p99': percentile(durations, 0.99),
+        'max': durations[-1],
+        'queries': max(queries),
+        'response_bytes': size,
+        'peak_memory_bytes': peak,
+    }
+
+
+def run_scenarios(client, repeat, scenarios=None, seed=0, using='default', log=None):
+    """Run every scenario against the current data set and return {name: result}"""
+    context = {
+        'total': Employee.objects.using(using).count(),
+        'seed': seed,
+        'form_posts': 0,
+    }
+    results = {}
+    for scenario in scenarios or default_scenarios():
+        results[scenario.name] = run_scenario(scenario, client, context, repeat, using)
+        if log:
+            log(scenario.name, results[scenario.name])
+    return results
+
+
+@contextmanager
+def scratch_database(name, keepdb=False):
+    """
+    Point 'default' (and the aliases that mirror it, like 'replica') at a
+    freshly migrated SQLite file for the duration of the block.
+    """
+    connection = connections['default']
+    connection.settings_dict.setdefault('TEST', {})['NAME'] = name
+    original_name = connection.settings_dict['NAME']
+    mirrors = {
+        alias: connections[alias].settings_dict['NAME']
+        for alias in connections
+        if connections[alias].settings_dict.get('TEST', {}).get('MIRROR') == 'default'
+    }
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb, serialize=False)
+    for alias in mirrors:
+        connections[alias].close()
+        connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+    # Lookup ids cached from the real database mean other rows here
+    lookups.clear()
+    try:
+        yield
+    finally:
+        lookups.clear()
+        for alias, mirror_name in mirrors.items():
+            connections[alias].close()
+            connections[alias].settings_dict['NAME'] = mirror_name
+        connection.creation.destroy_test_db(original_name, verbosity=0, keepdb=keepdb)
+
+
+def benchmark_client():
+    """A test client logged in as the benchmark superuser"""
+    user = User.objects.filter(username='benchmark').first() or User.objects.create_superuser(
+        'benchmark', 'benchmark@example.com', None
+    )
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def _load_worker(number, session_cookie, start_at, seconds, write_share, seed):
+    """One load-test client; runs in its own process and returns its counts and latencies"""
+    client = Client()
+    client.cookies[settings.SESSION_COOKIE_NAME] = session_cookie
+    rng = random.Random(f"{seed}:load:{number}")
+    rows = employee_rows(10 ** 6, start=20_000_000 + number * 10 ** 6, seed=seed)
+    counts = {'reads': 0, 'writes': 0, 'errors': 0, 'locked': 0}
+    durations = []
+
+    time.sleep(max(0, start_at - time.time()))
+    deadline = start_at + seconds
+    try:
+        while time.time() < deadline:
+            started = perf_counter()
+            try:
+                if rng.random() < write_share:
+                    counts['writes'] += 1
+                    response = client.post('/', _form_fields(next(rows)))
+                    # The form re-renders with an error message when the save fails
+                    ok = response.status_code == 302
+                    if not ok and b'locked' in response.content:
+                        counts['locked'] += 1
+                else:
+                    counts['reads'] += 1
+                    response = client.get(rng.choice(['/records/', '/records/?page=50', '/dashboard/']))
+                    _consume(response)
+                    ok = response.status_code == 200
+            except Exception as e:
+                ok = False
+                if 'locked' in str(e):
+                    counts['locked'] += 1
+            durations.append(perf_counter() - started)
+            if not ok:
+                counts['errors'] += 1
+    finally:
+        connections.close_all()
+    return counts, durations
+
+
+def run_load(workers, seconds, write_share=0.2, seed=0):
+    """
+    Drive mixed traffic from `workers` concurrent clients for `seconds`.
+
+    Each client runs in its own process, as web workers do, and loops over
+    records page and dashboard reads, with `write_share` of its requests
+    being employee form posts. Returns the throughput, error counts
+    (including "database is locked" failures) and latency percentiles.
+    """
+    session_cookie = benchmark_client().cookies[settings.SESSION_COOKIE_NAME].value
+    # Children must open their own connections
+    connections.close_all()
+    start_at = time.time() + 1
+
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [
+            pool.submit(_load_worker, number, session_cookie, start_at, seconds, write_share, seed)
+            for number in range(workers)
+        ]
+        outcomes = [future.result() for future in futures]
+
+    totals = Counter()
+    durations = []
+    for counts, worker_durations in outcomes:
+        totals.update(counts)
+        durations.extend(worker_durations)
+    durations.sort()
+    requests = totals['reads'] + totals['writes']
+    return {
+        'workers': workers,
+        'seconds': seconds,
+        'requests': requests,
+        'throughput': requests / seconds,
+        'reads': totals['reads'],
+        'writes': totals['writes'],
+        'errors': totals['errors'],
+        'locked': totals['locked'],
+        'p50': percentile(durations, 0.5),
+        'p95': percentile(durations, 0.95),
+        'p99': percentile(durations, 0.99),
+    }
+
+
+def _concurrency_paths(count, seed):
+    """Page reads of the concurrency benchmark, with detail pages of random employees"""
+    rng = random.Random(f"{seed}:concurrency")
+    ids = list(Employee.objects.order_by('?').values_list('id', flat=True)[:count])
+    paths = ['/records/', '/records/?page=50', '/records/?paging=keyset', '/records/?q=okafor', '/dashboard/']
+    return paths + [f'/employee/view/{employee_id}/' for employee_id in ids], rng
+
+
+async def _asgi_get(application, path, cookie):
+    """Serve one GET through an ASGI application the way a server would; returns (status, bytes)"""
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'root_path': '', 'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+    }
+    received = False
+    disconnected = asyncio.Event()
+    status = None
+    size = 0
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status, size
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        else:
+            size += len(message.get('body', b''))
+
+    await application(scope, receive, send)
+    disconnected.set()
+    return status, size
+
+
+def _load_results(sessions, exporters, seconds, durations, counts):
+    durations.sort()
+    return {
+        'sessions': sessions,
+        'exporters': exporters,
+        'seconds': seconds,
+        'requests': len(durations),
+        'throughput': len(durations) / seconds,
+        'exports': counts['exports'],
+        'errors': counts['errors'],
+        'p50': percentile(durations, 0.5),
+        'p95': percentile(durations, 0.95),
+        'p99': percentile(durations, 0.99),
+    }
+
+
+def run_concurrency(sessions, seconds, exporters=1, seed=0):
+    """
+    Serve `sessions` concurrent superuser sessions from one ASGI worker.
+
+    Every session loops over records, dashboard and detail page reads on a
+    single event loop, while `exporters` more sessions keep downloading the
+    full CSV export. Returns the page throughput and latency percentiles.
+    """
+    cookie = f"{settings.SESSION_COOKIE_NAME}={benchmark_client().cookies[settings.SESSION_COOKIE_NAME].value}"
+    paths, rng = _concurrency_paths(100, seed)
+    application = get_asgi_application()
+    durations = []
+    counts = Counter()
+
+    async def reader(deadline):
+        while time.monotonic() < deadline:
+            started = perf_counter()
+            status, _ = await _asgi_get(application, rng.choice(paths), cookie)
+            durations.append(perf_counter() - started)
+            if status != 200:
+                counts['errors'] += 1
+
+    async def exporter(deadline):
+        while time.monotonic() < deadline:
+            await _asgi_get(application, '/export/csv/', cookie)
+            counts['exports'] += 1
+
+    async def main():
+        deadline = time.monotonic() + seconds
+        await asyncio.gather(
+            *(reader(deadline) for _ in range(sessions)),
+            *(exporter(deadline) for _ in range(exporters)),
+        )
+
+    # As configured by asgi.py: each request queries from its own thread
+    max_ages = {alias: connections[alias].settings_dict['CONN_MAX_AGE'] for alias in connections}
+    for alias in connections:
+        connections[alias].settings_dict['CONN_MAX_AGE'] = 0
+    try:
+        asyncio.run(main())
+    finally:
+        for alias, max_age in max_ages.items():
+            connections[alias].settings_dict['CONN_MAX_AGE'] = max_age
+        connections.close_all()
+    return _load_results(sessions, exporters, seconds, durations, counts)
+
+
+def run_sync_worker(sessions, seconds, exporters=1, seed=0):
+    """
+    The run_concurrency() traffic served by one synchronous worker.
+
+    Each session is a thread, but a lock lets only one request run at a
+    time, as in a single WSGI worker process; the time spent waiting for
+    the worker counts towards each request's latency.
+    """
+    session_cookie = benchmark_client().cookies[settings.SESSION_COOKIE_NAME].value
+    paths, rng = _concurrency_paths(100, seed)
+    worker = threading.Lock()
+    durations = []
+    counts = Counter()
+    deadline = time.monotonic() + seconds
+
+    def session(export):
+        client = Client()
+        client.cookies[settings.SESSION_COOKIE_NAME] = session_cookie
+        try:
+            while time.monotonic() < deadline:
+                started = perf_counter()
+                with worker:
+                    response = client.get('/export/csv/' if export else rng.choice(paths))
+                    _consume(response)
+                if export:
+                    counts['exports'] += 1
+                    continue
+                durations.append(perf_counter() - started)
+                if response.status_code != 200:
+                    counts['errors'] += 1
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=session, args=(number < exporters,)) for number in range(sessions + exporters)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return _load_results(sessions, exporters, seconds, durations, counts)
+
+
+def environment():
+    """Versions that affect the numbers, stored with every result file"""
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+    }
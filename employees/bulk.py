@@ -0,0 +1,176 @@
+"""
+Set-based bulk delete and bulk edit of employees.
+
+Both operations walk the selection in id order, `chunk_size` rows per
+transaction, so a large operation never holds SQLite's write lock for
+long and never loads the selection into Python. They bypass the
+per-instance model signals and keep the rollup table, search index and
+profile picture files in sync themselves. Updates set `updated_at`, which
+retires the cached fragments of the changed rows.
+"""
+from collections import Counter
+from types import SimpleNamespace
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from . import audit, exports, images, lookups, rollups, search
+from .filters import search_employees
+from .locations import get_index as get_locations
+from .models import Employee
+
+# Employees deleted or updated per transaction
+BULK_CHUNK_SIZE = 500
+
+# Fields a bulk edit may reassign
+BULK_EDIT_FIELDS = ['department', 'role', 'state', 'lga', 'ward']
+
+LOCATION_FIELDS = ['state', 'lga', 'ward']
+
+
+def select_employees(params, using='default'):
+    """
+    The employees a bulk operation applies to: `{'ids': [...]}` for an
+    explicit selection or `{'filters': {...}}` for every employee matching
+    the records page filters.
+    """
+    queryset = Employee.objects.using(using)
+    if 'ids' in params:
+        return queryset.filter(id__in=[int(pk) for pk in params['ids']])
+    return search_employees(queryset, params.get('filters') or {})
+
+
+def id_chunks(queryset, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Yield lists of ids from the queryset, lowest first.
+
+    Each chunk is a fresh keyset query (id > last id), so rows that stop
+    matching the queryset because of an earlier chunk's update are not
+    skipped or revisited.
+    """
+    ids = queryset.order_by('id').values_list('id', flat=True)
+    last_id = 0
+    while True:
+        chunk = list(ids.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+def clean_changes(changes):
+    """
+    Validate the fields of a bulk edit; return only the ones being changed.
+
+    Blank values are left unchanged. A location change needs state, LGA and
+    ward together and must be part of the location hierarchy. Raises
+    ValueError (LocationError for bad locations) when the edit is invalid.
+    """
+    unknown = set(changes) - set(BULK_EDIT_FIELDS)
+    if unknown:
+        raise ValueError(f"These fields cannot be bulk edited: {', '.join(sorted(unknown))}.")
+    cleaned = {
+        field: str(value).strip()
+        for field, value in changes.items()
+        if value is not None and str(value).strip()
+    }
+
+    location = [field for field in LOCATION_FIELDS if field in cleaned]
+    if location:
+        if len(location) != len(LOCATION_FIELDS):
+            raise ValueError("A location change needs the state, LGA and ward.")
+        cleaned['state'], cleaned['lga'], cleaned['ward'] = get_locations().clean(
+            cleaned['state'], cleaned['lga'], cleaned['ward']
+        )
+
+    if not cleaned:
+        raise ValueError("Choose at least one field to change.")
+    return cleaned
+
+
+def delete_employees(queryset, chunk_size=BULK_CHUNK_SIZE, using='default', progress=None):
+    """
+    Delete every employee in the queryset and return how many were deleted.
+
+    Each chunk is one `DELETE ... WHERE id IN (...)` plus rollup, index,
+    audit log and tombstone maintenance in a single transaction; picture
+    files are removed after the chunk commits. `progress`, if given, is
+    called with the running count.
+    """
+    connection = connections[using]
+    table = Employee._meta.db_table
+    deleted = 0
+
+    for chunk in id_chunks(queryset.using(using), chunk_size):
+        with transaction.atomic(using=using):
+            rows = list(
+                Employee.objects.using(using).filter(id__in=chunk).values('id', *audit.AUDITED_COLUMNS)
+            )
+            ids = [row['id'] for row in rows]
+            if not ids:
+                continue
+            placeholders = ', '.join(['%s'] * len(ids))
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {table} WHERE id IN ({placeholders})", ids)
+
+            deltas = Counter()
+            for row in rows:
+                deltas[_rollup_key(row)] -= 1
+            rollups.apply_deltas(deltas, using=using)
+            search.unindex_employees(ids, using=using)
+            audit.record_deletes(rows, using=using)
+            exports.record_tombstones([(row['id'], row['employee_id']) for row in rows], using=using)
+
+            pictures = [row['profile_picture'] for row in rows if row['profile_picture']]
+            if pictures:
+                transaction.on_commit(lambda pictures=pictures: _delete_pictures(pictures), using=using)
+
+        deleted += len(rows)
+        if progress:
+            progress(deleted)
+
+    return deleted
+
+
+def update_employees(queryset, changes, chunk_size=BULK_CHUNK_SIZE, using='default', progress=None):
+    """
+    Apply already cleaned `changes` (see clean_changes) to every employee in
+    the queryset with one UPDATE per chunk; return how many were updated.
+    """
+    # The new names as lookup table ids: {'department_id': 3, ...}
+    changes = lookups.lookup_ids(changes, create=True)
+    reindex = any(field.removesuffix('_id') in search.FTS_FIELDS for field in changes)
+    regroup = any(field in rollups.GROUP_FIELDS for field in changes)
+    # Old values are read for the audit log, plus the rollup groups when those move
+    fields = list(dict.fromkeys([*changes, *(rollups.GROUP_FIELDS if regroup else [])]))
+    updated = 0
+
+    for chunk in id_chunks(queryset.using(using), chunk_size):
+        with transaction.atomic(using=using):
+            employees = Employee.objects.using(using).filter(id__in=chunk)
+            rows = list(employees.values('id', 'created_at', *fields))
+            if regroup:
+                deltas = Counter()
+                for row in rows:
+                    deltas[_rollup_key(row)] -= 1
+                    deltas[_rollup_key({**row, **changes})] += 1
+                rollups.apply_deltas(deltas, using=using)
+            count = employees.update(**changes, updated_at=timezone.now())
+            audit.record_bulk_update(rows, changes, using=using)
+            if reindex:
+                search.index_employees(chunk, using=using)
+
+        updated += count
+        if progress:
+            progress(updated)
+
+    return updated
+
+
+def _rollup_key(row):
+    return rollups.rollup_key(SimpleNamespace(**row))
+
+
+def _delete_pictures(names):
+    for name in names:
+        images.delete_picture(name)
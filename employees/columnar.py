@@ -0,0 +1,397 @@
+"""
+Columnar snapshot of the employee table for analytics.
+
+`manage.py refresh_columnar_snapshot` writes the columns that the dashboard
+and ad-hoc analytics read into one file (COLUMNAR_SNAPSHOT_PATH):
+
+- department, role, gender, state, LGA and ward as dictionary codes of
+  one or two bytes per employee (code 0 means none);
+- date of birth and hire day (the local date of created_at) as 32-bit
+  yyyymmdd integers, so an exact age is (today - birthday) // 10000 and
+  a hiring month is day // 100;
+- the employee ids, in ascending order, to apply later changes to.
+
+Readers map the file into memory and scan whole columns with C-level
+iteration (Counter, itertools.compress, masks combined as big integers),
+so no rows are built and the live database is not read at all. A refresh
+reads only the employees whose updated_at is past the snapshot's
+watermark, plus the employee tombstones recorded since then, and
+replaces the file atomically.
+"""
+import itertools
+import json
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import lookups
+from .exports import iter_tombstones
+from .models import Employee, EmployeeTombstone
+
+MAGIC = b'EMPCOLS1'
+VERSION = 1
+
+# Category columns backed by a lookup table: the dictionary holds lookup ids
+LOOKUP_COLUMNS = ['department', 'role', 'state', 'lga', 'ward']
+CATEGORY_COLUMNS = [*LOOKUP_COLUMNS, 'gender']
+DATE_COLUMNS = ['date_of_birth', 'hired']
+
+# Employee values read per row, in _Table.upsert() order
+ROW_FIELDS = ['id', *(f'{column}_id' for column in LOOKUP_COLUMNS), 'gender', 'date_of_birth', 'hired']
+
+# Rows read per keyset batch
+READ_BATCH_SIZE = 5000
+
+# Changes are re-read from a little before the watermark, so a save that
+# committed after the previous refresh but is stamped earlier is not lost
+WATERMARK_OVERLAP = timedelta(minutes=1)
+
+PERIODS = {'day': 1, 'month': 100, 'year': 10000}
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot file is missing, damaged or written by an incompatible version"""
+
+
+def yyyymmdd(day):
+    return day.year * 10000 + day.month * 100 + day.day if day else 0
+
+
+def from_yyyymmdd(value):
+    return date(value // 10000, value // 100 % 100 or 1, value % 100 or 1)
+
+
+def _aligned(size):
+    return (size + 7) // 8 * 8
+
+
+def _normal(label):
+    return ' '.join(str(label or '').split()).casefold()
+
+
+class _Table:
+    """Growable column arrays of a snapshot being built or refreshed"""
+
+    def __init__(self):
+        self.ids = array('q')
+        self.codes = {column: array('I') for column in CATEGORY_COLUMNS}
+        self.dates = {column: array('i') for column in DATE_COLUMNS}
+        # Per category column: code -> value (lookup id or gender), and back
+        self.values = {column: [None] for column in CATEGORY_COLUMNS}
+        self.value_codes = {column: {} for column in CATEGORY_COLUMNS}
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        table = cls()
+        table.ids = array('q', snapshot.columns['id'])
+        for column in CATEGORY_COLUMNS:
+            table.codes[column] = array('I', snapshot.columns[column])
+            table.values[column] = list(snapshot.values[column])
+            table.value_codes[column] = {value: code for code, value in enumerate(table.values[column]) if code}
+        for column in DATE_COLUMNS:
+            table.dates[column] = array('i', snapshot.columns[column])
+        return table
+
+    def _code(self, column, value):
+        if value is None or value == '':
+            return 0
+        code = self.value_codes[column].get(value)
+        if code is None:
+            code = self.value_codes[column][value] = len(self.values[column])
+            self.values[column].append(value)
+        return code
+
+    def upsert(self, rows):
+        """Insert or overwrite ROW_FIELDS tuples by id; return how many were applied"""
+        applied = 0
+        for pk, *categories, birthday, hired in rows:
+            codes = [self._code(column, value) for column, value in zip(CATEGORY_COLUMNS, categories)]
+            dates = [yyyymmdd(birthday), yyyymmdd(hired)]
+            position = bisect_left(self.ids, pk)
+            if position < len(self.ids) and self.ids[position] == pk:
+                for column, code in zip(CATEGORY_COLUMNS, codes):
+                    self.codes[column][position] = code
+                for column, value in zip(DATE_COLUMNS, dates):
+                    self.dates[column][position] = value
+            else:
+                # New employees have the highest ids, so this is nearly always an append
+                self.ids.insert(position, pk)
+                for column, code in zip(CATEGORY_COLUMNS, codes):
+                    self.codes[column].insert(position, code)
+                for column, value in zip(DATE_COLUMNS, dates):
+                    self.dates[column].insert(position, value)
+            applied += 1
+        return applied
+
+    def delete(self, pks):
+        """Drop the rows of the given ids; return how many were present"""
+        keep = bytearray(b'\x01') * len(self.ids)
+        deleted = 0
+        for pk in pks:
+            position = bisect_left(self.ids, pk)
+            if position < len(self.ids) and self.ids[position] == pk:
+                keep[position] = 0
+                deleted += 1
+        if deleted:
+            self.ids = array('q', itertools.compress(self.ids, keep))
+            for columns in (self.codes, self.dates):
+                for column, values in columns.items():
+                    columns[column] = array(values.typecode, itertools.compress(values, keep))
+        return deleted
+
+    def blocks(self):
+        """(column name, array, extra header fields) to write, codes in the narrowest type"""
+        yield 'id', self.ids, {}
+        for column in CATEGORY_COLUMNS:
+            values = self.values[column]
+            typecode = 'B' if len(values) <= 1 << 8 else 'H' if len(values) <= 1 << 16 else 'I'
+            if column in LOOKUP_COLUMNS:
+                names = lookups.names(column, values[1:])
+                labels = [None, *(names.get(pk, '') for pk in values[1:])]
+            else:
+                labels = values
+            yield column, array(typecode, self.codes[column]), {'values': values, 'labels': labels}
+        for column in DATE_COLUMNS:
+            yield column, self.dates[column], {}
+
+
+def _rows(queryset):
+    """ROW_FIELDS tuples of the queryset in id order, read in keyset batches"""
+    queryset = queryset.annotate(hired=TruncDate('created_at')).order_by('id').values_list(*ROW_FIELDS)
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:READ_BATCH_SIZE])
+        yield from batch
+        if len(batch) < READ_BATCH_SIZE:
+            break
+        last_id = batch[-1][0]
+
+
+def _write(path, table, watermark):
+    columns, blocks, offset = {}, [], 0
+    for name, data, extra in table.blocks():
+        columns[name] = {'type': data.typecode, 'offset': offset, **extra}
+        blocks.append(data)
+        offset = _aligned(offset + len(data) * data.itemsize)
+    header = json.dumps({
+        'version': VERSION,
+        'byteorder': sys.byteorder,
+        'rows': len(table.ids),
+        'watermark': watermark.isoformat(),
+        'columns': columns,
+    }).encode()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(path.name + '.tmp')
+    with open(temporary, 'wb') as file:
+        file.write(MAGIC + len(header).to_bytes(8, 'little') + header)
+        file.write(bytes(_aligned(16 + len(header)) - 16 - len(header)))
+        for data in blocks:
+            data.tofile(file)
+            size = len(data) * data.itemsize
+            file.write(bytes(_aligned(size) - size))
+    # Readers holding the old file keep their mapping until they reopen
+    os.replace(temporary, path)
+
+
+def snapshot_path():
+    return Path(settings.COLUMNAR_SNAPSHOT_PATH)
+
+
+def refresh(path=None, full=False):
+    """
+    Bring the snapshot up to date: incrementally from its watermark, or
+    from scratch with `full` (or when there is no usable snapshot).
+    Return (employees in the snapshot, rows read, rows deleted, incremental).
+    """
+    path = Path(path or snapshot_path())
+    previous = None
+    if not full:
+        try:
+            previous = Snapshot(path)
+        except (OSError, SnapshotError):
+            pass
+
+    incremental = previous is not None
+    # Taken before reading, so rows saved during the refresh come again next time
+    watermark = timezone.now()
+    if not incremental:
+        table = _Table()
+        deleted = 0
+        upserted = table.upsert(_rows(Employee.objects.all()))
+    else:
+        since = previous.watermark - WATERMARK_OVERLAP
+        table = _Table.from_snapshot(previous)
+        deleted = table.delete({pk for pk, _, _ in iter_tombstones(since)})
+        upserted = table.upsert(_rows(Employee.objects.filter(updated_at__gte=since)))
+    _write(path, table, watermark)
+    return len(table.ids), upserted, deleted, incremental
+
+
+def _member_mask(values, codes):
+    """One byte per row: 1 where the code is in `codes`"""
+    if values.format == 'B':
+        table = bytes(code in codes for code in range(256))
+        return values.tobytes().translate(table)
+    return bytes(map(codes.__contains__, values))
+
+
+def _range_mask(values, low, high):
+    """One byte per row: 1 where low <= value <= high"""
+    return _and([bytes(map(low.__le__, values)), bytes(map(high.__ge__, values))], len(values))
+
+
+def _and(masks, rows):
+    if not masks:
+        return None
+    if len(masks) == 1:
+        return masks[0]
+    combined = int.from_bytes(masks[0], 'little')
+    for mask in masks[1:]:
+        combined &= int.from_bytes(mask, 'little')
+    return combined.to_bytes(rows, 'little')
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            try:
+                self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise SnapshotError(f"{path} is empty")
+        view = memoryview(self._map)
+        if bytes(view[:8]) != MAGIC:
+            raise SnapshotError(f"{path} is not an employee snapshot")
+        header_length = int.from_bytes(view[8:16], 'little')
+        header = json.loads(bytes(view[16:16 + header_length]))
+        if header['version'] != VERSION or header['byteorder'] != sys.byteorder:
+            raise SnapshotError(f"{path} was written by another version or platform; rebuild it with --full")
+
+        self.path = path
+        self.rows = header['rows']
+        self.watermark = datetime.fromisoformat(header['watermark'])
+        self.columns = {}
+        self.values = {}
+        self.labels = {}
+        start = _aligned(16 + header_length)
+        for name, column in header['columns'].items():
+            offset = start + column['offset']
+            size = self.rows * array(column['type']).itemsize
+            self.columns[name] = view[offset:offset + size].cast(column['type'])
+            if 'values' in column:
+                self.values[name] = column['values']
+                self.labels[name] = column['labels']
+
+    def _codes(self, column, labels):
+        wanted = {_normal(label) for label in labels}
+        return {code for code, label in enumerate(self.labels[column]) if code and _normal(label) in wanted}
+
+    def select(self, equals=None, hired_from=None, hired_to=None, born_from=None, born_to=None):
+        """
+        Row mask (one 0/1 byte per employee) of the employees matching every
+        condition, or None for all of them. `equals` maps category columns
+        to a label or a list of labels, matched ignoring case.
+        """
+        masks = []
+        for column, labels in (equals or {}).items():
+            if column not in CATEGORY_COLUMNS:
+                raise ValueError(f"Unknown category column '{column}'")
+            labels = [labels] if isinstance(labels, str) else labels
+            masks.append(_member_mask(self.columns[column], self._codes(column, labels)))
+        for column, low, high in (('hired', hired_from, hired_to), ('date_of_birth', born_from, born_to)):
+            if low or high:
+                masks.append(_range_mask(self.columns[column], yyyymmdd(low), yyyymmdd(high) or 99991231))
+        return _and(masks, self.rows)
+
+    def count(self, mask=None):
+        return self.rows if mask is None else mask.count(1)
+
+    def counts(self, by, mask=None):
+        """Counter of (label, ...) over the category columns in `by` -> employees"""
+        unknown = set(by) - set(CATEGORY_COLUMNS)
+        if not by or unknown:
+            raise ValueError(f"Counts are by one or more of {', '.join(CATEGORY_COLUMNS)}")
+        columns = [self.columns[column] for column in by]
+        keys = zip(*columns) if len(columns) > 1 else columns[0]
+        if mask is not None:
+            keys = itertools.compress(keys, mask)
+        codes = Counter(keys)
+        labels = [self.labels[column] for column in by]
+        counts = Counter()
+        for key, employees in codes.items():
+            key = key if len(by) > 1 else (key,)
+            counts[tuple(column_labels[code] for column_labels, code in zip(labels, key))] += employees
+        return counts
+
+    def code_counts(self, by, mask=None):
+        """Counter of (code, ...) over the category columns in `by`; see values/labels for the codes"""
+        keys = zip(*(self.columns[column] for column in by))
+        return Counter(keys if mask is None else itertools.compress(keys, mask))
+
+    def _date_counts(self, column, mask):
+        values = self.columns[column]
+        return Counter(values if mask is None else itertools.compress(values, mask))
+
+    def age_distribution(self, mask=None, bucket=10, today=None):
+        """[(youngest age in the band, employees)] of ages in whole years on `today`, by `bucket`-year bands"""
+        today = yyyymmdd(today or timezone.localdate())
+        bands = Counter()
+        # One step per distinct birthday rather than per employee
+        for birthday, employees in self._date_counts('date_of_birth', mask).items():
+            if birthday:
+                bands[(today - birthday) // 10000 // bucket * bucket] += employees
+        return sorted(bands.items())
+
+    def hiring_cohorts(self, mask=None, period='month'):
+        """[(first day of the period, employees hired in it)] by day, month or year"""
+        divisor = PERIODS[period]
+        cohorts = Counter()
+        for day, employees in self._date_counts('hired', mask).items():
+            cohorts[day // divisor * divisor] += employees
+        return [(from_yyyymmdd(day), employees) for day, employees in sorted(cohorts.items())]
+
+
+_current = None  # ((path, inode, mtime), Snapshot)
+
+
+def current_snapshot(max_age=None):
+    """
+    The snapshot at COLUMNAR_SNAPSHOT_PATH, reopened after a refresh has
+    replaced the file; None if there is none or its watermark is more than
+    `max_age` seconds old.
+    """
+    global _current
+    path = snapshot_path()
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (str(path), stat.st_ino, stat.st_mtime_ns)
+    if _current is None or _current[0] != key:
+        try:
+            _current = (key, Snapshot(path))
+        except (OSError, SnapshotError):
+            return None
+    snapshot = _current[1]
+    if max_age is not None and (timezone.now() - snapshot.watermark).total_seconds() > max_age:
+        return None
+    return snapshot
+
+
+def changed_since(moment):
+    """True if an employee was created, updated or deleted after `moment` (two indexed lookups)"""
+    return (
+        Employee.objects.filter(updated_at__gt=moment).exists()
+        or EmployeeTombstone.objects.filter(deleted_at__gt=moment).exists()
+    )
@@ -0,0 +1,222 @@
+import csv
+import json
+from datetime import date, datetime
+
+from django.db.models import Q
+
+from .models import Employee, EmployeeTombstone
+
+# Header row and matching columns for the employee CSV export
+EXPORT_HEADERS = [
+    'Employee ID', 'First Name', 'Surname', 'Other Name', 'Email',
+    'Contact Number', 'Department', 'Role', 'Gender', 'Date of Birth',
+    'Address', 'State', 'LGA', 'Ward', 'Date Created'
+]
+
+# Department, role and location names are read from their lookup tables
+EXPORT_FIELDS = [
+    'employee_id', 'first_name', 'surname', 'other_name', 'email',
+    'contact_number', 'department__name', 'role__name', 'gender', 'date_of_birth',
+    'address', 'state__name', 'lga__name', 'ward__name', 'created_at'
+]
+
+# Rows fetched per keyset batch
+EXPORT_BATCH_SIZE = 2000
+
+
+class Echo:
+    """File-like object that hands back whatever is written to it"""
+
+    def write(self, value):
+        return value
+
+
+def iter_export_rows(queryset=None, batch_size=EXPORT_BATCH_SIZE, fields=EXPORT_FIELDS):
+    """Yield export rows (`fields` tuples), walking the table in id order with keyset batches"""
+    if queryset is None:
+        queryset = Employee.objects.all()
+
+    # id is fetched last so the keyset position can be read off each tuple
+    queryset = queryset.order_by('id').values_list(*fields, 'id')
+    last_id = 0
+    while True:
+        batch = queryset.filter(id__gt=last_id)[:batch_size]
+        fetched = 0
+        for row in batch.iterator(chunk_size=batch_size):
+            fetched += 1
+            last_id = row[-1]
+            yield row[:-1]
+        if fetched < batch_size:
+            break
+
+
+async def aiter_export_rows(queryset=None, batch_size=EXPORT_BATCH_SIZE):
+    """Async iter_export_rows() for streaming from async views"""
+    if queryset is None:
+        queryset = Employee.objects.all()
+
+    queryset = queryset.order_by('id').values_list(*EXPORT_FIELDS, 'id')
+    last_id = 0
+    while True:
+        batch = queryset.filter(id__gt=last_id)[:batch_size]
+        fetched = 0
+        # Django runs the query in a sync thread either way; the queryset's own
+        # __aiter__ loads each bounded batch in one sync_to_async() call, so no
+        # cursor stays open across awaits as it would with aiterator()
+        async for row in batch:
+            fetched += 1
+            last_id = row[-1]
+            yield row[:-1]
+        if fetched < batch_size:
+            break
+
+
+def format_export_row(row):
+    """Turn a raw values_list tuple into the CSV row written to the file"""
+    row = list(row)
+    row[3] = row[3] or ''  # other_name
+    row[-1] = row[-1].strftime("%Y-%m-%d %H:%M")  # created_at
+    return row
+
+
+def stream_employees_csv(queryset=None, batch_size=EXPORT_BATCH_SIZE):
+    """Generate the CSV export line by line so memory stays flat for any row count"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_HEADERS)
+    for row in iter_export_rows(queryset, batch_size):
+        yield writer.writerow(format_export_row(row))
+
+
+async def astream_employees_csv(queryset=None, batch_size=EXPORT_BATCH_SIZE):
+    """Async stream_employees_csv(); ASGI servers would otherwise read a sync stream into memory first"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_HEADERS)
+    async for row in aiter_export_rows(queryset, batch_size):
+        yield writer.writerow(format_export_row(row))
+
+
+# Delta export: the export columns plus the keys a downstream sync upserts on
+DELTA_HEADERS = ['ID', 'Operation', *EXPORT_HEADERS, 'Updated At']
+DELTA_FIELDS = ['id', *EXPORT_FIELDS, 'updated_at']
+# JSON Lines keys of DELTA_FIELDS ('department', not 'department__name')
+DELTA_KEYS = [field.removesuffix('__name') for field in DELTA_FIELDS]
+
+DELTA_FORMATS = ('csv', 'jsonl')
+
+
+def _delta_batch(since, position, batch_size):
+    """The next (updated_at, id) keyset batch of employees created or updated since `since`"""
+    queryset = Employee.objects.filter(updated_at__gte=since)
+    if position is not None:
+        updated_at, last_id = position
+        queryset = queryset.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=last_id))
+    return queryset.order_by('updated_at', 'id').values_list(*DELTA_FIELDS)[:batch_size]
+
+
+def iter_delta_rows(since, batch_size=EXPORT_BATCH_SIZE):
+    """Yield DELTA_FIELDS tuples of employees created or updated since `since`, read through the updated_at index"""
+    position = None
+    while True:
+        fetched = 0
+        for row in _delta_batch(since, position, batch_size).iterator(chunk_size=batch_size):
+            fetched += 1
+            position = (row[-1], row[0])
+            yield row
+        if fetched < batch_size:
+            break
+
+
+async def aiter_delta_rows(since, batch_size=EXPORT_BATCH_SIZE):
+    """Async iter_delta_rows()"""
+    position = None
+    while True:
+        fetched = 0
+        async for row in _delta_batch(since, position, batch_size):
+            fetched += 1
+            position = (row[-1], row[0])
+            yield row
+        if fetched < batch_size:
+            break
+
+
+def record_tombstones(employees, using='default'):
+    """Remember deleted employees, given as (id, employee_id) pairs, for delta consumers"""
+    EmployeeTombstone.objects.using(using).bulk_create(
+        [EmployeeTombstone(employee_pk=pk, employee_id=employee_id) for pk, employee_id in employees]
+    )
+
+
+def _tombstone_rows(since):
+    return EmployeeTombstone.objects.filter(deleted_at__gte=since).order_by('deleted_at', 'id') \
+        .values_list('employee_pk', 'employee_id', 'deleted_at')
+
+
+def iter_tombstones(since):
+    """Yield (id, employee_id, deleted at) of the employees deleted since `since`"""
+    return _tombstone_rows(since).iterator(chunk_size=EXPORT_BATCH_SIZE)
+
+
+async def aiter_tombstones(since):
+    """Async iter_tombstones()"""
+    async for tombstone in _tombstone_rows(since):
+        yield tombstone
+
+
+def last_change():
+    """When an employee was last created, updated or deleted (two indexed lookups), or None"""
+    moments = [
+        Employee.objects.order_by('-updated_at').values_list('updated_at', flat=True).first(),
+        EmployeeTombstone.objects.order_by('-deleted_at').values_list('deleted_at', flat=True).first(),
+    ]
+    return max((moment for moment in moments if moment is not None), default=None)
+
+
+def _iso(value):
+    # Full precision, so a consumer can compare timestamps with the next watermark
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+class DeltaFormatter:
+    """Lines of a delta export in one of DELTA_FORMATS"""
+
+    def __init__(self, format):
+        self.format = format
+        self.writer = csv.writer(Echo())
+
+    def header(self):
+        return self.writer.writerow(DELTA_HEADERS) if self.format == 'csv' else ''
+
+    def upsert(self, row):
+        if self.format == 'csv':
+            return self.writer.writerow([row[0], 'upsert', *format_export_row(row[1:-1]), _iso(row[-1])])
+        return json.dumps({'op': 'upsert', **{field: _iso(value) for field, value in zip(DELTA_KEYS, row)}}) + '\n'
+
+    def delete(self, tombstone):
+        pk, employee_id, deleted_at = tombstone
+        if self.format == 'csv':
+            blanks = [''] * (len(EXPORT_FIELDS) - 1)
+            return self.writer.writerow([pk, 'delete', employee_id, *blanks, _iso(deleted_at)])
+        return json.dumps({'op': 'delete', 'id': pk, 'employee_id': employee_id, 'deleted_at': _iso(deleted_at)}) + '\n'
+
+
+def stream_delta(since, format='csv', batch_size=EXPORT_BATCH_SIZE):
+    """
+    Generate the rows created or updated since `since`, then tombstones of
+    those deleted since, as CSV or JSON Lines.
+    """
+    formatter = DeltaFormatter(format)
+    yield formatter.header()
+    for row in iter_delta_rows(since, batch_size):
+        yield formatter.upsert(row)
+    for tombstone in iter_tombstones(since):
+        yield formatter.delete(tombstone)
+
+
+async def astream_delta(since, format='csv', batch_size=EXPORT_BATCH_SIZE):
+    """Async stream_delta()"""
+    formatter = DeltaFormatter(format)
+    yield formatter.header()
+    async for row in aiter_delta_rows(since, batch_size):
+        yield formatter.upsert(row)
+    async for tombstone in aiter_tombstones(since):
+        yield formatter.delete(tombstone)
@@ -0,0 +1,94 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import lookups
+from .search import filter_search, ranked_search
+
+
+def parse_date_range(params):
+    """Return the (date_from, date_to) filter values as dates, ignoring missing or malformed ones"""
+    dates = []
+    for key in ('date_from', 'date_to'):
+        try:
+            dates.append(parse_date(params.get(key) or ''))
+        except ValueError:
+            dates.append(None)
+    return tuple(dates)
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _filter_lookup(queryset, field, name):
+    """Filter on a lookup table id; a name that was never stored matches nothing"""
+    pk = lookups.get_id(field, name)
+    if pk is None:
+        return queryset.none()
+    return queryset.filter(**{f'{field}_id': pk})
+
+
+def filter_employees(queryset, params):
+    """Apply the dashboard filters (department, date_from, date_to) to a queryset"""
+    department = params.get('department')
+    date_from, date_to = parse_date_range(params)
+
+    if department:
+        queryset = _filter_lookup(queryset, 'department', department)
+
+    if date_from:
+        queryset = queryset.filter(created_at__gte=_start_of_day(date_from))
+
+    # date_to is inclusive - everything created before the start of the next day
+    if date_to:
+        queryset = queryset.filter(created_at__lt=_start_of_day(date_to + timedelta(days=1)))
+
+    return queryset
+
+
+def filter_daily_stats(queryset, params):
+    """Apply the dashboard filters to a DailyEmployeeStat queryset"""
+    department = params.get('department')
+    date_from, date_to = parse_date_range(params)
+
+    if department:
+        queryset = _filter_lookup(queryset, 'department', department)
+
+    if date_from:
+        queryset = queryset.filter(day__gte=date_from)
+
+    if date_to:
+        queryset = queryset.filter(day__lte=date_to)
+
+    return queryset
+
+
+def search_employees(queryset, params, ranked=False):
+    """
+    Apply the records page search box and gender/department/role filters to a queryset.
+
+    With `ranked` set, search results come back ordered by relevance.
+    """
+    search = (params.get('q') or '').strip()
+    gender = params.get('gender')
+    department = params.get('department')
+    role = params.get('role')
+
+    if gender:
+        queryset = queryset.filter(gender=gender)
+
+    if department:
+        queryset = _filter_lookup(queryset, 'department', department)
+
+    if role:
+        queryset = _filter_lookup(queryset, 'role', role)
+
+    if search:
+        if ranked:
+            queryset = ranked_search(queryset, search)
+        else:
+            queryset = filter_search(queryset, search)
+
+    return queryset
@@ -0,0 +1,96 @@
+"""
+Rendered HTML fragments cached per employee.
+
+Entries are keyed on the employee's id and `updated_at`, so an edited
+employee gets new keys and stale HTML is never served for it. The records
+table caches one fragment per row. It loads only `id` and `updated_at` for
+the page and fetches full rows just for the ones that are not cached yet.
+
+The detail page reads the employee's `updated_at` first, a single indexed
+lookup, so any process sharing the cache finds the same entry and an edit
+made elsewhere (another worker, a bulk UPDATE) is never missed. Nothing
+needs invalidating on save or delete; old entries simply age out.
+"""
+from django.core.cache import caches
+from django.template.loader import render_to_string
+
+from .models import Employee
+
+# Cache alias holding rendered employee fragments (see CACHES in settings)
+FRAGMENT_CACHE = 'employees'
+
+ROW_TEMPLATE = 'employees/_record_row.html'
+DETAIL_TEMPLATE = 'employees/_employee_detail.html'
+
+
+def fragment_cache():
+    return caches[FRAGMENT_CACHE]
+
+
+def _version(updated_at):
+    return f'{updated_at:%Y%m%d%H%M%S%f}'
+
+
+def _fragment_key(employee_id, version, kind):
+    return f'employee:{employee_id}:{version}:{kind}'
+
+
+def _row_keys(employees):
+    return [_fragment_key(employee.id, _version(employee.updated_at), 'row') for employee in employees]
+
+
+def _render_rows(employees, missing):
+    return {missing[employee.id]: render_to_string(ROW_TEMPLATE, {'employee': employee}) for employee in employees}
+
+
+async def arecord_rows(employees, using='default'):
+    """
+    Rendered table rows for a page of employees, in page order.
+
+    `employees` only needs `id` and `updated_at` loaded; rows missing from
+    the cache are fetched in one query and rendered.
+    """
+    keys = _row_keys(employees)
+    cache = fragment_cache()
+    rows = await cache.aget_many(keys)
+
+    missing = {employee.id: key for employee, key in zip(employees, keys) if key not in rows}
+    if missing:
+        queryset = Employee.objects.using(using).for_records().filter(id__in=missing)
+        rendered = _render_rows([employee async for employee in queryset], missing)
+        await cache.aset_many(rendered)
+        rows.update(rendered)
+    # Rendered HTML is a SafeString and stays one in the cache; a row deleted
+    # since the page query is left out
+    return [rows[key] for key in keys if key in rows]
+
+
+async def acached_detail(employee_id, using='default'):
+    """The cached detail fragment {'name': ..., 'html': ...} for an employee, or None"""
+    updated_at = await Employee.objects.using(using).filter(id=employee_id).values_list(
+        'updated_at', flat=True
+    ).afirst()
+    if updated_at is None:
+        return None
+    return await fragment_cache().aget(_fragment_key(employee_id, _version(updated_at), 'detail'))
+
+
+async def arender_detail(employee):
+    """Render and cache the detail fragment of a freshly loaded employee"""
+    detail = {
+        'name': f'{employee.first_name} {employee.surname}',
+        'html': render_to_string(DETAIL_TEMPLATE, {'employee': employee}),
+    }
+    await fragment_cache().aset(_fragment_key(employee.id, _version(employee.updated_at), 'detail'), detail)
+    return detail
+
+
+def invalidate_pictures(names, using='default'):
+    """Forget every fragment showing one of these pictures, e.g. once its variants exist"""
+    employees = Employee.objects.using(using).filter(profile_picture__in=names).values_list('id', 'updated_at')
+    keys = []
+    for employee_id, updated_at in employees:
+        version = _version(updated_at)
+        keys += [_fragment_key(employee_id, version, kind) for kind in ('row', 'detail')]
+    if keys:
+        fragment_cache().delete_many(keys)
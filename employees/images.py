@@ -0,0 +1,112 @@
+"""
+Resized profile picture variants.
+
+Every original in profile_pictures/ gets a list thumbnail and a detail
+size, each as JPEG and WebP, stored next to it as `<name>__<variant>.<ext>`.
+Variants are generated by the job worker after an upload (or by
+`manage.py generate_thumbnails`), and templates fall back to the original
+until they exist.
+"""
+import io
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# name -> (width, height, crop to fill)
+VARIANTS = {
+    'thumb': (100, 100, True),
+    'detail': (400, 400, False),
+}
+
+# extension -> (Pillow format, save options)
+FORMATS = {
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+}
+
+VARIANT_SEPARATOR = '__'
+
+
+def variant_name(name, variant, extension):
+    """Storage name of one variant of an original, e.g. profile_pictures/a__thumb.webp"""
+    stem = posixpath.splitext(name)[0]
+    return f"{stem}{VARIANT_SEPARATOR}{variant}.{extension}"
+
+
+def variant_names(name):
+    return [variant_name(name, variant, extension) for variant in VARIANTS for extension in FORMATS]
+
+
+def is_variant(name):
+    return VARIANT_SEPARATOR in posixpath.basename(name)
+
+
+def variant_urls(name, variant, storage=default_storage):
+    """{'jpg': url, 'webp': url} for a generated variant, or None if it does not exist yet"""
+    if not name:
+        return None
+    names = {extension: variant_name(name, variant, extension) for extension in FORMATS}
+    if not storage.exists(names['jpg']):
+        return None
+    urls = {extension: storage.url(path) for extension, path in names.items() if storage.exists(path)}
+    urls['width'], urls['height'] = VARIANTS[variant][:2]
+    return urls
+
+
+def generate_variants(name, force=False, storage=default_storage):
+    """Create every missing variant of an original; return how many files were written"""
+    if not force and all(storage.exists(path) for path in variant_names(name)):
+        return 0
+
+    # Imported here: Pillow adds tens of milliseconds to every worker's startup
+    from PIL import Image, ImageOps
+
+    with storage.open(name, 'rb') as file:
+        image = Image.open(file)
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGB')
+
+    written = 0
+    for variant, (width, height, crop) in VARIANTS.items():
+        if crop:
+            resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        else:
+            resized = image.copy()
+            resized.thumbnail((width, height), Image.LANCZOS)
+
+        for extension, (image_format, options) in FORMATS.items():
+            path = variant_name(name, variant, extension)
+            if storage.exists(path):
+                if not force:
+                    continue
+                storage.delete(path)
+            buffer = io.BytesIO()
+            resized.save(buffer, format=image_format, **options)
+            storage.save(path, ContentFile(buffer.getvalue()))
+            written += 1
+    return written
+
+
+def delete_picture(name, storage=default_storage):
+    """Delete an original and all of its variants"""
+    for path in [name] + variant_names(name):
+        if storage.exists(path):
+            storage.delete(path)
+
+
+def find_orphans(referenced, directory='profile_pictures', storage=default_storage):
+    """Files in `directory` that are neither a referenced original nor one of its variants"""
+    keep = set()
+    for name in referenced:
+        keep.add(name)
+        keep.update(variant_names(name))
+
+    try:
+        _, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [
+        path for path in (posixpath.join(directory, filename) for filename in files)
+        if path not in keep
+    ]
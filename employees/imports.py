@@ -0,0 +1,283 @@
+import csv
+import io
+from collections import Counter
+from types import SimpleNamespace
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import lookups, rollups, search, uniqueness
+from .locations import LocationError, get_index as get_locations
+from .models import Employee
+
+# Rows validated and inserted per transaction
+IMPORT_BATCH_SIZE = 1000
+
+REQUIRED_FIELDS = [
+    'first_name', 'surname', 'employee_id', 'email', 'contact_number', 'date_of_birth',
+    'address', 'gender', 'state', 'lga', 'ward', 'department', 'role',
+]
+
+IMPORT_FIELDS = REQUIRED_FIELDS + ['other_name']
+
+
+# Accepted spellings of each column header (normalized to lower_snake_case)
+HEADER_ALIASES = {
+    'firstname': 'first_name',
+    'last_name': 'surname',
+    'othername': 'other_name',
+    'employeeid': 'employee_id',
+    'contactnumber': 'contact_number',
+    'phone': 'contact_number',
+    'dob': 'date_of_birth',
+}
+
+GENDERS = {choice for choice, _ in Employee.GENDER_CHOICES}
+
+
+class ImportResult:
+    """Outcome of an import run: rows created and per-row errors"""
+
+    def __init__(self):
+        self.created = 0
+        self.errors = []  # (row number, message)
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+    @property
+    def failed(self):
+        return len({row_number for row_number, _ in self.errors})
+
+
+def normalize_header(header):
+    """Map a spreadsheet header ('Employee ID', 'employee_id', 'DOB'...) to a model field name"""
+    key = str(header or '').strip().lower().replace(' ', '_').replace('-', '_')
+    return HEADER_ALIASES.get(key, key)
+
+
+def read_csv(file):
+    """Yield one dict per row of a binary CSV file, reading it as a stream"""
+    reader = csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    headers = [normalize_header(header) for header in next(reader, [])]
+    for values in reader:
+        yield dict(zip(headers, values))
+
+
+def read_xlsx(file):
+    """Yield one dict per row of the first worksheet of an Excel workbook"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("Importing Excel files requires the openpyxl package.")
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        headers = [normalize_header(header) for header in next(rows, [])]
+        for values in rows:
+            yield dict(zip(headers, values))
+    finally:
+        workbook.close()
+
+
+def read_rows(file, filename):
+    """Pick a reader from the file extension"""
+    if str(filename).lower().endswith(('.xlsx', '.xlsm')):
+        return read_xlsx(file)
+    return read_csv(file)
+
+
+def _clean_value(value):
+    if isinstance(value, str):
+        return value.strip()
+    if value is None:
+        return ''
+    if hasattr(value, 'date') and callable(value.date):
+        # Excel dates come back as datetimes
+        value = value.date()
+    return str(value).strip()
+
+
+def clean_row(row):
+    """Validate one raw row; return (field values, list of error messages)"""
+    data = {field: _clean_value(row.get(field)) for field in IMPORT_FIELDS}
+    errors = [f"{field} is required." for field in REQUIRED_FIELDS if not data[field]]
+
+    if data['email']:
+        try:
+            validate_email(data['email'])
+        except ValidationError:
+            errors.append(f"Invalid email '{data['email']}'.")
+
+    if data['date_of_birth']:
+        try:
+            data['date_of_birth'] = parse_date(data['date_of_birth'][:10])
+        except ValueError:
+            data['date_of_birth'] = None
+        if data['date_of_birth'] is None:
+            errors.append(f"Invalid date of birth '{row.get('date_of_birth')}' (expected YYYY-MM-DD).")
+
+    if data['gender'] and data['gender'] not in GENDERS:
+        errors.append(f"Invalid gender '{data['gender']}'.")
+
+    # Validate the location against the state/LGA/ward hierarchy, as the forms do
+    if data['state'] and data['lga'] and data['ward']:
+        try:
+            data['state'], data['lga'], data['ward'] = get_locations().clean(data['state'], data['lga'], data['ward'])
+        except LocationError as e:
+            errors.append(str(e))
+
+    data['other_name'] = data['other_name'] or None
+    return data, errors
+
+
+def _import_batch(batch, result, seen_ids, seen_emails, using):
+    """Validate one chunk of (row number, raw row) pairs and bulk insert the valid ones"""
+    cleaned = []
+    for row_number, row in batch:
+        data, errors = clean_row(row)
+        if not errors:
+            if data['employee_id'] in seen_ids:
+                errors.append(f"Employee ID '{data['employee_id']}' appears more than once in the file.")
+            if data['email'] in seen_emails:
+                errors.append(f"Email '{data['email']}' appears more than once in the file.")
+        if errors:
+            for message in errors:
+                result.add_error(row_number, message)
+            continue
+        seen_ids.add(data['employee_id'])
+        seen_emails.add(data['email'])
+        cleaned.append((row_number, data))
+
+    if not cleaned:
+        return
+
+    # At most one set-based lookup per chunk, for the values the uniqueness index cannot rule out
+    existing_ids, existing_emails = uniqueness.existing_values(
+        [data['employee_id'] for _, data in cleaned], [data['email'] for _, data in cleaned], using=using
+    )
+
+    new_rows = []
+    for row_number, data in cleaned:
+        if data['employee_id'] in existing_ids:
+            result.add_error(row_number, f"Employee ID '{data['employee_id']}' already exists.")
+        elif data['email'] in existing_emails:
+            result.add_error(row_number, f"Email '{data['email']}' is already registered.")
+        else:
+            new_rows.append((row_number, data))
+
+    if new_rows:
+        _insert_batch(new_rows, result, using)
+
+
+def _insert_batch(rows, result, using):
+    """Insert (row number, cleaned row) pairs; rows saved elsewhere meanwhile are reported, not fatal"""
+    try:
+        result.created += len(insert_employees([data for _, data in rows], using))
+        return
+    except IntegrityError:
+        # Another process saved one of these IDs or emails after the uniqueness
+        # check; the chunk was rolled back, so insert it row by row to find them
+        pass
+    for row_number, data in rows:
+        try:
+            result.created += len(insert_employees([data], using))
+        except IntegrityError:
+            if Employee.objects.using(using).filter(employee_id=data['employee_id']).exists():
+                result.add_error(row_number, f"Employee ID '{data['employee_id']}' already exists.")
+            else:
+                result.add_error(row_number, f"Email '{data['email']}' is already registered.")
+
+
+def insert_employees(rows, using='default'):
+    """
+    Insert already validated rows, with their rollups and search index
+    entries, in one transaction and return the new ids.
+
+    A row may carry a `created_at` datetime (used by the benchmark data
+    generator to spread hire dates); it defaults to now. Department, role
+    and location names are stored as lookup ids, adding names not seen yet.
+    """
+    for data in rows:
+        data.update(lookups.lookup_ids(data, create=True))
+    with transaction.atomic(using=using):
+        created_ids = _insert_employees(rows, using)
+        rollups.apply_deltas(Counter(
+            rollups.rollup_key(SimpleNamespace(**data)) for data in rows
+        ), using=using)
+        search.index_employees(created_ids, using=using)
+    for data in rows:
+        uniqueness.remember(data['employee_id'], data['email'], using=using)
+    return created_ids
+
+
+def _insert_employees(rows, using):
+    """
+    Insert cleaned rows with a single executemany and return their new ids.
+
+    This skips the per-field SQL compilation bulk_create does for every
+    object, which dominates import time on SQLite; ids are read back with
+    one lookup on the unique employee_id column.
+    """
+    connection = connections[using]
+    now = timezone.now()
+    timestamp = connection.ops.adapt_datetimefield_value(now)
+    # Lookup names are stored as their ids (see insert_employees)
+    fields = [f'{field}_id' if field in lookups.LOOKUP_MODELS else field for field in IMPORT_FIELDS]
+    columns = fields + ['created_at', 'updated_at']
+
+    values = []
+    for data in rows:
+        data.setdefault('created_at', now)
+        values.append(
+            [connection.ops.adapt_datefield_value(data[field]) if field == 'date_of_birth' else data[field]
+             for field in fields]
+            + [connection.ops.adapt_datetimefield_value(data['created_at']), timestamp]
+        )
+    placeholders = ', '.join(['%s'] * len(columns))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {Employee._meta.db_table} ({', '.join(columns)}) VALUES ({placeholders})",
+            values,
+        )
+
+    return list(
+        Employee.objects.using(using).filter(
+            employee_id__in=[data['employee_id'] for data in rows]
+        ).values_list('id', flat=True)
+    )
+
+
+def import_employees(rows, batch_size=IMPORT_BATCH_SIZE, using='default', progress=None):
+    """
+    Import an iterable of raw row dicts (as produced by read_rows).
+
+    Rows are validated and inserted in chunks of `batch_size`, each chunk in
+    its own transaction. Invalid or duplicate rows are skipped and reported
+    in the returned ImportResult; row numbers count the header as row 1.
+    `progress`, if given, is called with the result after every chunk.
+    """
+    result = ImportResult()
+    seen_ids = set()
+    seen_emails = set()
+    batch = []
+
+    for row_number, row in enumerate(rows, start=2):
+        if not any(_clean_value(value) for value in row.values()):
+            continue  # Skip blank lines
+        batch.append((row_number, row))
+        if len(batch) >= batch_size:
+            _import_batch(batch, result, seen_ids, seen_emails, using)
+            batch = []
+            if progress:
+                progress(result)
+    if batch:
+        _import_batch(batch, result, seen_ids, seen_emails, using)
+        if progress:
+            progress(result)
+
+    return result
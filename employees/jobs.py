@@ -0,0 +1,246 @@
+"""
+Lightweight database-backed job queue.
+
+Views enqueue a `Job` row; `manage.py run_job_worker` claims queued jobs
+and runs them on a thread pool, so exports, imports and bulk deletes do
+not tie up web workers. No external broker is needed.
+
+A worker marks its running jobs with a heartbeat. A job left 'running'
+by a worker that crashed or was restarted stops getting heartbeats, and
+the next worker to look puts it back in the queue (every job is safe to
+run again: imports skip rows already imported, bulk operations select
+what is left), or fails it after MAX_ATTEMPTS.
+"""
+import csv
+import logging
+import time
+import traceback
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import audit, bulk, fragments, images, imports, reports
+from .exports import EXPORT_HEADERS, Echo, format_export_row, iter_export_rows
+from .filters import filter_employees
+from .models import Employee, Job
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between progress writes for one job
+PROGRESS_INTERVAL = 1.0
+
+# Seconds between heartbeats of running jobs, and without one before a job
+# counts as abandoned by its worker
+HEARTBEAT_INTERVAL = 30
+STALE_JOB_TIMEOUT = 300
+
+# Claims of a job before an abandoned run fails it instead of requeueing it
+MAX_ATTEMPTS = 2
+
+
+class JobProgress:
+    """Throttled progress reporter handed to job handlers"""
+
+    def __init__(self, job):
+        self.job = job
+        self.last_write = 0
+
+    def __call__(self, progress, total=None, message=None, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_write < PROGRESS_INTERVAL:
+            return
+        self.last_write = now
+        fields = {'progress': progress}
+        if total is not None:
+            fields['total'] = total
+        if message is not None:
+            fields['message'] = message
+        Job.objects.filter(pk=self.job.pk).update(**fields)
+
+
+def enqueue(kind, params=None, user=None):
+    """Queue a job for the worker and return it"""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    return Job.objects.create(
+        kind=kind,
+        params=params or {},
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def claim_next_job():
+    """Atomically move the oldest queued job to running and return it (or None)"""
+    while True:
+        job = Job.objects.filter(status='queued').order_by('created_at', 'id').first()
+        if job is None:
+            return None
+        # The status check makes the claim safe when several workers poll at once
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=job.pk, status='queued').update(
+            status='running', started_at=now, heartbeat_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def heartbeat(job_ids):
+    """Mark running jobs as alive"""
+    Job.objects.filter(pk__in=list(job_ids), status='running').update(heartbeat_at=timezone.now())
+
+
+def recover_stale_jobs(timeout=STALE_JOB_TIMEOUT):
+    """
+    Requeue the running jobs whose worker has not been heard from for
+    `timeout` seconds, or fail those claimed MAX_ATTEMPTS times already.
+    Return the number requeued and failed.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=timeout)
+    stale = Job.objects.filter(status='running').filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+    # The status filter keeps a job another worker finished meanwhile as it is
+    requeued = stale.filter(attempts__lt=MAX_ATTEMPTS).update(
+        status='queued', started_at=None, heartbeat_at=None, progress=0,
+        message="Requeued: the worker running it stopped.",
+    )
+    failed = stale.update(
+        status='failed', finished_at=now,
+        message=f"Abandoned by a stopped worker {MAX_ATTEMPTS} times. Queue it again to retry.",
+    )
+    if requeued or failed:
+        logger.warning("Recovered abandoned jobs: %s requeued, %s failed", requeued, failed)
+    return requeued, failed
+
+
+def run_job(job):
+    """Run one claimed job to completion, recording success or failure"""
+    progress = JobProgress(job)
+    try:
+        with audit.acting_as(job.created_by):
+            message = JOB_HANDLERS[job.kind](job, progress)
+    except Exception:
+        logger.exception("Job %s failed", job.pk)
+        Job.objects.filter(pk=job.pk).update(
+            status='failed',
+            message=traceback.format_exc(),
+            finished_at=timezone.now(),
+        )
+    else:
+        job.refresh_from_db(fields=['progress', 'total', 'result_file'])
+        Job.objects.filter(pk=job.pk).update(
+            status='done',
+            progress=job.total if job.total is not None else job.progress,
+            message=message or '',
+            finished_at=timezone.now(),
+        )
+    finally:
+        close_old_connections()
+
+
+def export_csv_job(job, progress):
+    """Write the filtered CSV export to MEDIA_ROOT/exports/"""
+    queryset = filter_employees(Employee.objects.all(), job.params)
+    total = queryset.count()
+    progress(0, total, force=True)
+
+    name = f"exports/employees_{timezone.now().strftime('%Y%m%d_%H%M')}_job{job.pk}.csv"
+    path = Path(settings.MEDIA_ROOT) / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    written = 0
+    writer = csv.writer(Echo())
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        file.write(writer.writerow(EXPORT_HEADERS))
+        for row in iter_export_rows(queryset):
+            file.write(writer.writerow(format_export_row(row)))
+            written += 1
+            if written % 1000 == 0:
+                progress(written)
+
+    Job.objects.filter(pk=job.pk).update(result_file=name, progress=written, total=written)
+    return f"Exported {written} employees."
+
+
+def import_job(job, progress):
+    """Import an uploaded file saved in default storage"""
+    name = job.params['file']
+    try:
+        with default_storage.open(name, 'rb') as file:
+            result = imports.import_employees(
+                imports.read_rows(file, name),
+                progress=lambda result: progress(result.created + result.failed),
+            )
+    finally:
+        default_storage.delete(name)
+
+    processed = result.created + result.failed
+    progress(processed, processed, force=True)
+    summary = f"Imported {result.created} employees, {result.failed} rows rejected."
+    errors = '\n'.join(f"Row {row_number}: {message}" for row_number, message in result.errors[:200])
+    return f"{summary}\n{errors}" if errors else summary
+
+
+def bulk_delete_job(job, progress):
+    """Delete the selected employees in short set-based transactions"""
+    queryset = bulk.select_employees(job.params)
+    progress(0, queryset.count(), force=True)
+    deleted = bulk.delete_employees(queryset, progress=progress)
+    return f"Deleted {deleted} employees."
+
+
+def bulk_update_job(job, progress):
+    """Reassign fields of the selected employees in short transactions"""
+    queryset = bulk.select_employees(job.params)
+    changes = bulk.clean_changes(job.params['changes'])
+    progress(0, queryset.count(), force=True)
+    updated = bulk.update_employees(queryset, changes, progress=progress)
+    fields = ', '.join(f"{field}={value}" for field, value in changes.items())
+    return f"Updated {updated} employees ({fields})."
+
+
+def thumbnails_job(job, progress):
+    """Generate resized variants for the given profile pictures"""
+    names = job.params.get('names', [])
+    progress(0, len(names), force=True)
+    written = 0
+    for done, name in enumerate(names, start=1):
+        if default_storage.exists(name):
+            written += images.generate_variants(name, force=job.params.get('force', False))
+        progress(done)
+    # Cached rows and detail pages still point at the original pictures
+    fragments.invalidate_pictures(names)
+    return f"Wrote {written} picture variants for {len(names)} pictures."
+
+
+def reports_job(job, progress):
+    """Write per-department or per-state XLSX/PDF reports as one ZIP to MEDIA_ROOT/exports/"""
+    report_format = job.params.get('format', 'xlsx')
+    by = job.params.get('by', 'department')
+    name = f"exports/reports_{report_format}_by_{by}_{timezone.now().strftime('%Y%m%d_%H%M')}_job{job.pk}.zip"
+    path = Path(settings.MEDIA_ROOT) / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    files, written = reports.generate(
+        path, report_format, by, job.params,
+        progress=lambda done, total: progress(done, total, force=done == 0),
+    )
+    Job.objects.filter(pk=job.pk).update(result_file=name, progress=written, total=written)
+    return f"Wrote {files} {report_format.upper()} files by {by} for {written} employees."
+
+
+JOB_HANDLERS = {
+    'export_csv': export_csv_job,
+    'import': import_job,
+    'bulk_delete': bulk_delete_job,
+    'bulk_update': bulk_update_job,
+    'thumbnails': thumbnails_job,
+    'reports': reports_job,
+}
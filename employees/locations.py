@@ -0,0 +1,91 @@
+"""
+In-memory Nigerian location hierarchy (state -> LGA -> ward).
+
+The hierarchy is read from static/json/full.json once per process and
+indexed by lower-cased name, so lookups are case-insensitive dictionary
+hits. It backs the small cached JSON endpoints used by the employee forms
+and the server-side validation of state/LGA/ward.
+"""
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+
+LOCATIONS_FILE = Path(__file__).resolve().parent / 'static' / 'json' / 'full.json'
+
+# Data file spellings replaced by the ones the forms (and stored records) use
+STATE_NAMES = {
+    'Nassarawa': 'Nasarawa',
+}
+
+# Other spellings accepted for a state, by lower-cased name
+STATE_ALIASES = {
+    'nassarawa': 'nasarawa',
+    'fct': 'fct(abuja)',
+    'abuja': 'fct(abuja)',
+}
+
+
+class LocationError(ValueError):
+    """Raised when a state, LGA or ward is not part of the hierarchy"""
+
+
+def _key(name):
+    return ' '.join(str(name or '').split()).lower()
+
+
+class LocationIndex:
+    """Case-insensitive index over the state -> LGA -> ward hierarchy"""
+
+    def __init__(self, data, version=''):
+        self.version = version
+        self._states = {}
+        for state, lgas in data.items():
+            state = STATE_NAMES.get(state, state)
+            lga_index = {}
+            for lga, wards in lgas.items():
+                lga_index[_key(lga)] = (lga, tuple(wards), {_key(ward): ward for ward in wards})
+            self._states[_key(state)] = (state, lga_index)
+
+    @classmethod
+    def from_file(cls, path=LOCATIONS_FILE):
+        content = Path(path).read_bytes()
+        return cls(json.loads(content), version=hashlib.md5(content).hexdigest())
+
+    def _state(self, state):
+        key = _key(state)
+        entry = self._states.get(key) or self._states.get(STATE_ALIASES.get(key, ''))
+        if entry is None:
+            raise LocationError(f"Unknown state '{state}'.")
+        return entry
+
+    def _lga(self, state, lga):
+        state_name, lgas = self._state(state)
+        entry = lgas.get(_key(lga))
+        if entry is None:
+            raise LocationError(f"'{lga}' is not an LGA of {state_name}.")
+        return entry
+
+    def states(self):
+        return [name for name, _ in self._states.values()]
+
+    def lgas(self, state):
+        return [name for name, _, _ in self._state(state)[1].values()]
+
+    def wards(self, state, lga):
+        return list(self._lga(state, lga)[1])
+
+    def clean(self, state, lga, ward):
+        """Return the canonical (state, lga, ward) spelling, or raise LocationError"""
+        state_name = self._state(state)[0]
+        lga_name, _, wards = self._lga(state, lga)
+        ward_name = wards.get(_key(ward))
+        if ward_name is None:
+            raise LocationError(f"'{ward}' is not a ward of {lga_name}, {state_name}.")
+        return state_name, lga_name, ward_name
+
+
+@lru_cache(maxsize=1)
+def get_index():
+    """The process-wide location index, loaded on first use"""
+    return LocationIndex.from_file()
@@ -0,0 +1,240 @@
+"""
+Cached access to the department, role and location lookup tables.
+
+Employees keep integer keys into small lookup tables. Names resolve to
+ids, and ids back to names, through per-process dictionaries. A miss
+queries that one name, and a name that is not stored is remembered as
+missing for MISSING_TIMEOUT, so repeated unknown names (say, a filter
+query string) do not query again. Lookup rows are never renamed or
+deleted while employees use them, so an entry never goes stale. Names are
+matched ignoring case and extra spaces, so 'it ' and 'IT' share one row.
+
+Only the admin paths (edits, bulk edits, imports, the API) add lookup
+rows; anything else gets UnknownLookupError for a name that is not stored.
+
+Dropdown choices are kept in the default cache for CHOICES_TIMEOUT, so
+lookups added by other processes show up in a few minutes.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .models import LGA, Department, Role, State, Ward
+
+# Employee fields backed by a lookup table
+LOOKUP_MODELS = {
+    'department': Department,
+    'role': Role,
+    'state': State,
+    'lga': LGA,
+    'ward': Ward,
+}
+
+# Looked up by name alone; the location fields resolve together (see location_ids)
+NAMED_FIELDS = ['department', 'role']
+LOCATION_FIELDS = ['state', 'lga', 'ward']
+
+CHOICES_TIMEOUT = 300
+
+# Seconds a name that is not stored is answered from memory; rows added by
+# other processes are seen after that. At most MISSING_MAX names are kept.
+MISSING_TIMEOUT = 60
+MISSING_MAX = 10_000
+
+_ids = {}        # (field, normalized name) -> id
+_locations = {}  # (normalized state, lga, ward) -> (state id, lga id, ward id)
+_names = {}      # (field, id) -> name
+_missing = {}    # key of _ids or _locations -> time.monotonic() of the miss
+
+
+class UnknownLookupError(ValueError):
+    """Raised when a name is not in its lookup table and may not be added there"""
+
+
+def _clean(name):
+    return ' '.join(str(name or '').split())
+
+
+def _normal(name):
+    return _clean(name).casefold()
+
+
+def clear():
+    """Forget every cached lookup, e.g. after switching to another database"""
+    _ids.clear()
+    _locations.clear()
+    _names.clear()
+    _missing.clear()
+    cache.delete_many([_choices_key(field) for field in LOOKUP_MODELS])
+
+
+def _load(field):
+    for pk, name in LOOKUP_MODELS[field].objects.order_by('-pk').values_list('pk', 'name'):
+        # Lowest id wins among names that only differ in case
+        _ids[(field, _normal(name))] = pk
+        _names[(field, pk)] = name
+
+
+def _load_locations():
+    wards = Ward.objects.values_list('lga__state_id', 'lga__state__name', 'lga_id', 'lga__name', 'id', 'name')
+    for state_id, state, lga_id, lga, ward_id, ward in wards.order_by('-id').iterator(chunk_size=2000):
+        _locations[(_normal(state), _normal(lga), _normal(ward))] = (state_id, lga_id, ward_id)
+        _names.update({('state', state_id): state, ('lga', lga_id): lga, ('ward', ward_id): ward})
+
+
+def preload():
+    """Load every lookup table now rather than on the first miss"""
+    for field in NAMED_FIELDS:
+        _load(field)
+    _load_locations()
+
+
+def _invalidate_choices(field):
+    cache.delete(_choices_key(field))
+
+
+def _known_missing(key):
+    missed = _missing.get(key)
+    return missed is not None and time.monotonic() - missed < MISSING_TIMEOUT
+
+
+def _remember_missing(key):
+    if len(_missing) >= MISSING_MAX:
+        _missing.clear()
+    _missing[key] = time.monotonic()
+
+
+def _fetch(field, name):
+    """Cache the row named `name` (ignoring case) if there is one"""
+    row = LOOKUP_MODELS[field].objects.filter(name__iexact=_clean(name)).order_by('pk').values_list('pk', 'name').first()
+    if row is not None:
+        pk, stored = row
+        _ids[(field, _normal(name))] = pk
+        _names[(field, pk)] = stored
+
+
+def _fetch_location(state, lga, ward):
+    """Cache the ward (with its LGA and state) named by the three names, if there is one"""
+    row = Ward.objects.filter(
+        name__iexact=_clean(ward), lga__name__iexact=_clean(lga), lga__state__name__iexact=_clean(state),
+    ).order_by('pk').values_list('lga__state_id', 'lga__state__name', 'lga_id', 'lga__name', 'id', 'name').first()
+    if row is not None:
+        state_id, state_name, lga_id, lga_name, ward_id, ward_name = row
+        _locations[(_normal(state), _normal(lga), _normal(ward))] = (state_id, lga_id, ward_id)
+        _names.update({('state', state_id): state_name, ('lga', lga_id): lga_name, ('ward', ward_id): ward_name})
+
+
+def get_id(field, name, create=False):
+    """The id of a department or role name (created if missing and `create` is set), or None"""
+    key = (field, _normal(name))
+    if not key[1]:
+        return None
+    if key not in _ids and not _known_missing(key):
+        _fetch(field, name)
+        if key not in _ids:
+            _remember_missing(key)
+    if key not in _ids and create:
+        name = _clean(name)
+        model = LOOKUP_MODELS[field]
+        try:
+            with transaction.atomic():
+                pk = model.objects.create(name=name).pk
+        except IntegrityError:
+            # Created by another process in the meantime
+            pk = model.objects.get(name=name).pk
+        _ids[key] = pk
+        _names[(field, pk)] = name
+        _missing.pop(key, None)
+        _invalidate_choices(field)
+    return _ids.get(key)
+
+
+def location_ids(state, lga, ward, create=False):
+    """(state id, LGA id, ward id) of a location, or Nones when it is not stored (and not `create`)"""
+    key = (_normal(state), _normal(lga), _normal(ward))
+    if not all(key):
+        return None, None, None
+    if key not in _locations and not _known_missing(key):
+        _fetch_location(state, lga, ward)
+        if key not in _locations:
+            _remember_missing(key)
+    if key not in _locations and create:
+        _locations[key] = _create_location(state, lga, ward)
+        _missing.pop(key, None)
+    return _locations.get(key, (None, None, None))
+
+
+def _create_location(state, lga, ward):
+    state, lga, ward = (_clean(name) for name in (state, lga, ward))
+    with transaction.atomic():
+        state_row = State.objects.filter(name__iexact=state).first() or State.objects.create(name=state)
+        lga_row = LGA.objects.filter(state=state_row, name__iexact=lga).first() or \
+            LGA.objects.create(state=state_row, name=lga)
+        ward_row = Ward.objects.filter(lga=lga_row, name__iexact=ward).first() or \
+            Ward.objects.create(lga=lga_row, name=ward)
+    _names.update({('state', state_row.pk): state_row.name, ('lga', lga_row.pk): lga_row.name,
+                   ('ward', ward_row.pk): ward_row.name})
+    _invalidate_choices('state')
+    return state_row.pk, lga_row.pk, ward_row.pk
+
+
+def lookup_ids(values, create=False):
+    """
+    The foreign key values for the lookup names in `values`:
+    {'department': 'IT', 'state': ..., 'lga': ..., 'ward': ...} ->
+    {'department_id': 3, 'state_id': ..., 'lga_id': ..., 'ward_id': ...}.
+    Location fields must come together. Names not stored yet are added
+    with `create`, and raise UnknownLookupError without it.
+    """
+    ids = {}
+    for field in NAMED_FIELDS:
+        if field in values:
+            ids[f'{field}_id'] = pk = get_id(field, values[field], create=create)
+            if pk is None and _normal(values[field]):
+                raise UnknownLookupError(f"Unknown {field} '{_clean(values[field])}'.")
+    if any(field in values for field in LOCATION_FIELDS):
+        names = [values.get(field) for field in LOCATION_FIELDS]
+        location = location_ids(*names, create=create)
+        if location[0] is None and all(_normal(name) for name in names):
+            raise UnknownLookupError(f"Unknown location '{', '.join(_clean(name) for name in reversed(names))}'.")
+        ids.update({f'{field}_id': pk for field, pk in zip(LOCATION_FIELDS, location)})
+    return ids
+
+
+def name(field, pk):
+    """The name of a lookup row, or None"""
+    return names(field, [pk]).get(pk)
+
+
+def names(field, pks):
+    """{id: name} of the given lookup rows"""
+    missing = [pk for pk in pks if pk and (field, pk) not in _names]
+    if missing:
+        rows = LOOKUP_MODELS[field].objects.filter(pk__in=missing).values_list('pk', 'name')
+        _names.update(((field, pk), name) for pk, name in rows)
+    return {pk: _names[(field, pk)] for pk in pks if (field, pk) in _names}
+
+
+def _choices_key(field):
+    return f'lookups:{field}:choices'
+
+
+def choices(field):
+    """Sorted names of a department, role or state lookup table, for dropdowns"""
+    key = _choices_key(field)
+    values = cache.get(key)
+    if values is None:
+        values = list(LOOKUP_MODELS[field].objects.order_by('name').values_list('name', flat=True))
+        cache.set(key, values, CHOICES_TIMEOUT)
+    return values
+
+
+async def achoices(field):
+    """Async choices()"""
+    key = _choices_key(field)
+    values = await cache.aget(key)
+    if values is None:
+        values = [value async for value in LOOKUP_MODELS[field].objects.order_by('name').values_list('name', flat=True)]
+        await cache.aset(key, values, CHOICES_TIMEOUT)
+    return values
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from employees import audit
+
+
+class Command(BaseCommand):
+    help = "Move audit events older than --days to gzipped JSON lines files, one per month"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help="Keep events newer than this in the database")
+        parser.add_argument('--output-dir', default=settings.AUDIT_ARCHIVE_DIR, help="Directory of the monthly files")
+        parser.add_argument('--database', default='default', help="Database alias to archive")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        archived = audit.archive_before(cutoff, options['output_dir'], using=options['database'])
+        for month, count in sorted(archived.items()):
+            self.stdout.write(f"  {month}: {count} events")
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {sum(archived.values())} audit events to {options['output_dir']}."
+        ))
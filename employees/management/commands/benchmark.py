@@ -0,0 +1,111 @@
+import json
+import os
+import tempfile
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from employees import benchmarks
+from employees.models import Employee
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the employee views on synthetic data sets of increasing size. "
+        "Runs against a scratch database, never the configured one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                            help="Employee counts to benchmark at, smallest first")
+        parser.add_argument('--repeat', type=int, default=10, help="Timed requests per scenario")
+        parser.add_argument('--seed', type=int, default=0, help="Seed for the synthetic data")
+        parser.add_argument('--scenarios', nargs='+', help="Only run these scenarios")
+        parser.add_argument('--database', help="Scratch SQLite file (default: a temporary file)")
+        parser.add_argument('--keepdb', action='store_true',
+                            help="Keep the scratch database and reuse the rows it already has")
+        parser.add_argument('--output', help="Result file (default: benchmark-<timestamp>.json)")
+        parser.add_argument('--compare', help="Earlier result file to compare medians against")
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['sizes'])
+        scenarios = benchmarks.default_scenarios()
+        if options['scenarios']:
+            unknown = set(options['scenarios']) - {scenario.name for scenario in scenarios}
+            if unknown:
+                raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+            scenarios = [scenario for scenario in scenarios if scenario.name in options['scenarios']]
+
+        previous = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as file:
+                    previous = json.load(file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read {options['compare']}: {e}")
+
+        started = datetime.now()
+        output = options['output'] or f"benchmark-{started:%Y%m%d-%H%M%S}.json"
+        database = options['database'] or os.path.join(tempfile.gettempdir(), 'employees-benchmark.sqlite3')
+
+        report = {
+            'started_at': started.isoformat(timespec='seconds'),
+            'environment': benchmarks.environment(),
+            'repeat': options['repeat'],
+            'seed': options['seed'],
+            'sizes': {},
+        }
+        self.stdout.write(f"Preparing scratch database {database}...")
+        with benchmarks.scratch_database(database, keepdb=options['keepdb']):
+            client = benchmarks.benchmark_client()
+            for size in sizes:
+                generate_seconds = self._grow(size, options['seed'])
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{size:,} employees"))
+                results = benchmarks.run_scenarios(
+                    client, options['repeat'], scenarios, seed=options['seed'], log=self._log
+                )
+                report['sizes'][str(size)] = {'generate_seconds': generate_seconds, 'scenarios': results}
+                # Written after every size so an interrupted run keeps what it measured
+                with open(output, 'w') as file:
+                    json.dump(report, file, indent=2)
+
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+        if previous:
+            self._compare(previous, report)
+
+    def _grow(self, size, seed):
+        """Add synthetic employees until the scratch database holds `size`"""
+        missing = size - Employee.objects.count()
+        if missing <= 0:
+            return 0
+        last = Employee.objects.filter(employee_id__regex=r'^BENCH-\d{7}$').order_by('-employee_id') \
+            .values_list('employee_id', flat=True).first()
+        start = int(last.split('-')[1]) + 1 if last else 0
+
+        self.stdout.write(f"Generating {missing:,} employees...")
+        elapsed = benchmarks.generate_employees(missing, start=start, seed=seed)
+        self.stdout.write(f"  {elapsed:.1f}s ({missing / elapsed:,.0f} rows/s)")
+        return elapsed
+
+    def _log(self, name, result):
+        self.stdout.write(
+            f"  {name:<26} p50 {result['p50'] * 1000:9.1f} ms  p95 {result['p95'] * 1000:9.1f} ms  "
+            f"{result['queries']:4d} queries  {result['peak_memory_bytes'] / 1048576:8.1f} MiB peak"
+        )
+
+    def _compare(self, previous, report):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Median change since {previous.get('started_at')}"))
+        for size, current in report['sizes'].items():
+            before = previous.get('sizes', {}).get(size)
+            if not before:
+                continue
+            self.stdout.write(f"{int(size):,} employees")
+            for name, result in current['scenarios'].items():
+                old = before['scenarios'].get(name)
+                if not old:
+                    continue
+                change = (result['p50'] - old['p50']) / old['p50'] * 100 if old['p50'] else 0
+                style = self.style.ERROR if change > 10 else self.style.SUCCESS if change < -10 else str
+                self.stdout.write(style(
+                    f"  {name:<26} {old['p50'] * 1000:9.1f} ms -> {result['p50'] * 1000:9.1f} ms  ({change:+.0f}%)"
+                ))
@@ -0,0 +1,26 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from employees import images
+from employees.models import Employee
+
+
+class Command(BaseCommand):
+    help = "Delete profile picture files (and variants) no longer referenced by any employee"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="List orphaned files without deleting them")
+
+    def handle(self, *args, **options):
+        referenced = set(
+            Employee.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+            .values_list('profile_picture', flat=True)
+        )
+        orphans = images.find_orphans(referenced)
+        for path in orphans:
+            self.stdout.write(path)
+            if not options['dry_run']:
+                default_storage.delete(path)
+
+        action = "Found" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{action} {len(orphans)} orphaned files."))
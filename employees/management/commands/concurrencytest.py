@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand
+
+from employees import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare one ASGI worker with one synchronous worker serving many concurrent "
+        "superuser sessions while a CSV export is streaming. Runs against a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, nargs='+', default=[1, 8, 32],
+                            help="Concurrent page-reading sessions, one run per value")
+        parser.add_argument('--exporters', type=int, default=1, help="Sessions downloading the CSV export")
+        parser.add_argument('--seconds', type=float, default=10, help="Duration of each run")
+        parser.add_argument('--employees', type=int, default=10_000, help="Rows generated before the runs")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        database = os.path.join(tempfile.gettempdir(), 'employees-concurrency.sqlite3')
+        results = []
+        with benchmarks.scratch_database(database):
+            benchmarks.generate_employees(options['employees'], seed=options['seed'])
+            for sessions in options['sessions']:
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f"{sessions} sessions, {options['exporters']} exporting"
+                ))
+                run = {}
+                for server, runner in (('sync', benchmarks.run_sync_worker), ('asgi', benchmarks.run_concurrency)):
+                    result = runner(sessions, options['seconds'], exporters=options['exporters'], seed=options['seed'])
+                    run[server] = result
+                    self.stdout.write(
+                        f"  {server:<5} {result['throughput']:8.1f} pages/s  {result['exports']} exports  "
+                        f"{result['errors']} errors  p50 {result['p50'] * 1000:.1f} ms  "
+                        f"p95 {result['p95'] * 1000:.1f} ms"
+                    )
+                results.append(run)
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({'environment': benchmarks.environment(), 'options': {
+                    key: options[key] for key in ('sessions', 'exporters', 'seconds', 'employees', 'seed')
+                }, 'runs': results}, file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
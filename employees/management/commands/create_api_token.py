@@ -0,0 +1,23 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from employees import api
+
+
+class Command(BaseCommand):
+    help = "Issue an API token for a superuser and print its key (shown only once)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help="Superuser the token acts as")
+        parser.add_argument('--name', default='API client', help="What the token is for, shown in the admin")
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"No user named '{options['username']}'.")
+        if not user.is_superuser:
+            raise CommandError(f"'{user.username}' is not a superuser; the API only answers superusers.")
+        key = api.create_token(user, options['name'])
+        self.stdout.write(self.style.SUCCESS(f"Token '{options['name']}' for {user.username}:"))
+        self.stdout.write(key)
+        self.stdout.write("Send it as 'Authorization: Bearer <key>'. Delete the token in the admin to revoke it.")
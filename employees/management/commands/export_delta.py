@@ -0,0 +1,35 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from employees.api import parse_updated_since
+from employees.exports import DELTA_FORMATS, stream_delta
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the employees created or updated since a watermark, plus tombstones of deleted ones. "
+        "The watermark to pass next time is printed to stderr."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', required=True, help="Watermark of the previous sync (ISO 8601)")
+        parser.add_argument('--format', choices=DELTA_FORMATS, default='csv')
+        parser.add_argument('--output', help="File to write (default: stdout)")
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_updated_since(options['since'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        watermark = timezone.now()
+        file = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for line in stream_delta(since, options['format']):
+                file.write(line)
+        finally:
+            if file is not sys.stdout:
+                file.close()
+        self.stderr.write(f"Next watermark: {watermark.isoformat()}")
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from employees import reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Write XLSX workbooks or PDF rosters with one file per department or state, "
+        "generated in parallel worker processes and packed into a ZIP."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=reports.REPORT_FORMATS, default='xlsx')
+        parser.add_argument('--by', choices=reports.SHARD_FIELDS, default='department',
+                            help="One file per department or per state (default: department)")
+        parser.add_argument('--department', help="Only this department")
+        parser.add_argument('--date-from', help="Only employees created on or after this date (YYYY-MM-DD)")
+        parser.add_argument('--date-to', help="Only employees created on or before this date (YYYY-MM-DD)")
+        parser.add_argument('--workers', type=int, help="Worker processes (default: one per core)")
+        parser.add_argument('--part-rows', type=int, default=reports.PART_ROWS,
+                            help=f"Employees per file before a shard is split into parts (default: {reports.PART_ROWS})")
+        parser.add_argument('--output', help="ZIP file to write (default: reports_<format>_by_<by>_<time>.zip)")
+
+    def handle(self, *args, **options):
+        if options['part_rows'] < 1:
+            raise CommandError("--part-rows must be at least 1.")
+        output = options['output'] or (
+            f"reports_{options['format']}_by_{options['by']}_{timezone.now().strftime('%Y%m%d_%H%M')}.zip"
+        )
+        params = {key: options[key] or '' for key in ('department', 'date_from', 'date_to')}
+
+        def progress(done, total):
+            self.stdout.write(f"  {done}/{total} employees", ending='\r')
+            self.stdout.flush()
+
+        start = time.perf_counter()
+        files, written = reports.generate(
+            output, options['format'], options['by'], params,
+            workers=options['workers'], progress=progress, part_rows=options['part_rows'],
+        )
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {files} files for {written} employees to {output} in {time.perf_counter() - start:.1f}s"
+        ))
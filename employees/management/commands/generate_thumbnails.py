@@ -0,0 +1,33 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from employees import fragments, images
+from employees.models import Employee
+
+
+class Command(BaseCommand):
+    help = "Generate missing profile picture variants (thumbnail, detail size, WebP) for existing employees"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Regenerate variants that already exist")
+
+    def handle(self, *args, **options):
+        names = (
+            Employee.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+            .values_list('profile_picture', flat=True).distinct()
+        )
+        pictures = written = missing = 0
+        for name in names.iterator():
+            if not default_storage.exists(name):
+                missing += 1
+                self.stderr.write(f"Missing original: {name}")
+                continue
+            written += images.generate_variants(name, force=options['force'])
+            pictures += 1
+        if written:
+            # Cached rows and detail pages still point at the original pictures
+            fragments.fragment_cache().clear()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {pictures} pictures, wrote {written} variants ({missing} originals missing)."
+        ))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from employees import imports
+
+
+class Command(BaseCommand):
+    help = "Import employees from a CSV or Excel (.xlsx) file using batched inserts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or .xlsx file to import")
+        parser.add_argument('--batch-size', type=int, default=imports.IMPORT_BATCH_SIZE,
+                            help="Rows validated and inserted per transaction")
+        parser.add_argument('--max-errors', type=int, default=50, help="Row errors to print")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        started = time.perf_counter()
+        try:
+            with open(path, 'rb') as file:
+                result = imports.import_employees(
+                    imports.read_rows(file, path), batch_size=options['batch_size']
+                )
+        except OSError as e:
+            raise CommandError(f"Could not read {path}: {e}")
+
+        elapsed = time.perf_counter() - started
+        for row_number, message in result.errors[:options['max_errors']]:
+            self.stderr.write(f"Row {row_number}: {message}")
+        if len(result.errors) > options['max_errors']:
+            self.stderr.write(f"... and {len(result.errors) - options['max_errors']} more errors")
+
+        rate = result.created / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} employees ({result.failed} rows rejected) "
+            f"in {elapsed:.1f}s - {rate:.0f} rows/s."
+        ))
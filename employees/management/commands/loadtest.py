@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from employee_management.database import PROFILES, sqlite_database
+from employees import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare database profiles under concurrent reads and form submissions. "
+        "Each profile runs against its own scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', default=['default', 'production'],
+                            help=f"Profiles to compare ({', '.join(PROFILES)})")
+        parser.add_argument('--workers', type=int, default=8, help="Concurrent client processes")
+        parser.add_argument('--seconds', type=float, default=15, help="Duration of each run")
+        parser.add_argument('--employees', type=int, default=10_000, help="Rows generated before each run")
+        parser.add_argument('--write-share', type=float, default=0.2,
+                            help="Fraction of requests that are employee form posts")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        unknown = set(options['profiles']) - set(PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profiles: {', '.join(sorted(unknown))}")
+
+        results = {}
+        for profile in options['profiles']:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"Profile '{profile}'"))
+            database = os.path.join(tempfile.gettempdir(), f'employees-loadtest-{profile}.sqlite3')
+            original = self._use_profile(profile)
+            try:
+                with benchmarks.scratch_database(database):
+                    benchmarks.generate_employees(options['employees'], seed=options['seed'])
+                    result = benchmarks.run_load(
+                        options['workers'], options['seconds'],
+                        write_share=options['write_share'], seed=options['seed'],
+                    )
+            finally:
+                self._restore(original)
+            results[profile] = result
+            self.stdout.write(
+                f"  {result['throughput']:8.1f} req/s  {result['requests']} requests "
+                f"({result['writes']} writes)  {result['errors']} errors, {result['locked']} 'database is locked'  "
+                f"p50 {result['p50'] * 1000:.1f} ms  p95 {result['p95'] * 1000:.1f} ms"
+            )
+
+        if len(results) > 1:
+            baseline_name = options['profiles'][0]
+            baseline = results[baseline_name]['throughput']
+            for profile, result in list(results.items())[1:]:
+                gain = result['throughput'] / baseline if baseline else 0
+                self.stdout.write(self.style.SUCCESS(
+                    f"'{profile}' throughput is {gain:.2f}x '{baseline_name}'"
+                ))
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({'environment': benchmarks.environment(), 'options': {
+                    key: options[key] for key in ('workers', 'seconds', 'employees', 'write_share', 'seed')
+                }, 'profiles': results}, file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def _use_profile(self, profile):
+        """Switch every configured connection to the profile; return the settings to restore"""
+        original = {}
+        for alias in connections:
+            settings_dict = connections[alias].settings_dict
+            original[alias] = {key: settings_dict.get(key) for key in ('OPTIONS', 'CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+            configured = sqlite_database(settings_dict['NAME'], profile, read_only=alias != 'default')
+            for key in original[alias]:
+                settings_dict[key] = configured[key]
+            connections[alias].close()
+        return original
+
+    def _restore(self, original):
+        for alias, values in original.items():
+            connections[alias].close()
+            connections[alias].settings_dict.update(values)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from employees import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily employee statistics rollup from the employees table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help="Database alias to rebuild")
+
+    def handle(self, *args, **options):
+        count = rollups.rebuild_daily_stats(using=options['database'])
+        # Cached dashboards (keyed on employee changes) catch up within the dashboard cache TIMEOUT
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} daily statistics groups."))
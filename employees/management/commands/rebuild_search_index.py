@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from employees import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text employee search index from the employees table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help="Database alias to rebuild")
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not search.fts_enabled(using):
+            raise CommandError("The search index table does not exist - run migrate on an SQLite database first.")
+        count = search.rebuild_index(using=using)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} employees."))
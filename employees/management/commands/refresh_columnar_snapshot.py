@@ -0,0 +1,27 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from employees import columnar
+
+
+class Command(BaseCommand):
+    help = (
+        "Update the columnar employee snapshot (COLUMNAR_SNAPSHOT_PATH) used by the dashboard and "
+        "/analytics/. Only employees changed since the last run are read; run it periodically, e.g. from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rebuild from the whole table")
+        parser.add_argument('--path', help="Snapshot file (default: COLUMNAR_SNAPSHOT_PATH)")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows, read, deleted, incremental = columnar.refresh(options['path'], full=options['full'])
+        path = Path(options['path'] or columnar.snapshot_path())
+        size = path.stat().st_size / 1048576
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Updated' if incremental else 'Rebuilt'} snapshot {path}: {rows} employees "
+            f"({read} read, {deleted} deleted) in {time.perf_counter() - started:.2f}s, {size:.1f} MiB"
+        ))
@@ -0,0 +1,46 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from employees.routers import REPLICA
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the database to the read snapshot (READ_DATABASE_NAME) used by the read-only views. "
+        "Run it periodically, e.g. from cron; persistent connections pick up a new snapshot "
+        "when they are recycled (CONN_MAX_AGE)."
+    )
+
+    def handle(self, *args, **options):
+        if REPLICA not in settings.DATABASES:
+            raise CommandError(f"No '{REPLICA}' database is configured.")
+        source = connections['default']
+        target = Path(settings.DATABASES[REPLICA]['NAME'])
+        if target.resolve() == Path(source.settings_dict['NAME']).resolve():
+            raise CommandError(
+                "READ_DATABASE_NAME is the main database file; set it to a separate path to use snapshots."
+            )
+
+        started = time.perf_counter()
+        temporary = target.with_name(target.name + '.tmp')
+        source.ensure_connection()
+        snapshot = sqlite3.connect(temporary)
+        try:
+            # Online backup: consistent copy without blocking writers for long
+            source.connection.backup(snapshot, pages=1024)
+            # A self-contained file, readable without -wal/-shm companions
+            snapshot.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            snapshot.close()
+        os.replace(temporary, target)
+
+        size = target.stat().st_size / 1048576
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote snapshot {target} ({size:.1f} MiB) in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,59 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from employees import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (exports, imports, bulk deletes) on a thread pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="Jobs run in parallel")
+        parser.add_argument('--poll', type=float, default=1.0, help="Seconds between queue polls when idle")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty")
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        self.stdout.write(f"Job worker started with {workers} threads.")
+
+        running = {}  # future -> job id
+        last_heartbeat = last_recovery = float('-inf')
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                while True:
+                    now = time.monotonic()
+                    if running and now - last_heartbeat >= jobs.HEARTBEAT_INTERVAL:
+                        jobs.heartbeat(running.values())
+                        last_heartbeat = now
+                    # Jobs left running by a worker that crashed or was restarted
+                    if now - last_recovery >= jobs.HEARTBEAT_INTERVAL:
+                        requeued, failed = jobs.recover_stale_jobs()
+                        if requeued or failed:
+                            self.stdout.write(f"Recovered abandoned jobs: {requeued} requeued, {failed} failed.")
+                        last_recovery = now
+
+                    # Fill free slots with queued jobs
+                    while len(running) < workers:
+                        job = jobs.claim_next_job()
+                        if job is None:
+                            break
+                        self.stdout.write(f"Starting {job}.")
+                        running[pool.submit(jobs.run_job, job)] = job.pk
+                    close_old_connections()
+
+                    if not running:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll'])
+                        continue
+
+                    done, _ = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        del running[future]
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping - waiting for running jobs to finish.")
+
+        self.stdout.write(self.style.SUCCESS("Job worker stopped."))
@@ -0,0 +1,75 @@
+import json
+import statistics
+
+from django.core.management.base import BaseCommand, CommandError
+
+from employees import startup
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure how long a freshly started worker takes to import and to answer its first "
+        "requests, with and without the warm-up (WARM_UP_ON_START), and report import time "
+        "per module. The requests only read from the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entry', choices=startup.ENTRY_POINTS, default='wsgi',
+                            help="Entry point to start (default: wsgi)")
+        parser.add_argument('--paths', nargs='+', default=['/', '/login/'],
+                            help="Requests made after start-up, in order")
+        parser.add_argument('--repeat', type=int, default=5, help="Worker starts per mode")
+        parser.add_argument('--no-wait', action='store_true',
+                            help="Send the first request without waiting for the background warm-up")
+        parser.add_argument('--top', type=int, default=20, help="Slowest modules to list")
+        parser.add_argument('--output', help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        report = {'entry': options['entry'], 'paths': options['paths'], 'modes': {}}
+        for mode, warm_up in (('cold', False), ('warm-up', True)):
+            runs = []
+            for _ in range(options['repeat']):
+                try:
+                    runs.append(startup.profile_start(
+                        options['entry'], warm_up=warm_up, paths=options['paths'], wait=not options['no_wait'],
+                    ))
+                except RuntimeError as e:
+                    raise CommandError(str(e))
+            report['modes'][mode] = summary = self._summarize(runs)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{options['entry']}, {mode} ({options['repeat']} starts, medians)"))
+            self.stdout.write(f"  import entry point   {summary['load_seconds'] * 1000:8.1f} ms")
+            if warm_up:
+                self.stdout.write(f"  background warm-up   {summary['wait_seconds'] * 1000:8.1f} ms")
+            for path, status, seconds in summary['responses']:
+                self.stdout.write(f"  GET {path:<16} {seconds * 1000:8.1f} ms  ({status})")
+
+        # What a worker imports before it can serve, without the warm-up's own imports
+        import_times = report['modes']['cold'].pop('import_times')
+        report['modes']['warm-up'].pop('import_times')
+        report['slowest_imports'] = sorted(import_times, key=lambda row: -row[1])[:options['top']]
+        report['packages'] = startup.package_totals(import_times)
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Slowest modules (self time)"))
+        for module, self_us, cumulative_us in report['slowest_imports']:
+            self.stdout.write(f"  {self_us / 1000:7.1f} ms  {cumulative_us / 1000:7.1f} ms cumulative  {module}")
+        self.stdout.write(self.style.MIGRATE_HEADING("Import time by package"))
+        for package, self_us in list(report['packages'].items())[:options['top']]:
+            self.stdout.write(f"  {self_us / 1000:7.1f} ms  {package}")
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def _summarize(self, runs):
+        """Median timings over the runs; import times from the median-load run"""
+        by_load = sorted(runs, key=lambda run: run['load_seconds'])
+        return {
+            'load_seconds': statistics.median(run['load_seconds'] for run in runs),
+            'wait_seconds': statistics.median(run['wait_seconds'] for run in runs),
+            'responses': [
+                [path, status, statistics.median(run['responses'][index][2] for run in runs)]
+                for index, (path, status, _) in enumerate(runs[0]['responses'])
+            ],
+            'import_times': by_load[len(by_load) // 2]['import_times'],
+        }
@@ -0,0 +1,162 @@
+"""
+In-process request performance metrics.
+
+`PerformanceMiddleware` (employees/middleware.py) records every request
+into the process-wide `registry`: latency, response size, query count,
+total SQL time and repeated queries, labelled by URL name. The superuser
+`metrics` view renders the registry in the Prometheus text format. Each
+process (web worker) keeps its own numbers, so scrape every worker or
+sum across them.
+"""
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds of the histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (1024, 10240, 102400, 1048576, 10485760, 104857600)
+
+
+class Histogram:
+    """Bucketed distribution with a running sum and count"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield _format_number(bound), cumulative
+        yield '+Inf', self.count
+
+
+class QueryRecorder:
+    """Database execute wrapper that counts and times the queries of one request"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = self.clock()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += self.clock() - start
+            self.count += 1
+            # SQL still holds its placeholders, so repeats of a statement with
+            # different parameters (N+1 lookups) count as duplicates too
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+    def most_repeated(self):
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+
+class MetricsRegistry:
+    """Thread-safe per-view aggregates"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._clear()
+
+    def reset(self):
+        with self.lock:
+            self._clear()
+
+    def _clear(self):
+        self.requests = Counter()
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.queries = defaultdict(lambda: Histogram(QUERY_COUNT_BUCKETS))
+        self.response_size = defaultdict(lambda: Histogram(SIZE_BUCKETS))
+        self.sql_seconds = Counter()
+        self.duplicate_queries = Counter()
+        self.slow_requests = Counter()
+
+    def record(self, view, method, status, duration, recorder, size, slow=False):
+        with self.lock:
+            self.requests[(view, method, str(status))] += 1
+            self.latency[(view, method)].observe(duration)
+            self.queries[(view,)].observe(recorder.count)
+            self.sql_seconds[(view,)] += recorder.duration
+            self.duplicate_queries[(view,)] += recorder.duplicates
+            if size is not None:
+                self.response_size[(view,)].observe(size)
+            if slow:
+                self.slow_requests[(view,)] += 1
+
+    def render(self):
+        """The registry in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            _counter(lines, 'employees_http_requests_total', 'Requests served.',
+                     ('view', 'method', 'status'), self.requests)
+            _histogram(lines, 'employees_http_request_duration_seconds', 'Request latency.',
+                       ('view', 'method'), self.latency)
+            _histogram(lines, 'employees_http_response_size_bytes', 'Response body size.',
+                       ('view',), self.response_size)
+            _histogram(lines, 'employees_db_queries_per_request', 'Database queries per request.',
+                       ('view',), self.queries)
+            _counter(lines, 'employees_db_query_seconds_total', 'Time spent executing SQL.',
+                     ('view',), self.sql_seconds)
+            _counter(lines, 'employees_db_duplicate_queries_total', 'Queries repeating an earlier statement of the same request.',
+                     ('view',), self.duplicate_queries)
+            _counter(lines, 'employees_slow_requests_total', 'Requests slower than SLOW_REQUEST_SECONDS.',
+                     ('view',), self.slow_requests)
+        return '\n'.join(lines) + '\n'
+
+
+def _format_number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _counter(lines, name, help_text, label_names, values):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} counter')
+    for labels, value in sorted(values.items()):
+        lines.append(f'{name}{_labels(label_names, labels)} {_format_number(value)}')
+
+
+def _histogram(lines, name, help_text, label_names, histograms):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for labels, histogram in sorted(histograms.items()):
+        for bound, count in histogram.samples():
+            lines.append(f'{name}_bucket{_labels(label_names, labels, [("le", bound)])} {count}')
+        lines.append(f'{name}_sum{_labels(label_names, labels)} {_format_number(histogram.sum)}')
+        lines.append(f'{name}_count{_labels(label_names, labels)} {histogram.count}')
+
+
+registry = MetricsRegistry()
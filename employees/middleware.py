@@ -0,0 +1,226 @@
+import logging
+import os
+from time import perf_counter
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.db import connections
+from django.utils._os import safe_join
+
+from . import assets
+from .audit import acting_as
+from .metrics import QueryRecorder, registry
+
+logger = logging.getLogger('employees.performance')
+
+
+class PerformanceMiddleware:
+    """Record latency, response size and database usage of every request"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFORMANCE_METRICS', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_seconds = getattr(settings, 'SLOW_REQUEST_SECONDS', None)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        start = perf_counter()
+        recorder = QueryRecorder(perf_counter)
+        databases = self._install(recorder)
+
+        try:
+            response = self.get_response(request)
+        except Exception:
+            self._uninstall(databases, recorder)
+            raise
+
+        if response.streaming and not response.is_async and not response.has_header('Content-Length'):
+            # Streamed bodies such as the CSV export run their queries while the
+            # server iterates, so measurement ends when the stream is exhausted
+            response.streaming_content = self._measure_stream(
+                response.streaming_content, request, response, start, recorder, databases
+            )
+        else:
+            self._uninstall(databases, recorder)
+            if response.streaming:
+                size = int(response['Content-Length']) if response.has_header('Content-Length') else None
+            else:
+                size = len(response.content)
+            self._record(request, response, start, recorder, size)
+        return response
+
+    async def __acall__(self, request):
+        start = perf_counter()
+        recorder = QueryRecorder(perf_counter)
+        # Under ASGI the ORM runs in the request's sync_to_async thread, which
+        # has its own connections; install the recorder on those
+        databases = await sync_to_async(self._install)(recorder)
+
+        try:
+            response = await self.get_response(request)
+        except Exception:
+            await sync_to_async(self._uninstall)(databases, recorder)
+            raise
+
+        if response.streaming and not response.has_header('Content-Length'):
+            measure = self._ameasure_stream if response.is_async else self._measure_stream
+            response.streaming_content = measure(
+                response.streaming_content, request, response, start, recorder, databases
+            )
+        else:
+            await sync_to_async(self._uninstall)(databases, recorder)
+            if response.streaming:
+                size = int(response['Content-Length'])
+            else:
+                size = len(response.content)
+            self._record(request, response, start, recorder, size)
+        return response
+
+    def _measure_stream(self, content, request, response, start, recorder, databases):
+        size = 0
+        try:
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            self._uninstall(databases, recorder)
+            self._record(request, response, start, recorder, size)
+
+    async def _ameasure_stream(self, content, request, response, start, recorder, databases):
+        size = 0
+        try:
+            async for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            await sync_to_async(self._uninstall)(databases, recorder)
+            self._record(request, response, start, recorder, size)
+
+    @staticmethod
+    def _install(recorder):
+        databases = list(connections.all())
+        for connection in databases:
+            connection.execute_wrappers.append(recorder)
+        return databases
+
+    @staticmethod
+    def _uninstall(databases, recorder):
+        for connection in databases:
+            if recorder in connection.execute_wrappers:
+                connection.execute_wrappers.remove(recorder)
+
+    def _record(self, request, response, start, recorder, size):
+        duration = perf_counter() - start
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        slow = self.slow_seconds is not None and duration >= self.slow_seconds
+        registry.record(view, request.method, response.status_code, duration, recorder, size, slow)
+
+        if slow:
+            statement, repeats = recorder.most_repeated()
+            logger.warning(
+                "Slow request %s %s (%s) -> %s in %.3fs: %d queries, %.3fs SQL, %d duplicates%s",
+                request.method, request.get_full_path(), view, response.status_code, duration,
+                recorder.count, recorder.duration, recorder.duplicates,
+                f"; repeated {repeats}x: {statement}" if repeats > 1 else '',
+            )
+
+
+class AuditActorMiddleware:
+    """Attribute employee changes made while handling a request to the logged-in user"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # request.user is lazy; it is only loaded if something is recorded
+        with acting_as(request.user):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with acting_as(request.user):
+            return await self.get_response(request)
+
+
+class StaticMediaMiddleware:
+    """
+    Serve collected static files and the public media directories before
+    sessions, authentication and the URLconf are involved (see
+    employees/assets.py for caching, compression and ranges)
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.static_prefix = urlsplit(settings.STATIC_URL or '').path
+        self.media_prefix = urlsplit(settings.MEDIA_URL or '').path
+        self.public_media = tuple(directory.strip('/') + '/' for directory in getattr(settings, 'PUBLIC_MEDIA_DIRS', []))
+        # The manifest is read once; collectstatic runs before workers restart
+        self.immutable = assets.immutable_names(staticfiles_storage)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _file(self, request):
+        """The path of the requested file and the serve_file() caching options, or None"""
+        path = request.path
+        if settings.STATIC_ROOT and self.static_prefix and path.startswith(self.static_prefix):
+            name = path[len(self.static_prefix):]
+            file_path = safe_join(settings.STATIC_ROOT, name)
+            if name not in self.immutable and not os.path.exists(file_path):
+                # Not collected yet (a fresh checkout): the source file, as runserver serves it
+                file_path = finders.find(name) or file_path
+            return file_path, {
+                'immutable': name in self.immutable, 'max_age': settings.STATIC_MAX_AGE,
+            }
+        if self.public_media and self.media_prefix and path.startswith(self.media_prefix):
+            name = path[len(self.media_prefix):]
+            for directory in self.public_media:
+                if name.startswith(directory):
+                    # Joined under the public directory, so '..' cannot reach a private one
+                    file_path = safe_join(os.path.join(settings.MEDIA_ROOT, directory), name[len(directory):])
+                    return file_path, {'max_age': settings.MEDIA_MAX_AGE}
+        return None
+
+    def _serve(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        try:
+            found = self._file(request)
+        except SuspiciousFileOperation:
+            # Outside the directory; the URLconf answers with a 404
+            return None
+        if found is None:
+            return None
+        path, caching = found
+        return assets.serve_file(request, path, **caching)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        # Checking and opening the file blocks, so it happens off the event loop
+        response = await sync_to_async(self._serve)(request)
+        return response or await self.get_response(request)
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# The schema as of this migration, kept here so later changes to
+# employees/search.py cannot change what replaying it creates
+FTS_FIELDS = 'first_name, surname, other_name, email, employee_id, department, role'
+
+CREATE_FTS_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS employees_fts USING fts5("
+    f"{FTS_FIELDS}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS employees_fts_vocab USING fts5vocab(employees_fts, row)",
+]
+
+DROP_FTS_SQL = [
+    "DROP TABLE IF EXISTS employees_fts_vocab",
+    "DROP TABLE IF EXISTS employees_fts",
+]
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite only - other databases use the icontains fallback
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_FTS_SQL:
+        schema_editor.execute(statement)
+    schema_editor.execute(f"INSERT INTO employees_fts(rowid, {FTS_FIELDS}) SELECT id, {FTS_FIELDS} FROM employees")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_FTS_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0002_employee_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
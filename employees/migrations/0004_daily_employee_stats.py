@@ -0,0 +1,45 @@
+# Generated by Django 5.1.2 on 2026-10-18 04:58
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def populate_daily_stats(apps, schema_editor):
+    Employee = apps.get_model('employees', 'Employee')
+    DailyEmployeeStat = apps.get_model('employees', 'DailyEmployeeStat')
+    using = schema_editor.connection.alias
+    groups = Employee.objects.using(using).order_by().annotate(day=TruncDate('created_at')).values(
+        'day', 'department', 'role', 'gender', 'state'
+    ).annotate(count=Count('id'))
+    DailyEmployeeStat.objects.using(using).bulk_create(
+        [DailyEmployeeStat(**group) for group in groups], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0003_employee_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyEmployeeStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('department', models.CharField(max_length=100)),
+                ('role', models.CharField(max_length=100)),
+                ('gender', models.CharField(max_length=10)),
+                ('state', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'employee_daily_stats',
+                'indexes': [models.Index(fields=['department', 'day'], name='daily_stats_department_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'department', 'role', 'gender', 'state'), name='employee_daily_stats_group_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 05:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0006_job_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('export_csv', 'CSV export'), ('import', 'Import'), ('bulk_delete', 'Bulk delete'), ('bulk_update', 'Bulk edit'), ('thumbnails', 'Picture thumbnails')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.1.2 on 2026-10-18 05:30
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+# Keeps the event table append-only below the ORM. Deleting (archive_audit_log)
+# stays possible, and so does clearing the actor when a user is deleted
+# (on_delete=SET_NULL); only the recorded columns are guarded.
+CREATE_TRIGGER_SQL = (
+    "CREATE TRIGGER IF NOT EXISTS employee_audit_events_no_update "
+    "BEFORE UPDATE OF at, action, employee_count, changes ON employee_audit_events "
+    "BEGIN SELECT RAISE(ABORT, 'audit events are append-only'); END"
+)
+DROP_TRIGGER_SQL = "DROP TRIGGER IF EXISTS employee_audit_events_no_update"
+
+
+def create_append_only_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(CREATE_TRIGGER_SQL)
+
+
+def drop_append_only_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(DROP_TRIGGER_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0007_job_bulk_update'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('action', models.CharField(choices=[('update', 'Update'), ('delete', 'Delete')], max_length=10)),
+                ('employee_count', models.PositiveIntegerField(default=1)),
+                ('changes', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'employee_audit_events',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AuditEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employee_pk', models.BigIntegerField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='employees.auditevent')),
+            ],
+            options={
+                'db_table': 'employee_audit_entries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['at'], name='audit_events_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditentry',
+            index=models.Index(fields=['employee_pk', 'event'], name='audit_entries_employee_idx'),
+        ),
+        migrations.RunPython(create_append_only_trigger, drop_append_only_trigger),
+    ]
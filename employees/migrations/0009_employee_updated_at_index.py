@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-18 05:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0008_audit_log'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['updated_at'], name='employees_updated_at_idx'),
+        ),
+    ]
@@ -0,0 +1,405 @@
+# Generated by Django 5.1.2 on 2026-10-18 06:10
+
+import hashlib
+import json
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+# The shipped location hierarchy, and its SHA-256 when the tables were
+# introduced; the hierarchy seeds the tables and corrects stored spellings
+LOCATIONS_FILE = Path(__file__).resolve().parent.parent / 'static' / 'json' / 'full.json'
+LOCATIONS_SHA256 = '1de73ff3f3a8363a299c5fff29f0a98ba1dd46974058b03ffbfbfe582e918f41'
+
+# Data file spellings replaced by the ones the forms used, and other
+# accepted spellings of a state, as employees/locations.py had them
+STATE_NAMES = {
+    'Nassarawa': 'Nasarawa',
+}
+STATE_ALIASES = {
+    'nassarawa': 'nasarawa',
+    'fct': 'fct(abuja)',
+    'abuja': 'fct(abuja)',
+}
+
+# The department and role options of the employee forms when the tables were introduced
+DEPARTMENTS = [
+    'HR', 'Finance', 'IT', 'Sales', 'Marketing', 'Operations', 'Customer Service', 'Administration',
+    'Research and Development', 'Legal', 'Procurement', 'Logistics', 'Public Relations', 'Quality Assurance',
+    'Training and Development', 'Health and Safety', 'Facilities Management', 'Executive Management',
+    'Data Analysis', 'Content Creation', 'Social Media', 'Research', 'Consulting', 'Data Science',
+    'Internship', 'Support', 'Development', 'Management', 'Engineering', 'Accounting', 'Audit',
+    'Customer Relations', 'Technical Support', 'Project Management', 'Business Analysis', 'Service Delivery',
+    'Supply Chain', 'Coordination', 'Other',
+]
+
+ROLES = [
+    'Admin', 'Software Engineer', 'Accountant', 'HR Manager', 'Sales Executive', 'Marketing Specialist',
+    'Customer Support', 'IT Support', 'Operations Manager', 'Cyber Security', 'Project Manager',
+    'Business Analyst', 'Customer Service', 'Procurement Officer', 'Logistics Coordinator',
+    'Public Relations Officer', 'Quality Assurance', 'Training Coordinator', 'Health and Safety Officer',
+    'Facilities Manager', 'Executive Assistant', 'Data Analyst', 'Content Writer', 'Social Media Manager',
+    'Researcher', 'Consultant', 'Data Specialist', 'Cleaner', 'Intern', 'Other',
+]
+
+LOOKUP_FIELDS = ['department', 'role', 'state', 'lga', 'ward']
+
+BATCH_SIZE = 1000
+
+
+def _clean(name):
+    return ' '.join(str(name or '').split())
+
+
+def _normal(name):
+    return _clean(name).casefold()
+
+
+def _key(name):
+    return ' '.join(str(name or '').split()).lower()
+
+
+def _load_locations():
+    data = LOCATIONS_FILE.read_bytes()
+    if hashlib.sha256(data).hexdigest() != LOCATIONS_SHA256:
+        raise RuntimeError(
+            f'{LOCATIONS_FILE} differs from the file this migration was written for; '
+            'check that the seeded hierarchy is still what it should be, then update LOCATIONS_SHA256'
+        )
+    return json.loads(data)
+
+
+def _named_ids(model, standard, stored, using):
+    """
+    Create a lookup row per distinct name and return {stored string: id}.
+    Strings that only differ in case or spacing share a row, named after
+    the standard spelling if there is one, else the most common one.
+    """
+    spellings = defaultdict(Counter)
+    for value, count in stored.items():
+        if _normal(value):
+            spellings[_normal(value)][_clean(value)] += count
+    names = {_normal(name): name for name in standard}
+    for key, counts in spellings.items():
+        names.setdefault(key, counts.most_common(1)[0][0])
+    model.objects.using(using).bulk_create([model(name=name) for name in names.values()], batch_size=BATCH_SIZE)
+    ids = {_normal(name): pk for pk, name in model.objects.using(using).values_list('pk', 'name')}
+    return {value: ids.get(_normal(value)) for value in stored}
+
+
+class _Hierarchy:
+    """The state -> LGA -> ward hierarchy of LOCATIONS_FILE, by lower-cased name"""
+
+    def __init__(self, data):
+        self._states = {}
+        for state, lgas in data.items():
+            state = STATE_NAMES.get(state, state)
+            self._states[_key(state)] = (state, {
+                _key(lga): (lga, tuple(wards), {_key(ward): ward for ward in wards}) for lga, wards in lgas.items()
+            })
+
+    def _state(self, state):
+        key = _key(state)
+        return self._states.get(key) or self._states.get(STATE_ALIASES.get(key, ''))
+
+    def states(self):
+        return [name for name, _ in self._states.values()]
+
+    def lgas(self, state):
+        return [name for name, _, _ in self._state(state)[1].values()]
+
+    def wards(self, state, lga):
+        return list(self._state(state)[1][_key(lga)][1])
+
+    def clean(self, state, lga, ward):
+        """The spelling the forms would have stored, or None for a location outside the hierarchy"""
+        entry = self._state(state)
+        if entry is None or _key(lga) not in entry[1]:
+            return None
+        lga_name, _, wards = entry[1][_key(lga)]
+        if _key(ward) not in wards:
+            return None
+        return entry[0], lga_name, wards[_key(ward)]
+
+
+class _Locations:
+    """State, LGA and ward rows by normalized name, created as they are first asked for"""
+
+    def __init__(self, apps, using):
+        self.using = using
+        self.State = apps.get_model('employees', 'State')
+        self.LGA = apps.get_model('employees', 'LGA')
+        self.Ward = apps.get_model('employees', 'Ward')
+        self.states = {}
+        self.lgas = {}
+        self.wards = {}
+
+    def seed(self, index):
+        """Store the whole hierarchy of full.json, a few statements per table"""
+        states = {}
+        for state in index.states():
+            states.setdefault(_normal(state), state)
+        self.State.objects.using(self.using).bulk_create([self.State(name=name) for name in states.values()])
+        self.states = {_normal(name): pk for pk, name in self.State.objects.using(self.using).values_list('pk', 'name')}
+
+        lgas = {}
+        for state in index.states():
+            for lga in index.lgas(state):
+                lgas.setdefault((self.states[_normal(state)], _normal(lga)), lga)
+        self.LGA.objects.using(self.using).bulk_create(
+            [self.LGA(state_id=state_id, name=name) for (state_id, _), name in lgas.items()], batch_size=BATCH_SIZE
+        )
+        self.lgas = {
+            (state_id, _normal(name)): pk
+            for pk, state_id, name in self.LGA.objects.using(self.using).values_list('pk', 'state_id', 'name')
+        }
+
+        wards = {}
+        for state in index.states():
+            for lga in index.lgas(state):
+                lga_id = self.lgas[(self.states[_normal(state)], _normal(lga))]
+                for ward in index.wards(state, lga):
+                    wards.setdefault((lga_id, _normal(ward)), ward)
+        self.Ward.objects.using(self.using).bulk_create(
+            [self.Ward(lga_id=lga_id, name=name) for (lga_id, _), name in wards.items()], batch_size=BATCH_SIZE
+        )
+        self.wards = {
+            (lga_id, _normal(name)): pk
+            for pk, lga_id, name in self.Ward.objects.using(self.using).values_list('pk', 'lga_id', 'name')
+        }
+
+    def ids(self, state, lga, ward):
+        """(state id, LGA id, ward id) of stored names; parts that are blank stay None"""
+        state_id = lga_id = ward_id = None
+        if _normal(state):
+            state_id = self.states.get(_normal(state))
+            if state_id is None:
+                state_id = self.states[_normal(state)] = self.State.objects.using(self.using).create(
+                    name=_clean(state)
+                ).pk
+            if _normal(lga):
+                lga_id = self.lgas.get((state_id, _normal(lga)))
+                if lga_id is None:
+                    lga_id = self.lgas[(state_id, _normal(lga))] = self.LGA.objects.using(self.using).create(
+                        state_id=state_id, name=_clean(lga)
+                    ).pk
+                if _normal(ward):
+                    ward_id = self.wards.get((lga_id, _normal(ward)))
+                    if ward_id is None:
+                        ward_id = self.wards[(lga_id, _normal(ward))] = self.Ward.objects.using(self.using).create(
+                            lga_id=lga_id, name=_clean(ward)
+                        ).pk
+        return state_id, lga_id, ward_id
+
+
+def populate_lookups(apps, schema_editor):
+    """Seed the lookup tables and point every employee at its rows"""
+    Employee = apps.get_model('employees', 'Employee')
+    using = schema_editor.connection.alias
+    employees = Employee.objects.using(using).order_by()
+
+    department_ids = _named_ids(
+        apps.get_model('employees', 'Department'), DEPARTMENTS,
+        dict(employees.values_list('department').annotate(count=Count('id'))), using,
+    )
+    role_ids = _named_ids(
+        apps.get_model('employees', 'Role'), ROLES,
+        dict(employees.values_list('role').annotate(count=Count('id'))), using,
+    )
+
+    index = _Hierarchy(_load_locations())
+    locations = _Locations(apps, using)
+    locations.seed(index)
+    location_ids = {}
+    for state, lga, ward in employees.values_list('state', 'lga', 'ward').distinct():
+        # Stored spellings that the forms would have corrected
+        canonical = index.clean(state, lga, ward) or (state, lga, ward)
+        location_ids[(state, lga, ward)] = locations.ids(*canonical)
+
+    # Keyset batches, so no read is open on the table while it is updated
+    rows = employees.order_by('id').values_list('id', 'department', 'role', 'state', 'lga', 'ward')
+    assignments = ', '.join(f'{field}_ref_id = %s' for field in LOOKUP_FIELDS)
+    last_id = 0
+    with schema_editor.connection.cursor() as cursor:
+        while batch := list(rows.filter(id__gt=last_id)[:BATCH_SIZE]):
+            cursor.executemany(f"UPDATE {Employee._meta.db_table} SET {assignments} WHERE id = %s", [
+                [department_ids.get(department), role_ids.get(role), *location_ids[(state, lga, ward)], pk]
+                for pk, department, role, state, lga, ward in batch
+            ])
+            last_id = batch[-1][0]
+
+
+def restore_names(apps, schema_editor):
+    """Copy the lookup names back into the text columns"""
+    Employee = apps.get_model('employees', 'Employee')
+    using = schema_editor.connection.alias
+    for field in LOOKUP_FIELDS:
+        Model = Employee._meta.get_field(f'{field}_ref').related_model
+        for pk, name in Model.objects.using(using).values_list('pk', 'name'):
+            Employee.objects.using(using).filter(**{f'{field}_ref': pk}).update(**{field: name})
+
+
+def rebuild_daily_stats(apps, schema_editor):
+    """Recount the rollup table by lookup id (see rollups.rebuild_daily_stats)"""
+    Employee = apps.get_model('employees', 'Employee')
+    DailyEmployeeStat = apps.get_model('employees', 'DailyEmployeeStat')
+    using = schema_editor.connection.alias
+    DailyEmployeeStat.objects.using(using).all().delete()
+    groups = Employee.objects.using(using).order_by().annotate(day=TruncDate('created_at')).values(
+        'day', 'department', 'role', 'gender', 'state'
+    ).annotate(count=Count('id'))
+    DailyEmployeeStat.objects.using(using).bulk_create([
+        DailyEmployeeStat(
+            day=group['day'], department_id=group['department'] or 0, role_id=group['role'] or 0,
+            gender=group['gender'] or '', state_id=group['state'] or 0, count=group['count'],
+        ) for group in groups
+    ], batch_size=BATCH_SIZE)
+
+
+def clear_daily_stats(apps, schema_editor):
+    apps.get_model('employees', 'DailyEmployeeStat').objects.using(schema_editor.connection.alias).all().delete()
+
+
+def rebuild_named_daily_stats(apps, schema_editor):
+    """Recount the rollup table by name, when migrating backwards"""
+    Employee = apps.get_model('employees', 'Employee')
+    DailyEmployeeStat = apps.get_model('employees', 'DailyEmployeeStat')
+    using = schema_editor.connection.alias
+    DailyEmployeeStat.objects.using(using).all().delete()
+    groups = Employee.objects.using(using).order_by().annotate(day=TruncDate('created_at')).values(
+        'day', 'department', 'role', 'gender', 'state'
+    ).annotate(count=Count('id'))
+    DailyEmployeeStat.objects.using(using).bulk_create(
+        [DailyEmployeeStat(**group) for group in groups], batch_size=BATCH_SIZE
+    )
+
+
+def _lookup(name, table, **options):
+    return migrations.CreateModel(
+        name=name,
+        fields=[
+            ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ('name', models.CharField(max_length=100, unique=True)),
+        ],
+        options={'db_table': table, 'ordering': ['name'], 'abstract': False, **options},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0009_employee_updated_at_index'),
+    ]
+
+    operations = [
+        # Reversed last, once the text columns are back
+        migrations.RunPython(migrations.RunPython.noop, rebuild_named_daily_stats),
+        _lookup('Department', 'employee_departments'),
+        _lookup('Role', 'employee_roles'),
+        _lookup('State', 'employee_states'),
+        migrations.CreateModel(
+            name='LGA',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('state', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='lgas', to='employees.state')),
+            ],
+            options={
+                'db_table': 'employee_lgas',
+                'ordering': ['name'],
+                'constraints': [models.UniqueConstraint(fields=('state', 'name'), name='employee_lgas_state_name_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Ward',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('lga', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='wards', to='employees.lga')),
+            ],
+            options={
+                'db_table': 'employee_wards',
+                'ordering': ['name'],
+                'constraints': [models.UniqueConstraint(fields=('lga', 'name'), name='employee_wards_lga_name_uniq')],
+            },
+        ),
+
+        # New key columns next to the text ones, filled from them, then swapped in
+        migrations.AddField(
+            model_name='employee',
+            name='department_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='employees.department'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='role_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='employees.role'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='state_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='employees.state'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='lga_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='employees.lga'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='ward_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='employees.ward'),
+        ),
+        migrations.RunPython(populate_lookups, restore_names),
+        migrations.RemoveIndex(model_name='employee', name='employees_department_idx'),
+        migrations.RemoveIndex(model_name='employee', name='employees_role_idx'),
+        migrations.RemoveIndex(model_name='employee', name='employees_state_idx'),
+        # blank=True (no schema change) lets migrating backwards add the text columns back as ''
+        *(migrations.AlterField(model_name='employee', name=field, field=models.CharField(max_length=100, blank=True))
+          for field in LOOKUP_FIELDS),
+        migrations.RemoveField(model_name='employee', name='department'),
+        migrations.RemoveField(model_name='employee', name='role'),
+        migrations.RemoveField(model_name='employee', name='state'),
+        migrations.RemoveField(model_name='employee', name='lga'),
+        migrations.RemoveField(model_name='employee', name='ward'),
+        migrations.RenameField(model_name='employee', old_name='department_ref', new_name='department'),
+        migrations.RenameField(model_name='employee', old_name='role_ref', new_name='role'),
+        migrations.RenameField(model_name='employee', old_name='state_ref', new_name='state'),
+        migrations.RenameField(model_name='employee', old_name='lga_ref', new_name='lga'),
+        migrations.RenameField(model_name='employee', old_name='ward_ref', new_name='ward'),
+
+        # The rollup groups by lookup id; its rows are recounted
+        migrations.RemoveConstraint(model_name='dailyemployeestat', name='employee_daily_stats_group_uniq'),
+        migrations.RemoveIndex(model_name='dailyemployeestat', name='daily_stats_department_day_idx'),
+        migrations.RemoveField(model_name='dailyemployeestat', name='department'),
+        migrations.RemoveField(model_name='dailyemployeestat', name='role'),
+        migrations.RemoveField(model_name='dailyemployeestat', name='state'),
+        migrations.AddField(
+            model_name='dailyemployeestat',
+            name='department_id',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dailyemployeestat',
+            name='role_id',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dailyemployeestat',
+            name='state_id',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(rebuild_daily_stats, clear_daily_stats),
+        migrations.AddConstraint(
+            model_name='dailyemployeestat',
+            constraint=models.UniqueConstraint(fields=('day', 'department_id', 'role_id', 'gender', 'state_id'), name='employee_daily_stats_group_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyemployeestat',
+            index=models.Index(fields=['department_id', 'day'], name='daily_stats_department_day_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0010_lookup_tables'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('export_csv', 'CSV export'), ('import', 'Import'), ('bulk_delete', 'Bulk delete'), ('bulk_update', 'Bulk edit'), ('thumbnails', 'Picture thumbnails'), ('reports', 'Reports')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:15
+
+import django.utils.timezone
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def copy_deletes_from_audit_log(apps, schema_editor):
+    """A tombstone per employee deleted in the audit events still in the database"""
+    AuditEvent = apps.get_model('employees', 'AuditEvent')
+    EmployeeTombstone = apps.get_model('employees', 'EmployeeTombstone')
+    using = schema_editor.connection.alias
+    events = AuditEvent.objects.using(using).filter(action='delete').order_by('id').values_list('at', 'changes')
+    tombstones = [
+        EmployeeTombstone(employee_pk=int(pk), employee_id=old.get('employee_id') or '', deleted_at=deleted_at)
+        for deleted_at, changes in events.iterator(chunk_size=100)
+        for pk, old in changes.get('old', {}).items()
+    ]
+    EmployeeTombstone.objects.using(using).bulk_create(tombstones, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0011_job_reports'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employee_pk', models.BigIntegerField()),
+                ('employee_id', models.CharField(max_length=50)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'employee_tombstones',
+                'indexes': [models.Index(fields=['deleted_at'], name='tombstones_deleted_at_idx')],
+            },
+        ),
+        migrations.RunPython(copy_deletes_from_audit_log, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,104 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
+
+
+class LookupName(models.Model):
+    """A name employees refer to by integer key instead of repeating the string"""
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        abstract = True
+        ordering = ['name']
+
+
+class Department(LookupName):
+    class Meta(LookupName.Meta):
+        db_table = 'employee_departments'
+
+
+class Role(LookupName):
+    class Meta(LookupName.Meta):
+        db_table = 'employee_roles'
+
+
+class State(LookupName):
+    class Meta(LookupName.Meta):
+        db_table = 'employee_states'
+
+
+class LGA(models.Model):
+    """Local Government Area of a state"""
+    state = models.ForeignKey(State, on_delete=models.PROTECT, related_name='lgas')
+    name = models.CharField(max_length=100)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        db_table = 'employee_lgas'
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['state', 'name'], name='employee_lgas_state_name_uniq'),
+        ]
+
+
+class Ward(models.Model):
+    lga = models.ForeignKey(LGA, on_delete=models.PROTECT, related_name='wards')
+    name = models.CharField(max_length=100)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        db_table = 'employee_wards'
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['lga', 'name'], name='employee_wards_lga_name_uniq'),
+        ]
+
+
+class EmployeeQuerySet(models.QuerySet):
+    """Employee queries with column projections for the pages that list them"""
+
+    # Columns each list page renders; everything else (notably the address
+    # TextField) stays unread until accessed
+    PROJECTIONS = {
+        'records': [
+            'id', 'employee_id', 'first_name', 'surname', 'other_name', 'email', 'contact_number',
+            'gender', 'department__name', 'role__name', 'profile_picture',
+        ],
+        'changelist': [
+            'id', 'employee_id', 'first_name', 'surname', 'email', 'profile_picture',
+            'department__name', 'role__name', 'created_at',
+        ],
+        # Enough to find a cached fragment (see employees/fragments.py)
+        'fragment_keys': ['id', 'updated_at'],
+    }
+
+    def projected(self, name):
+        """Load only the columns of the named projection, joining the lookup names it shows"""
+        fields = self.PROJECTIONS[name]
+        related = [field.split('__')[0] for field in fields if '__' in field]
+        # A joined relation cannot be deferred, so its key column is loaded too
+        return self.select_related(*related).only(*fields, *related)
+
+    def with_lookups(self):
+        """Join the department, role and location names every page of one employee shows"""
+        return self.select_related('department', 'role', 'state', 'lga', 'ward')
+
+    def for_records(self):
+        return self.projected('records')
+
+    def for_changelist(self):
+        return self.projected('changelist')
+
+    def for_fragment_keys(self):
+        return self.projected('fragment_keys')
+
 
 class Employee(models.Model):
     # Personal Information
@@ -18,14 +118,14 @@ class Employee(models.Model):
     ]
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES)
     
-    # Location Information
-    state = models.CharField(max_length=100)
-    lga = models.CharField(max_length=100)  # Local Government Area
-    ward = models.CharField(max_length=100)
+    # Location Information (keys into the lookup tables above)
+    state = models.ForeignKey(State, on_delete=models.PROTECT, null=True, related_name='+')
+    lga = models.ForeignKey(LGA, on_delete=models.PROTECT, null=True, related_name='+')  # Local Government Area
+    ward = models.ForeignKey(Ward, on_delete=models.PROTECT, null=True, related_name='+')
     
     # Professional Information
-    department = models.CharField(max_length=100)
-    role = models.CharField(max_length=100)
+    department = models.ForeignKey(Department, on_delete=models.PROTECT, null=True, related_name='+')
+    role = models.ForeignKey(Role, on_delete=models.PROTECT, null=True, related_name='+')
     
     # Profile picture (NEW field - storing file path as string for now)
     profile_picture = models.ImageField(
@@ -39,9 +139,206 @@ class Employee(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = EmployeeQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.first_name} {self.surname} - {self.employee_id}"
+
+    @property
+    def thumbnail(self):
+        """URLs of the list-size picture variant, or None until it has been generated"""
+        from .images import variant_urls
+        return variant_urls(self.profile_picture.name, 'thumb')
+
+    @property
+    def detail_picture(self):
+        """URLs of the detail-size picture variant, or None until it has been generated"""
+        from .images import variant_urls
+        return variant_urls(self.profile_picture.name, 'detail')
     
     class Meta:
         db_table = 'employees'
-        ordering = ['-created_at']  # Newest records first by default
\ No newline at end of file
+        ordering = ['-created_at']  # Newest records first by default
+        # Indexes backing the records page filters and dashboard date ranges
+        # (department, role and location are indexed as foreign keys)
+        indexes = [
+            models.Index(fields=['gender'], name='employees_gender_idx'),
+            models.Index(fields=['created_at'], name='employees_created_at_idx'),
+            # Delta exports and API syncs read the rows changed since a watermark
+            models.Index(fields=['updated_at'], name='employees_updated_at_idx'),
+        ]
+
+
+class DailyEmployeeStat(models.Model):
+    """
+    Materialized employee counts per hire day x department x role x gender x state.
+
+    Departments, roles and states are lookup table ids (0 when the employee
+    has none), kept as plain integers so the upserts in rollups.py need no
+    foreign key checks.
+    """
+    day = models.DateField()
+    department_id = models.PositiveIntegerField(default=0)
+    role_id = models.PositiveIntegerField(default=0)
+    gender = models.CharField(max_length=10)
+    state_id = models.PositiveIntegerField(default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day} {self.department_id} / {self.role_id} / {self.gender} / {self.state_id}: {self.count}"
+
+    class Meta:
+        db_table = 'employee_daily_stats'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'department_id', 'role_id', 'gender', 'state_id'],
+                name='employee_daily_stats_group_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['department_id', 'day'], name='daily_stats_department_day_idx'),
+        ]
+
+
+class Job(models.Model):
+    """A long-running operation (export, import, bulk delete) executed by the job worker"""
+    KIND_CHOICES = [
+        ('export_csv', 'CSV export'),
+        ('import', 'Import'),
+        ('bulk_delete', 'Bulk delete'),
+        ('bulk_update', 'Bulk edit'),
+        ('thumbnails', 'Picture thumbnails'),
+        ('reports', 'Reports'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    params = models.JSONField(default=dict, blank=True)
+
+    # Progress reporting
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(blank=True, null=True)
+    message = models.TextField(blank=True)
+
+    # Output file for exports, stored under MEDIA_ROOT
+    result_file = models.FileField(upload_to='exports/', blank=True, null=True)
+
+    created_by = models.ForeignKey('auth.User', on_delete=models.SET_NULL, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    # Times the job was claimed, and the last sign of life from the worker running it
+    attempts = models.PositiveSmallIntegerField(default=0)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+
+    @property
+    def percent(self):
+        if not self.total:
+            return 100 if self.status == 'done' else 0
+        return min(100, round(self.progress * 100 / self.total))
+
+    class Meta:
+        db_table = 'employee_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='employee_jobs_status_idx'),
+        ]
+
+
+class AuditEvent(models.Model):
+    """
+    One append-only change set: a single edit or delete, or one chunk of a bulk operation.
+
+    `changes` holds {"set": {field: new value}, "old": {employee pk: {field: old value}}};
+    a delete has only "old", with every field of each deleted employee.
+    """
+    ACTION_CHOICES = [
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ]
+
+    at = models.DateTimeField(default=timezone.now)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    actor = models.ForeignKey('auth.User', on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    employee_count = models.PositiveIntegerField(default=1)
+    changes = models.JSONField(encoder=DjangoJSONEncoder)
+
+    def __str__(self):
+        return f"{self.get_action_display()} of {self.employee_count} employees at {self.at:%Y-%m-%d %H:%M}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Audit events are append-only.")
+        super().save(*args, **kwargs)
+
+    def changes_for(self, employee_pk):
+        """[(field, old, new)] of one employee in this event; new is None for deletes"""
+        old = self.changes.get('old', {}).get(str(employee_pk), {})
+        new = self.changes.get('set', {})
+        return [(field, value, new.get(field)) for field, value in old.items()]
+
+    class Meta:
+        db_table = 'employee_audit_events'
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['at'], name='audit_events_at_idx'),
+        ]
+
+
+class AuditEntry(models.Model):
+    """Links an audit event to every employee it touched, so per-employee history is an index lookup"""
+    event = models.ForeignKey(AuditEvent, on_delete=models.CASCADE, related_name='entries')
+    # Not a foreign key: the history of a deleted employee is kept
+    employee_pk = models.BigIntegerField()
+
+    class Meta:
+        db_table = 'employee_audit_entries'
+        indexes = [
+            models.Index(fields=['employee_pk', 'event'], name='audit_entries_employee_idx'),
+        ]
+
+
+class EmployeeTombstone(models.Model):
+    """
+    A deleted employee, for the incremental consumers (delta exports, the
+    columnar snapshot). Kept apart from the audit log, which
+    archive_audit_log empties, so deletes since any watermark can be reported.
+    """
+    # Not a foreign key: the employee is gone
+    employee_pk = models.BigIntegerField()
+    employee_id = models.CharField(max_length=50)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'employee_tombstones'
+        indexes = [
+            models.Index(fields=['deleted_at'], name='tombstones_deleted_at_idx'),
+        ]
+
+
+class ApiToken(models.Model):
+    """
+    A key a machine client of the JSON API sends as `Authorization: Bearer <key>`.
+    Only its hash is stored; manage.py create_api_token shows the key once.
+    """
+    user = models.ForeignKey('auth.User', on_delete=models.CASCADE, related_name='api_tokens')
+    name = models.CharField(max_length=100)
+    digest = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.user})"
+
+    class Meta:
+        db_table = 'employee_api_tokens'
+        ordering = ['-created_at']
@@ -0,0 +1,67 @@
+from django.db.models import Max, Min
+
+# Rows counted before the records page switches to an estimated total
+COUNT_CAP = 1000
+
+
+class KeysetPage:
+    """One page of a keyset (cursor) paginated queryset, ordered by id"""
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        return self.object_list[-1].id if self.has_next and self.object_list else None
+
+    @property
+    def previous_cursor(self):
+        return self.object_list[0].id if self.has_previous and self.object_list else None
+
+
+def _cursor(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def akeyset_paginate(queryset, after=None, before=None, per_page=10):
+    """Fetch the page after/before an id cursor without OFFSET scans or a COUNT(*)"""
+    after = _cursor(after)
+    before = _cursor(before)
+
+    if before is not None:
+        # Walk backwards from the cursor, then restore ascending order
+        rows = [row async for row in queryset.filter(id__lt=before).order_by('-id')[:per_page + 1]]
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        return KeysetPage(rows, has_next=True, has_previous=has_previous)
+
+    if after is not None:
+        queryset = queryset.filter(id__gt=after)
+    rows = [row async for row in queryset.order_by('id')[:per_page + 1]]
+    has_next = len(rows) > per_page
+    return KeysetPage(rows[:per_page], has_next=has_next, has_previous=after is not None)
+
+
+async def aestimated_count(queryset, filtered=True, cap=COUNT_CAP):
+    """Return (count, exact), counting at most `cap` rows before falling back to an estimate"""
+    count = await queryset.order_by()[:cap].acount()
+    if count < cap:
+        return count, True
+
+    if not filtered:
+        # The primary key range is an index-only lookup and a close upper bound
+        bounds = await queryset.aaggregate(low=Min('id'), high=Max('id'))
+        return max(cap, bounds['high'] - bounds['low'] + 1), False
+
+    return cap, False
@@ -0,0 +1,131 @@
+"""
+Minimal streaming PDF writer for printable reports.
+
+Pages are written to the file as soon as they are finished, so a roster
+of any length is produced in constant memory. Only what the reports need
+is supported: the built-in Helvetica fonts (no embedding, Windows-1252
+text), lines and rectangles, and JPEG images, which are embedded as they
+are without decoding.
+"""
+import zlib
+
+# Points (1/72 inch)
+A4 = (595, 842)
+
+FONTS = {'regular': 'F1', 'bold': 'F2'}
+
+# Approximate Helvetica advance widths in 1/1000 em, for fitting text into columns
+_NARROW = set("fijlrtI!'.,:;|()[] ")
+_WIDE = set("mwMW@%")
+
+
+def text_width(value, size):
+    """Approximate width of `value` in points when set in Helvetica at `size`"""
+    units = sum(
+        278 if char in _NARROW else 889 if char in _WIDE else 667 if char.isupper() else 556
+        for char in value
+    )
+    return units * size / 1000
+
+
+def fit(value, width, size):
+    """`value`, shortened with an ellipsis if it is wider than `width`"""
+    value = str(value or '')
+    if text_width(value, size) <= width:
+        return value
+    while value and text_width(value + '...', size) > width:
+        value = value[:-1]
+    return value.rstrip() + '...'
+
+
+def _escape(value):
+    data = value.encode('cp1252', errors='replace')
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+class Page:
+    """Drawing operations of one page, in points from the bottom-left corner"""
+
+    def __init__(self):
+        self.operations = []
+        self.images = {}  # resource name -> object id
+
+    def text(self, x, y, value, size=9, font='regular', gray=0):
+        self.operations.append(
+            b'BT %.3g g /%s %g Tf %.2f %.2f Td (%s) Tj ET'
+            % (gray, FONTS[font].encode(), size, x, y, _escape(str(value)))
+        )
+
+    def line(self, x1, y1, x2, y2, gray=0.8, width=0.5):
+        self.operations.append(b'q %.3g G %g w %.2f %.2f m %.2f %.2f l S Q' % (gray, width, x1, y1, x2, y2))
+
+    def rectangle(self, x, y, width, height, gray=0.92):
+        self.operations.append(b'q %.3g g %.2f %.2f %.2f %.2f re f Q' % (gray, x, y, width, height))
+
+    def image(self, image_id, x, y, width, height):
+        name = f'Im{image_id}'
+        self.images[name] = image_id
+        self.operations.append(b'q %.2f 0 0 %.2f %.2f %.2f cm /%s Do Q' % (width, height, x, y, name.encode()))
+
+
+class Document:
+    """A PDF written page by page to a binary file; call close() to finish it"""
+
+    # Object ids fixed up front; pages and images are numbered after them
+    CATALOG, PAGES, REGULAR_FONT, BOLD_FONT = 1, 2, 3, 4
+
+    def __init__(self, file, page_size=A4, title=''):
+        self.file = file
+        self.page_size = page_size
+        self.title = title
+        self.offsets = {}
+        self.page_ids = []
+        self.last_id = self.BOLD_FONT
+        self.file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        for object_id, font in ((self.REGULAR_FONT, b'Helvetica'), (self.BOLD_FONT, b'Helvetica-Bold')):
+            self._write(object_id, b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % font)
+
+    def _next_id(self):
+        self.last_id += 1
+        return self.last_id
+
+    def _write(self, object_id, dictionary, stream=None):
+        self.offsets[object_id] = self.file.tell()
+        self.file.write(b'%d 0 obj\n' % object_id + dictionary)
+        if stream is not None:
+            self.file.write(b'\nstream\n' + stream + b'\nendstream')
+        self.file.write(b'\nendobj\n')
+
+    def add_jpeg(self, data, width, height):
+        """Embed an RGB JPEG of `width` x `height` pixels and return its id for Page.image()"""
+        image_id = self._next_id()
+        self._write(image_id, b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB '
+                              b'/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>' % (width, height, len(data)), data)
+        return image_id
+
+    def add_page(self, page):
+        content = zlib.compress(b'\n'.join(page.operations))
+        content_id = self._next_id()
+        self._write(content_id, b'<< /Length %d /Filter /FlateDecode >>' % len(content), content)
+        images = b' '.join(b'/%s %d 0 R' % (name.encode(), image_id) for name, image_id in page.images.items())
+        page_id = self._next_id()
+        self._write(page_id, (
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R '
+            b'/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> /XObject << %s >> >> >>'
+        ) % (self.PAGES, *self.page_size, content_id, self.REGULAR_FONT, self.BOLD_FONT, images))
+        self.page_ids.append(page_id)
+
+    def close(self):
+        """Write the page tree, cross-reference table and trailer"""
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self.page_ids)
+        self._write(self.PAGES, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.page_ids)))
+        self._write(self.CATALOG, b'<< /Type /Catalog /Pages %d 0 R >>' % self.PAGES)
+        info_id = self._next_id()
+        self._write(info_id, b'<< /Title (%s) /Producer (Employee Management) >>' % _escape(self.title))
+
+        xref = self.file.tell()
+        self.file.write(b'xref\n0 %d\n0000000000 65535 f \n' % (self.last_id + 1))
+        for object_id in range(1, self.last_id + 1):
+            self.file.write(b'%010d 00000 n \n' % self.offsets[object_id])
+        self.file.write(b'trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                        % (self.last_id + 1, self.CATALOG, info_id, xref))
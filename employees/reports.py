@@ -0,0 +1,311 @@
+"""
+Per-department and per-state reports, generated in parallel.
+
+A run writes one file per department or per state (`by`), and shards of
+more than PART_ROWS employees are split into parts by id range. A pool of
+worker processes writes the files, largest first, so one run keeps every
+core busy. Each worker streams its shard from the database in keyset
+batches. Within a file, employees are grouped by department: XLSX
+workbooks get one sheet per department, and PDF rosters get one section
+per department with the list thumbnails. The finished files are packed
+into a single ZIP.
+"""
+import multiprocessing
+import os
+import re
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.files.storage import default_storage
+from django.db.models import Count
+
+from . import images, lookups, pdf
+from .exports import EXPORT_HEADERS, format_export_row, iter_export_rows
+from .filters import filter_employees
+from .models import Employee
+
+REPORT_FORMATS = ('xlsx', 'pdf')
+SHARD_FIELDS = ('department', 'state')
+
+# Employees per output file; larger shards are split into parts
+PART_ROWS = 100_000
+
+# Data rows per worksheet (Excel's limit less the header); the rest go on another sheet
+SHEET_ROWS = 1_048_575
+
+# Label of employees without a department or state
+UNASSIGNED = 'Unassigned'
+
+
+def _unique(name, used, max_length):
+    """`name` shortened to `max_length`, with ' (2)', ' (3)'... added until it is not in `used`"""
+    candidate, number = name[:max_length], 1
+    while candidate.casefold() in used:
+        number += 1
+        suffix = f' ({number})'
+        candidate = name[:max_length - len(suffix)] + suffix
+    used.add(candidate.casefold())
+    return candidate
+
+
+def _shard(queryset, by, pk):
+    # filter(department_id=None) matches employees without a department
+    return queryset.filter(**{f'{by}_id': pk})
+
+
+def plan_files(queryset, by, part_rows=PART_ROWS):
+    """
+    The files of a report, largest first: dicts with the file name, the
+    department or state id (`shard`), the id range of a part and the
+    number of employees.
+    """
+    counts = dict(queryset.order_by().values_list(f'{by}_id').annotate(rows=Count('id')))
+    names = lookups.names(by, [pk for pk in counts if pk])
+    used = set()
+    files = []
+    for pk, rows in counts.items():
+        title = names.get(pk) or UNASSIGNED
+        stem = _unique(re.sub(r'[^\w&,.() -]+', '_', title).strip(' .') or 'unnamed', used, 100)
+        parts = -(-rows // part_rows)
+        # Each boundary is one indexed OFFSET query on the shard
+        ids = _shard(queryset, by, pk).order_by('id').values_list('id', flat=True)
+        bounds = [None, *(ids[part * part_rows] for part in range(1, parts)), None]
+        for part in range(parts):
+            suffix = f' (part {part + 1} of {parts})' if parts > 1 else ''
+            files.append({
+                'name': stem + suffix,
+                'title': title + suffix,
+                'shard': pk,
+                'id_from': bounds[part],
+                'id_to': bounds[part + 1],
+                'rows': min(part_rows, rows - part * part_rows),
+            })
+    return sorted(files, key=lambda file: -file['rows'])
+
+
+def _sections(queryset):
+    """(department name, queryset) of each department in `queryset`, by name"""
+    pks = set(queryset.order_by().values_list('department_id', flat=True).distinct())
+    names = lookups.names('department', [pk for pk in pks if pk])
+    sections = [(names.get(pk) or UNASSIGNED, queryset.filter(department_id=pk)) for pk in pks]
+    return sorted(sections, key=lambda section: (section[0] == UNASSIGNED, section[0].casefold()))
+
+
+def write_xlsx(path, queryset, title):
+    """Write a workbook with one sheet of export columns per department; return the rows written"""
+    try:
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+        from openpyxl.utils import get_column_letter
+    except ImportError:
+        raise ImportError("Excel reports require the openpyxl package.")
+
+    workbook = Workbook(write_only=True)
+    sheet_names = set()
+
+    def new_sheet(name):
+        sheet = workbook.create_sheet(_unique(re.sub(r'[\[\]:*?/\\]', ' ', name).strip() or 'Sheet', sheet_names, 31))
+        # Write-only sheets take layout settings before the first row
+        sheet.freeze_panes = 'A2'
+        for column, header in enumerate(EXPORT_HEADERS, start=1):
+            sheet.column_dimensions[get_column_letter(column)].width = max(12, len(header) + 4)
+        header_cells = []
+        for header in EXPORT_HEADERS:
+            cell = WriteOnlyCell(sheet, header)
+            cell.font = Font(bold=True)
+            header_cells.append(cell)
+        sheet.append(header_cells)
+        return sheet
+
+    written = 0
+    for department, section in _sections(queryset):
+        sheet, sheet_rows = None, 0
+        for row in iter_export_rows(section):
+            if sheet is None or sheet_rows == SHEET_ROWS:
+                sheet, sheet_rows = new_sheet(department), 0
+            sheet.append(format_export_row(row))
+            sheet_rows += 1
+            written += 1
+    if not sheet_names:
+        new_sheet(title)
+    workbook.save(path)
+    return written
+
+
+# Columns fetched for a roster line
+ROSTER_FIELDS = [
+    'employee_id', 'first_name', 'surname', 'other_name', 'role__name', 'gender',
+    'contact_number', 'lga__name', 'ward__name', 'profile_picture',
+]
+
+
+class RosterWriter:
+    """Lays roster lines out on A4 pages of a PDF, one section per department"""
+
+    MARGIN = 36
+    LINE_HEIGHT = 34
+    PHOTO_SIZE = 28
+    # (header, width in points)
+    COLUMNS = [('', 36), ('Employee ID', 70), ('Name', 125), ('Role', 90), ('Gender', 44), ('Contact', 74), ('LGA / Ward', 84)]
+
+    def __init__(self, file, title, storage=default_storage):
+        self.document = pdf.Document(file, title=title)
+        self.title = title
+        self.storage = storage
+        self.page = None
+        self.page_number = 0
+        self.section = None
+        self.y = 0
+
+    def _new_page(self):
+        if self.page is not None:
+            self.document.add_page(self.page)
+        self.page = pdf.Page()
+        self.page_number += 1
+        width, height = self.document.page_size
+        top = height - self.MARGIN
+        self.page.text(self.MARGIN, top - 14, pdf.fit(self.title, width - 2 * self.MARGIN - 60, 14), size=14, font='bold')
+        self.page.text(width - self.MARGIN - 40, top - 14, f'Page {self.page_number}', size=9, gray=0.4)
+        x = self.MARGIN
+        for header, column_width in self.COLUMNS:
+            if header:
+                self.page.text(x, top - 38, header, size=8, font='bold', gray=0.3)
+            x += column_width
+        self.page.line(self.MARGIN, top - 44, width - self.MARGIN, top - 44, gray=0.3)
+        self.y = top - 44
+
+    def _heading(self, text):
+        self.page.text(self.MARGIN, self.y - 18, text, size=11, font='bold')
+        self.y -= 24
+
+    def start_section(self, name):
+        # A heading is not left alone at the bottom of a page
+        if self.page is None or self.y - 24 - self.LINE_HEIGHT < self.MARGIN:
+            self._new_page()
+        self.section = name
+        self._heading(name)
+
+    def _photo(self, name):
+        if not name:
+            return None
+        try:
+            with self.storage.open(images.variant_name(name, 'thumb', 'jpg'), 'rb') as file:
+                data = file.read()
+        except OSError:
+            # Not generated yet
+            return None
+        return self.document.add_jpeg(data, *images.VARIANTS['thumb'][:2])
+
+    def add(self, row):
+        if self.y - self.LINE_HEIGHT < self.MARGIN:
+            self._new_page()
+            self._heading(f'{self.section} (continued)')
+        employee_id, first_name, surname, other_name, role, gender, contact, lga, ward, picture = row
+        top = self.y
+        photo = self._photo(picture)
+        if photo is None:
+            self.page.rectangle(self.MARGIN, top - 31, self.PHOTO_SIZE, self.PHOTO_SIZE)
+        else:
+            self.page.image(photo, self.MARGIN, top - 31, self.PHOTO_SIZE, self.PHOTO_SIZE)
+
+        name = ' '.join(filter(None, [surname, first_name, other_name]))
+        values = [employee_id, name, role, gender, contact]
+        x = self.MARGIN + self.COLUMNS[0][1]
+        for value, (_, column_width) in zip(values, self.COLUMNS[1:]):
+            self.page.text(x, top - 20, pdf.fit(value, column_width - 6, 9), size=9)
+            x += column_width
+        self.page.text(x, top - 15, pdf.fit(lga, self.COLUMNS[-1][1] - 6, 8), size=8)
+        self.page.text(x, top - 26, pdf.fit(ward, self.COLUMNS[-1][1] - 6, 8), size=8, gray=0.4)
+        self.page.line(self.MARGIN, top - self.LINE_HEIGHT, self.document.page_size[0] - self.MARGIN, top - self.LINE_HEIGHT)
+        self.y -= self.LINE_HEIGHT
+
+    def close(self):
+        if self.page is None:
+            self._new_page()
+            self._heading('No employees')
+        self.document.add_page(self.page)
+        self.document.close()
+
+
+def write_pdf(path, queryset, title):
+    """Write a printable roster with thumbnails, one section per department; return the rows written"""
+    written = 0
+    with open(path, 'wb') as file:
+        roster = RosterWriter(file, title)
+        for department, section in _sections(queryset):
+            roster.start_section(department)
+            for row in iter_export_rows(section, fields=ROSTER_FIELDS):
+                roster.add(row)
+                written += 1
+        roster.close()
+    return written
+
+
+WRITERS = {'xlsx': write_xlsx, 'pdf': write_pdf}
+
+
+def write_file(task):
+    """Write one planned file of a report (in a worker process); return its path and rows written"""
+    queryset = _shard(filter_employees(Employee.objects.all(), task['params']), task['by'], task['shard'])
+    if task['id_from'] is not None:
+        queryset = queryset.filter(id__gte=task['id_from'])
+    if task['id_to'] is not None:
+        queryset = queryset.filter(id__lt=task['id_to'])
+    path = os.path.join(task['directory'], f"{task['name']}.{task['format']}")
+    return path, WRITERS[task['format']](path, queryset, task['title'])
+
+
+def _run(tasks, workers):
+    """Yield write_file() results as they complete"""
+    if workers == 1:
+        for task in tasks:
+            yield write_file(task)
+        return
+
+    # Workers start from a fresh interpreter rather than a fork, so they do not
+    # inherit this process's database connections or locks held by its threads
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=django.setup) as pool:
+        futures = [pool.submit(write_file, task) for task in tasks]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def generate(path, report_format, by, params=None, workers=None, progress=None, part_rows=PART_ROWS):
+    """
+    Write the report ZIP of the employees matching the dashboard filters in
+    `params` to `path`, with `workers` processes (default: one per core).
+    `progress(employees written, total)` is called as files complete.
+    Return the number of files and of employees written.
+    """
+    if report_format not in REPORT_FORMATS:
+        raise ValueError(f"Unknown report format '{report_format}'")
+    if by not in SHARD_FIELDS:
+        raise ValueError(f"Reports are split by {' or '.join(SHARD_FIELDS)}, not '{by}'")
+    params = params or {}
+
+    planned = plan_files(filter_employees(Employee.objects.all(), params), by, part_rows)
+    total = sum(file['rows'] for file in planned)
+    if progress:
+        progress(0, total)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(planned)))
+
+    written = 0
+    # XLSX files and the PDF streams are compressed already
+    with tempfile.TemporaryDirectory(prefix='reports-') as directory, \
+            zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_STORED) as archive:
+        tasks = [{**file, 'params': params, 'by': by, 'format': report_format, 'directory': directory} for file in planned]
+        for file_path, rows in _run(tasks, workers):
+            archive.write(file_path, os.path.basename(file_path))
+            os.remove(file_path)
+            written += rows
+            if progress:
+                progress(written, total)
+    return len(planned), written
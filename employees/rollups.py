@@ -0,0 +1,115 @@
+from collections import Counter
+
+from django.db import connections, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyEmployeeStat, Employee
+
+# Employee columns that make up one rollup group (besides the hire day);
+# department, role and state are lookup ids, 0 when missing
+GROUP_FIELDS = ['department_id', 'role_id', 'gender', 'state_id']
+
+# Rows inserted per statement when rebuilding
+REBUILD_BATCH_SIZE = 1000
+
+
+def rollup_key(employee):
+    """The (day, department, role, gender, state) group an employee instance counts towards"""
+    return (
+        timezone.localdate(employee.created_at),
+        employee.department_id or 0,
+        employee.role_id or 0,
+        employee.gender or '',
+        employee.state_id or 0,
+    )
+
+
+def group_counts(queryset):
+    """Counter of rollup group -> number of employees in the queryset, in one grouped query"""
+    groups = queryset.order_by().annotate(day=TruncDate('created_at')).values(
+        'day', *GROUP_FIELDS
+    ).annotate(count=Count('id'))
+
+    counts = Counter()
+    for group in groups:
+        key = (group['day'], group['department_id'] or 0, group['role_id'] or 0,
+               group['gender'] or '', group['state_id'] or 0)
+        counts[key] += group['count']
+    return counts
+
+
+def apply_deltas(deltas, using='default'):
+    """Add each (group -> delta) to the rollup table, dropping groups that reach zero"""
+    increments = [(key, delta) for key, delta in deltas.items() if delta > 0]
+    decrements = [(key, -delta) for key, delta in deltas.items() if delta < 0]
+    with transaction.atomic(using=using):
+        if increments:
+            _add_counts(increments, using)
+        if decrements:
+            _subtract_counts(decrements, using)
+
+
+def _group_params(connection, key):
+    return [connection.ops.adapt_datefield_value(key[0]), *key[1:]]
+
+
+def _add_counts(increments, using):
+    """
+    Upsert positive deltas with one executemany.
+
+    Bulk imports touch a new group for almost every row, and one upsert
+    statement replaces a get_or_create (two or three queries) per group.
+    """
+    connection = connections[using]
+    table = DailyEmployeeStat._meta.db_table
+    columns = ['day', *GROUP_FIELDS]
+    placeholders = ', '.join(['%s'] * (len(columns) + 1))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}, count) VALUES ({placeholders}) "
+            f"ON CONFLICT ({', '.join(columns)}) DO UPDATE SET count = {table}.count + excluded.count",
+            [_group_params(connection, key) + [delta] for key, delta in increments],
+        )
+
+
+def _subtract_counts(decrements, using):
+    """Lower group counts (never below zero) and drop the groups that reach zero, two executemany calls"""
+    connection = connections[using]
+    table = DailyEmployeeStat._meta.db_table
+    where = ' AND '.join(f"{column} = %s" for column in ['day', *GROUP_FIELDS])
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {table} SET count = CASE WHEN count > %s THEN count - %s ELSE 0 END WHERE {where}",
+            [[amount, amount] + _group_params(connection, key) for key, amount in decrements],
+        )
+        cursor.executemany(
+            f"DELETE FROM {table} WHERE {where} AND count = 0",
+            [_group_params(connection, key) for key, _ in decrements],
+        )
+
+
+def record_change(old_key=None, new_key=None, using='default'):
+    """Move one employee from the old group to the new one (either may be None)"""
+    if old_key == new_key:
+        return
+    deltas = Counter()
+    if old_key is not None:
+        deltas[old_key] -= 1
+    if new_key is not None:
+        deltas[new_key] += 1
+    apply_deltas(deltas, using=using)
+
+
+def rebuild_daily_stats(using='default'):
+    """Recompute the whole rollup table from the employees table"""
+    counts = group_counts(Employee.objects.using(using))
+    rows = [
+        DailyEmployeeStat(**dict(zip(['day', *GROUP_FIELDS], key)), count=count)
+        for key, count in counts.items()
+    ]
+    with transaction.atomic(using=using):
+        DailyEmployeeStat.objects.using(using).all().delete()
+        DailyEmployeeStat.objects.using(using).bulk_create(rows, batch_size=REBUILD_BATCH_SIZE)
+    return len(rows)
@@ -0,0 +1,101 @@
+"""
+Read routing for read-only views.
+
+Views wrapped in `reads_from_replica` read employee data through the
+'replica' database alias (a second, query-only connection or a snapshot
+copy, see settings.DATABASES). Everything else - writes, and reads of
+sessions, users and jobs - stays on 'default', so logins and freshly
+queued jobs are never read from a stale snapshot.
+"""
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+REPLICA = 'replica'
+
+# Models read from the replica while a read-only view runs
+REPLICA_MODELS = {'employee', 'dailyemployeestat'}
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+class ReadReplicaRouter:
+    """Send employee reads made inside read-only views to the replica"""
+
+    def db_for_read(self, model, **hints):
+        if (
+            _use_replica.get()
+            and model._meta.app_label == 'employees'
+            and model._meta.model_name in REPLICA_MODELS
+            and REPLICA in settings.DATABASES
+        ):
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+def _replica_reads(iterator):
+    # Streamed bodies are produced after the view has returned
+    iterator = iter(iterator)
+    while True:
+        token = _use_replica.set(True)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _use_replica.reset(token)
+        yield chunk
+
+
+async def _areplica_reads(iterator):
+    # Async bodies run their queries through sync_to_async, which copies the context
+    while True:
+        token = _use_replica.set(True)
+        try:
+            chunk = await anext(iterator)
+        except StopAsyncIteration:
+            return
+        finally:
+            _use_replica.reset(token)
+        yield chunk
+
+
+def reads_from_replica(view_func):
+    """Decorator for views that only read employee data"""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _async_wrapped_view(request, *args, **kwargs):
+            token = _use_replica.set(True)
+            try:
+                response = await view_func(request, *args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+            if response.streaming:
+                wrap = _areplica_reads if response.is_async else _replica_reads
+                response.streaming_content = wrap(response.streaming_content)
+            return response
+        return _async_wrapped_view
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        token = _use_replica.set(True)
+        try:
+            response = view_func(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+        if response.streaming and not response.is_async:
+            response.streaming_content = _replica_reads(response.streaming_content)
+        return response
+    return _wrapped_view
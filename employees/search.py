@@ -0,0 +1,191 @@
+"""
+Full-text employee search backed by an SQLite FTS5 table.
+
+The `employees_fts` table mirrors the searchable columns of `employees`
+with rowid = Employee.id. It is kept in sync by the signals in
+`employees.signals`, by `index_employees`/`unindex_employees` for bulk
+operations, and can be rebuilt with `manage.py rebuild_search_index`.
+On databases without FTS5 every helper falls back to `icontains` lookups.
+"""
+import difflib
+import re
+
+from django.db import connections, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'employees_fts'
+FTS_VOCAB_TABLE = 'employees_fts_vocab'
+
+# Columns of the FTS table (created by migration 0003)
+FTS_FIELDS = ['first_name', 'surname', 'other_name', 'email', 'employee_id', 'department', 'role']
+
+# Where each FTS column is read from; department and role are lookup table names
+FTS_SOURCES = ['first_name', 'surname', 'other_name', 'email', 'employee_id', 'department__name', 'role__name']
+
+# Columns used by the icontains fallback
+FALLBACK_FIELDS = ['first_name', 'surname', 'email', 'employee_id', 'department__name', 'role__name']
+
+# Rows copied per statement when (re)indexing
+INDEX_BATCH_SIZE = 1000
+
+# Aliases where the FTS table is known to exist
+_enabled_aliases = set()
+
+
+def fts_enabled(using='default'):
+    """Return True if the FTS table exists on the given database"""
+    if using in _enabled_aliases:
+        return True
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    if FTS_TABLE in connection.introspection.table_names():
+        _enabled_aliases.add(using)
+        return True
+    return False
+
+
+def tokenize(query):
+    """Split a search string into lower-case terms the way unicode61 does"""
+    return re.findall(r'\w+', (query or '').lower())
+
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _close_terms(term, using='default', limit=3):
+    """Indexed terms within a small edit distance of `term` (fuzzy matching)"""
+    if len(term) < 3:
+        return []
+    # Only compare against terms sharing the first letter to keep the vocab scan small
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"SELECT term FROM {FTS_VOCAB_TABLE} WHERE term >= %s AND term < %s",
+            [term[0], term[0] + '\uffff'],
+        )
+        candidates = [row[0] for row in cursor.fetchall()]
+    return difflib.get_close_matches(term, candidates, n=limit, cutoff=0.75)
+
+
+def build_match_expression(query, fuzzy=False, using='default'):
+    """Build an FTS5 MATCH expression: every term must match as a prefix (or a close term if fuzzy)"""
+    clauses = []
+    for term in tokenize(query):
+        options = [_quote(term) + '*']
+        if fuzzy:
+            options += [_quote(close) for close in _close_terms(term, using) if close != term]
+        clauses.append(options[0] if len(options) == 1 else '(' + ' OR '.join(options) + ')')
+    return ' AND '.join(clauses)
+
+
+def _match_sql(expression):
+    return RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [expression])
+
+
+def _fallback(queryset, query):
+    for term in tokenize(query) or [query]:
+        condition = Q()
+        for field in FALLBACK_FIELDS:
+            condition |= Q(**{f'{field}__icontains': term})
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def _matching(queryset, query, fuzzy):
+    """Return (matching queryset, MATCH expression used) - prefix first, then fuzzy"""
+    using = queryset.db
+    expression = build_match_expression(query, using=using)
+    matches = queryset.filter(id__in=_match_sql(expression))
+    if fuzzy and not matches.exists():
+        expression = build_match_expression(query, fuzzy=True, using=using)
+        matches = queryset.filter(id__in=_match_sql(expression))
+    return matches, expression
+
+
+def filter_search(queryset, query, fuzzy=True):
+    """
+    Restrict a queryset to employees matching `query`.
+
+    Prefix matching is tried first; if nothing matches and `fuzzy` is set,
+    terms are widened to close spellings found in the index vocabulary.
+    """
+    if not tokenize(query):
+        return queryset
+    if not fts_enabled(queryset.db):
+        return _fallback(queryset, query)
+    return _matching(queryset, query, fuzzy)[0]
+
+
+def ranked_search(queryset, query, fuzzy=True):
+    """Like filter_search but ordered by relevance (bm25), best matches first"""
+    if not tokenize(query):
+        return queryset
+    if not fts_enabled(queryset.db):
+        return _fallback(queryset, query)
+
+    matches, expression = _matching(queryset, query, fuzzy)
+    rank = RawSQL(
+        f"SELECT rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+        f"AND rowid = {queryset.model._meta.db_table}.id",
+        [expression],
+    )
+    return matches.annotate(search_rank=rank).order_by('search_rank', 'id')
+
+
+def index_employees(employee_ids=None, using='default'):
+    """(Re)index the given employees, or every employee when no ids are passed"""
+    from .models import Employee
+
+    if not fts_enabled(using):
+        return 0
+
+    queryset = Employee.objects.using(using).order_by('id')
+    if employee_ids is not None:
+        employee_ids = list(employee_ids)
+        if not employee_ids:
+            return 0
+        unindex_employees(employee_ids, using=using)
+        queryset = queryset.filter(id__in=employee_ids)
+
+    placeholders = ', '.join(['%s'] * (len(FTS_FIELDS) + 1))
+    insert_sql = f"INSERT INTO {FTS_TABLE}(rowid, {', '.join(FTS_FIELDS)}) VALUES ({placeholders})"
+
+    count = 0
+    batch = []
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        for row in queryset.values_list('id', *FTS_SOURCES).iterator(chunk_size=INDEX_BATCH_SIZE):
+            batch.append(row)
+            if len(batch) >= INDEX_BATCH_SIZE:
+                cursor.executemany(insert_sql, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(insert_sql, batch)
+            count += len(batch)
+    return count
+
+
+def unindex_employees(employee_ids, using='default'):
+    """Remove the given employees from the index"""
+    if not fts_enabled(using):
+        return
+    employee_ids = list(employee_ids)
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        for start in range(0, len(employee_ids), INDEX_BATCH_SIZE):
+            chunk = employee_ids[start:start + INDEX_BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+
+
+def rebuild_index(using='default'):
+    """Drop every indexed row and reindex the whole employees table"""
+    if not fts_enabled(using):
+        return 0
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    count = index_employees(using=using)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return count
@@ -0,0 +1,83 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import audit, exports, images, jobs, rollups, search, uniqueness
+from .models import Employee
+
+
+@receiver(post_save, sender=Employee)
+def index_saved_employee(sender, instance, using, **kwargs):
+    """Keep the full-text search index in sync with saved employees"""
+    search.index_employees([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Employee)
+def remember_unique_values(sender, instance, using, **kwargs):
+    """Add a saved employee's ID and email to the in-process uniqueness index"""
+    uniqueness.remember(instance.employee_id, instance.email, using=using)
+
+
+@receiver(post_delete, sender=Employee)
+def unindex_deleted_employee(sender, instance, using, **kwargs):
+    """Drop deleted employees from the full-text search index"""
+    search.unindex_employees([instance.pk], using=using)
+
+
+@receiver(pre_save, sender=Employee)
+def remember_previous_state(sender, instance, using, **kwargs):
+    """Load the stored row of an existing employee so post_save receivers can see what changed"""
+    instance._previous = None
+    if instance.pk is None:
+        return
+    instance._previous = Employee.objects.using(using).filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=Employee)
+def audit_saved_employee(sender, instance, created, using, **kwargs):
+    """Record the fields an edit changed in the audit log"""
+    previous = getattr(instance, '_previous', None)
+    if created or previous is None:
+        return
+    changes = audit.diff(previous, instance)
+    if changes:
+        audit.record_update(instance.pk, changes, using=using)
+
+
+@receiver(post_delete, sender=Employee)
+def audit_deleted_employee(sender, instance, using, **kwargs):
+    """Keep every field of a deleted employee in the audit log, and a tombstone for delta consumers"""
+    audit.record_delete(instance, using=using)
+    exports.record_tombstones([(instance.pk, instance.employee_id)], using=using)
+
+
+@receiver(post_save, sender=Employee)
+def update_rollup_on_save(sender, instance, using, **kwargs):
+    """Move a created or edited employee into its daily stats group"""
+    previous = getattr(instance, '_previous', None)
+    old_key = rollups.rollup_key(previous) if previous is not None else None
+    rollups.record_change(old_key, rollups.rollup_key(instance), using=using)
+
+
+@receiver(post_delete, sender=Employee)
+def update_rollup_on_delete(sender, instance, using, **kwargs):
+    """Remove a deleted employee from its daily stats group"""
+    rollups.record_change(rollups.rollup_key(instance), None, using=using)
+
+
+@receiver(post_save, sender=Employee)
+def queue_picture_variants(sender, instance, using, **kwargs):
+    """Generate thumbnails off the request path when a new profile picture is uploaded"""
+    name = instance.profile_picture.name
+    previous = getattr(instance, '_previous', None)
+    if not name or (previous is not None and previous.profile_picture.name == name):
+        return
+    transaction.on_commit(lambda: jobs.enqueue('thumbnails', {'names': [name]}), using=using)
+
+
+@receiver(post_delete, sender=Employee)
+def delete_profile_picture(sender, instance, using, **kwargs):
+    """Remove a deleted employee's picture and its variants once the delete is committed"""
+    name = instance.profile_picture.name
+    if name:
+        transaction.on_commit(lambda: images.delete_picture(name), using=using)
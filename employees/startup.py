@@ -0,0 +1,126 @@
+"""
+Cold start measurements for `manage.py startup_profile`.
+
+Each run starts a fresh interpreter with `python -X importtime`, imports
+the WSGI or ASGI entry point the way a newly spawned worker does, and
+times its first requests by calling the application object directly.
+Python's import time report (stderr of the child) gives the import cost
+per module.
+"""
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+
+ENTRY_POINTS = ('wsgi', 'asgi')
+
+# Prefix of the child's result line on stdout
+RESULT_MARKER = 'STARTUP-PROFILE '
+
+CHILD_SCRIPT = '''
+import asyncio, json, sys, time
+from wsgiref.util import setup_testing_defaults
+
+start = time.perf_counter()
+from employee_management import {entry} as entry
+loaded = time.perf_counter()
+# Only present when the entry point started a warm-up
+if 'employees.warmup' in sys.modules and {wait}:
+    sys.modules['employees.warmup'].wait()
+ready = time.perf_counter()
+
+
+def call_wsgi(path):
+    environ = {{'PATH_INFO': path, 'REQUEST_METHOD': 'GET', 'HTTP_HOST': 'localhost'}}
+    setup_testing_defaults(environ)
+    status = []
+    body = entry.application(environ, lambda line, headers, exc_info=None: status.append(line))
+    b''.join(body)
+    getattr(body, 'close', lambda: None)()
+    return int(status[0].split()[0])
+
+
+async def call_asgi(path):
+    scope = {{
+        'type': 'http', 'asgi': {{'version': '3.0'}}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'localhost')], 'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+    }}
+    messages = []
+    requests = [{{'type': 'http.request', 'body': b'', 'more_body': False}}]
+
+    async def receive():
+        # The body once, then no disconnect until the response is sent
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    await entry.application(scope, receive, send)
+    return messages[0]['status']
+
+
+responses = []
+for path in {paths!r}:
+    began = time.perf_counter()
+    status = call_wsgi(path) if {entry!r} == 'wsgi' else asyncio.run(call_asgi(path))
+    responses.append([path, status, time.perf_counter() - began])
+
+print({marker!r} + json.dumps({{
+    'load_seconds': loaded - start,
+    'wait_seconds': ready - loaded,
+    'responses': responses,
+}}), flush=True)
+'''
+
+
+def parse_import_times(report):
+    """[(module, self µs, cumulative µs)] from the `-X importtime` report on stderr"""
+    times = []
+    for line in report.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        times.append((module.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+
+def package_totals(import_times):
+    """{top-level package: self µs summed over its modules}, largest first"""
+    totals = defaultdict(int)
+    for module, self_us, _ in import_times:
+        totals[module.split('.')[0]] += self_us
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+
+def profile_start(entry='wsgi', warm_up=True, paths=('/',), wait=True):
+    """
+    Start one worker in a child process and return its timings: seconds to
+    import the entry point, seconds waited for the background warm-up (with
+    `wait`), (path, status, seconds) of each request in order, and the
+    per-module import times.
+    """
+    if entry not in ENTRY_POINTS:
+        raise ValueError(f"Unknown entry point '{entry}'; choose from {', '.join(ENTRY_POINTS)}")
+    script = CHILD_SCRIPT.format(entry=entry, wait=bool(wait), paths=list(paths), marker=RESULT_MARKER)
+    environment = {
+        **os.environ,
+        'WARM_UP_ON_START': '1' if warm_up else '0',
+        'PYTHONPATH': os.pathsep.join(filter(None, [str(settings.BASE_DIR), os.environ.get('PYTHONPATH')])),
+    }
+    child = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        cwd=settings.BASE_DIR, env=environment, capture_output=True, text=True,
+    )
+    results = [line for line in child.stdout.splitlines() if line.startswith(RESULT_MARKER)]
+    if child.returncode or not results:
+        errors = [line for line in child.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError(f"The {entry} worker failed to start:\n" + '\n'.join(errors[-20:]))
+    result = json.loads(results[-1][len(RESULT_MARKER):])
+    result['import_times'] = parse_import_times(child.stderr)
+    return result
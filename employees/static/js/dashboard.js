@@ -0,0 +1,69 @@
+// Dashboard charts, drawn from the JSON data blocks rendered by the page
+const departments = JSON.parse(document.getElementById('department-data').textContent);
+const genders = JSON.parse(document.getElementById('gender-data').textContent);
+
+// Department Chart
+if (departments.length) {
+    const deptCtx = document.getElementById('departmentChart').getContext('2d');
+    const deptLabels = departments.map(d => d.department);
+    const deptData = departments.map(d => d.count);
+
+    const deptColors = [
+        '#60a5fa', '#34d399', '#f87171', '#fbbf24',
+        '#a78bfa', '#14b8a6', '#f472b6', '#84cc16',
+        '#8b5cf6', '#38bdf8'
+    ];
+
+    new Chart(deptCtx, {
+        type: 'bar',
+        data: {
+            labels: deptLabels,
+            datasets: [{
+                data: deptData,
+                backgroundColor: deptLabels.map((_, i) => deptColors[i % deptColors.length]),
+                borderColor: '#0f172a',
+                borderWidth: 1.5,
+                borderRadius: 6,
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: { legend: { display: false } },
+            scales: {
+                y: { beginAtZero: true, ticks: { color: '#94a3b8' }, grid: { color: '#334155' } },
+                x: { ticks: { color: '#94a3b8' }, grid: { color: '#334155' } }
+            }
+        }
+    });
+}
+
+// Gender Chart
+if (genders.length) {
+    const genderCtx = document.getElementById('genderChart').getContext('2d');
+    const genderLabels = genders.map(g => g.gender);
+    const genderData = genders.map(g => g.count);
+
+    new Chart(genderCtx, {
+        type: 'doughnut',
+        data: {
+            labels: genderLabels,
+            datasets: [{
+                data: genderData,
+                backgroundColor: ['#3b82f6', '#ec4899', '#facc15'],
+                borderWidth: 2,
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            cutout: '65%',
+            plugins: {
+                legend: {
+                    position: 'bottom',
+                    labels: { color: '#cbd5e1', font: { size: 13 } }
+                }
+            }
+        }
+    });
+}
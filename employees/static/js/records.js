@@ -0,0 +1,155 @@
+// Records page: server-side filters, search suggestions and bulk actions.
+// Values rendered by the page come from the data attributes of this script's tag.
+const page = document.currentScript.dataset;
+
+// Initialize results count
+updateResultsCount();
+
+// Filters are applied by the server - keep the current selections and resubmit
+document.getElementById('genderFilter').value = page.gender;
+document.getElementById('departmentFilter').value = page.department;
+document.getElementById('roleFilter').value = page.role;
+
+function filterRecords() {
+  document.getElementById('filterForm').submit();
+}
+
+function searchRecords() {
+  const searchBtn = document.querySelector('.search-btn');
+  searchBtn.textContent = 'Searching...';
+}
+
+function clearFilters() {
+  document.getElementById('searchInput').value = '';
+  document.getElementById('departmentFilter').value = '';
+  document.getElementById('roleFilter').value = '';
+  document.getElementById('genderFilter').value = '';
+  filterRecords();
+}
+
+// Autocomplete suggestions from the search index
+let suggestTimer = null;
+document.getElementById('searchInput').addEventListener('input', function() {
+  const query = this.value.trim();
+  clearTimeout(suggestTimer);
+  if (query.length < 2) return;
+  suggestTimer = setTimeout(() => {
+    fetch(page.autocompleteUrl + "?q=" + encodeURIComponent(query))
+      .then(response => response.json())
+      .then(data => {
+        const list = document.getElementById('searchSuggestions');
+        list.innerHTML = '';
+        data.results.forEach(result => {
+          const option = document.createElement('option');
+          option.value = result.name;
+          option.label = `${result.employee_id} • ${result.department}`;
+          list.appendChild(option);
+        });
+      });
+  }, 200);
+});
+
+function updateResultsCount() {
+  const visibleRows = document.querySelectorAll('.record-row:not([style*="display: none"])').length;
+  document.getElementById('resultsCount').textContent = visibleRows;
+}
+
+// Bulk selection functionality
+document.getElementById('selectAll').addEventListener('change', function() {
+  const checkboxes = document.querySelectorAll('.employee-checkbox');
+  checkboxes.forEach(checkbox => {
+    checkbox.checked = this.checked;
+  });
+  updateBulkActions();
+});
+
+document.querySelectorAll('.employee-checkbox').forEach(checkbox => {
+  checkbox.addEventListener('change', updateBulkActions);
+});
+
+function updateBulkActions() {
+  const selectedCount = document.querySelectorAll('.employee-checkbox:checked').length;
+  const bulkActions = document.getElementById('bulkActions');
+  const selectedCountSpan = document.getElementById('selectedCount');
+
+  selectedCountSpan.textContent = selectedCount;
+
+  if (selectedCount > 0) {
+    bulkActions.style.display = 'flex';
+  } else {
+    bulkActions.style.display = 'none';
+  }
+}
+
+// Bulk edit choices mirror the sidebar filter options
+function copyOptions(sourceId, targetId, placeholder) {
+  const target = document.getElementById(targetId);
+  target.innerHTML = '';
+  target.appendChild(new Option(placeholder, ''));
+  document.querySelectorAll(`#${sourceId} option`).forEach(option => {
+    if (option.value) target.appendChild(new Option(option.textContent, option.value));
+  });
+}
+copyOptions('departmentFilter', 'bulkDepartment', 'Keep department');
+copyOptions('roleFilter', 'bulkRole', 'Keep role');
+
+function bulkScopeAll() {
+  const scope = document.getElementById('bulkScopeAll');
+  return scope !== null && scope.checked;
+}
+
+function bulkTargetLabel() {
+  return bulkScopeAll()
+    ? `all ${page.totalCount} matching employees`
+    : `${document.querySelectorAll('.employee-checkbox:checked').length} employees`;
+}
+
+function submitBulkForm(action, fields) {
+  const form = document.createElement('form');
+  form.method = 'POST';
+  form.action = action;
+
+  const addField = (name, value) => {
+    const input = document.createElement('input');
+    input.type = 'hidden';
+    input.name = name;
+    input.value = value;
+    form.appendChild(input);
+  };
+
+  addField('csrfmiddlewaretoken', document.querySelector('[name=csrfmiddlewaretoken]').value);
+  addField('filters', page.filters);
+  if (bulkScopeAll()) {
+    addField('scope', 'all');
+  } else {
+    document.querySelectorAll('.employee-checkbox:checked').forEach(checkbox => {
+      addField('employee_ids', checkbox.value);
+    });
+  }
+  Object.entries(fields).forEach(([name, value]) => addField(name, value));
+
+  document.body.appendChild(form);
+  form.submit();
+}
+
+function confirmBulkDelete() {
+  if (confirm(`Are you sure you want to delete ${bulkTargetLabel()}? This action cannot be undone.`)) {
+    submitBulkForm(page.bulkDeleteUrl, {});
+  }
+}
+
+function confirmBulkEdit() {
+  const department = document.getElementById('bulkDepartment').value;
+  const role = document.getElementById('bulkRole').value;
+  if (!department && !role) {
+    alert('Choose a new department or role first.');
+    return;
+  }
+  const changes = [department && `department to ${department}`, role && `role to ${role}`].filter(Boolean).join(' and ');
+  if (confirm(`Change the ${changes} for ${bulkTargetLabel()}?`)) {
+    submitBulkForm(page.bulkEditUrl, {department: department, role: role});
+  }
+}
+
+// Initialize on page load
+document.addEventListener('DOMContentLoaded', updateResultsCount);
@@ -0,0 +1,184 @@
+import hashlib
+from collections import Counter
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from . import columnar, lookups
+from .exports import last_change
+from .filters import filter_daily_stats, filter_employees, parse_date_range
+from .models import DailyEmployeeStat, Employee
+
+# Cache alias holding computed dashboard statistics (see CACHES in settings)
+DASHBOARD_CACHE = 'dashboard'
+
+GENDERS = ['Male', 'Female', 'Other']
+
+# Days of hiring history in the monthly trend
+TREND_DAYS = 180
+
+
+def dashboard_cache():
+    return caches[DASHBOARD_CACHE]
+
+
+def _cache_key(params):
+    # Keyed on the last employee change, which is read from the database, so a
+    # change made by any process (another web worker, the job worker) retires
+    # the entries of every process
+    changed = last_change()
+    filters = '|'.join(params.get(key) or '' for key in ('department', 'date_from', 'date_to'))
+    digest = hashlib.md5(f"{changed.isoformat() if changed else ''}|{filters}".encode()).hexdigest()
+    return f'dashboard:{digest}'
+
+
+def _dashboard_queries(params):
+    """The independent dashboard queries: (groups, monthly hires, recent employees)"""
+    daily_stats = filter_daily_stats(DailyEmployeeStat.objects.all(), params)
+
+    gender_counts = {
+        gender.lower(): Sum('count', filter=Q(gender=gender), default=0) for gender in GENDERS
+    }
+    groups = daily_stats.order_by().values('department_id', 'role_id').annotate(total=Sum('count'), **gender_counts)
+
+    # Monthly hiring trend for line chart (last 6 months)
+    six_months_ago = timezone.localdate() - timedelta(days=TREND_DAYS)
+    monthly_hires = daily_stats.filter(
+        day__gte=six_months_ago
+    ).annotate(
+        month=TruncMonth('day')
+    ).values('month').annotate(
+        total=Sum('count')
+    ).order_by('month')
+
+    return groups, monthly_hires, _recent_employees(params)
+
+
+def _recent_employees(params):
+    # The newest hires come straight from the created_at index
+    return filter_employees(Employee.objects.all(), params).order_by('-created_at').values(
+        'first_name', 'surname', 'department_id', 'role_id', 'created_at'
+    )[:5]
+
+
+def _snapshot_aggregates(snapshot, params):
+    """The groups and monthly hires of _dashboard_queries(), scanned from the columnar snapshot"""
+    date_from, date_to = parse_date_range(params)
+    equals = {'department': params['department']} if params.get('department') else None
+    mask = snapshot.select(equals, hired_from=date_from, hired_to=date_to)
+
+    departments, roles, genders = (snapshot.values[column] for column in ('department', 'role', 'gender'))
+    groups = {}
+    for (department, role, gender), count in snapshot.code_counts(['department', 'role', 'gender'], mask).items():
+        group = groups.setdefault((department, role), {
+            'department_id': departments[department], 'role_id': roles[role], 'total': 0,
+            **{name.lower(): 0 for name in GENDERS},
+        })
+        group['total'] += count
+        if genders[gender] in GENDERS:
+            group[genders[gender].lower()] += count
+
+    since = timezone.localdate() - timedelta(days=TREND_DAYS)
+    trend = snapshot.select(equals, hired_from=max(since, date_from or since), hired_to=date_to)
+    monthly_hires = [{'month': month, 'total': count} for month, count in snapshot.hiring_cohorts(trend, 'month')]
+    return list(groups.values()), monthly_hires
+
+
+def _assemble_stats(groups, monthly_hires, recent_employees):
+    total_employees = 0
+    departments = Counter()
+    roles = Counter()
+    genders = Counter()
+    for group in groups:
+        total_employees += group['total']
+        if group['department_id']:
+            departments[group['department_id']] += group['total']
+        if group['role_id']:
+            roles[group['role_id']] += group['total']
+        for gender in GENDERS:
+            genders[gender] += group[gender.lower()]
+
+    # Groups are counted by lookup id; names are attached at the end
+    department_names = lookups.names('department', [*departments, *(row['department_id'] for row in recent_employees)])
+    role_names = lookups.names('role', [*roles, *(row['role_id'] for row in recent_employees)])
+
+    gender_data = []
+    for gender in GENDERS:
+        count = genders[gender]
+        if count > 0:
+            percentage = round((count / total_employees) * 100, 1) if total_employees > 0 else 0
+            gender_data.append({'gender': gender, 'count': count, 'percentage': percentage})
+
+    return {
+        'total_employees': total_employees,
+        'departments': [
+            {'department': department_names.get(pk, ''), 'count': count} for pk, count in departments.most_common()
+        ],
+        'genders': gender_data,
+        'roles': [{'role': role_names.get(pk, ''), 'count': count} for pk, count in roles.most_common(8)],
+        'recent_employees': [{
+            'first_name': row['first_name'],
+            'surname': row['surname'],
+            'department': department_names.get(row['department_id'], ''),
+            'role': role_names.get(row['role_id'], ''),
+            'created_at': row['created_at'],
+        } for row in recent_employees],
+        'monthly_hires': [{'month': row['month'], 'count': row['total']} for row in monthly_hires],
+    }
+
+
+def _current_snapshot():
+    """The columnar snapshot, if it is recent and no employee has changed since it was taken"""
+    snapshot = columnar.current_snapshot(max_age=settings.DASHBOARD_SNAPSHOT_MAX_AGE)
+    if snapshot is None or columnar.changed_since(snapshot.watermark):
+        return None
+    return snapshot
+
+
+async def acompute_dashboard_stats(params):
+    """
+    Compute every dashboard aggregate for the given filters.
+
+    Counts are read from the DailyEmployeeStat rollup, so the cost depends
+    on the number of distinct days and groups rather than on the number of
+    employees. Totals, department, role and gender breakdowns come from a
+    single GROUP BY department_id, role_id pass with conditional gender sums; the
+    monthly trend is a second grouped pass. Every query runs in one trip to
+    the sync thread.
+
+    While a columnar snapshot younger than DASHBOARD_SNAPSHOT_MAX_AGE
+    exists (see columnar.py) and no employee has changed since it was
+    taken, the counts are scanned from it instead, and only the five newest
+    hires are read from the database. After any change the rollups are
+    used, so the totals always agree with the list of recent hires.
+    """
+    return await sync_to_async(_compute_dashboard_stats)(params)
+
+
+def _compute_dashboard_stats(params):
+    snapshot = _current_snapshot()
+    if snapshot is not None:
+        groups, monthly_hires = _snapshot_aggregates(snapshot, params)
+        return _assemble_stats(groups, monthly_hires, list(_recent_employees(params)))
+    return _assemble_stats(*(list(queryset) for queryset in _dashboard_queries(params)))
+
+
+async def adepartment_choices():
+    """Departments for the dashboard filter dropdown, from the cached lookup table"""
+    return await lookups.achoices('department')
+
+
+async def aget_dashboard_stats(params):
+    """Return dashboard statistics for the given filters, from the cache when possible"""
+    cache = dashboard_cache()
+    key = await sync_to_async(_cache_key)(params)
+    stats = await cache.aget(key)
+    if stats is None:
+        stats = await acompute_dashboard_stats(params)
+        await cache.aset(key, stats)
+    return stats
@@ -1,3 +1,932 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import tempfile
+import threading
+import zipfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, connection, connections
+from django.db.models import Sum
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from . import (
+    api, assets, audit, benchmarks, bulk, columnar, exports, fragments, images, imports, jobs, lookups, metrics,
+    reports, rollups, search, stats, uniqueness, views, warmup,
+)
+from .models import AuditEvent, DailyEmployeeStat, Employee, EmployeeTombstone, Job
+
+
+def _rows(count, start=0, **values):
+    """Synthetic employee rows with `values` overriding every row's fields"""
+    return [{**row, **values} for row in benchmarks.employee_rows(count, start=start)]
+
+
+def _create(count, start=0, **values):
+    """Insert synthetic employees as an import does; return them in id order"""
+    ids = imports.insert_employees(_rows(count, start, **values))
+    return list(Employee.objects.filter(id__in=ids).order_by('id'))
+
+
+# The replica's own connection cannot see a test's uncommitted rows, so
+# read-only views read from 'default' here (ReplicaRoutingTests covers routing)
+@override_settings(DATABASE_ROUTERS=[])
+class EmployeeTestCase(TestCase):
+    """Starts every test with empty in-process lookup, uniqueness and page caches"""
+
+    def setUp(self):
+        lookups.clear()
+        uniqueness._indexes.clear()
+        uniqueness._pending.clear()
+        # A background build would read through its own connection, which
+        # cannot see the test's rows; tests build the index explicitly
+        self.enterContext(mock.patch.object(uniqueness, 'start_build'))
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
+    def superuser_client(self):
+        client = Client()
+        client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        return client
+
+    def use_temporary_media(self):
+        """Point MEDIA_ROOT at a directory removed after the test; return its path"""
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=directory))
+        return directory
+
+    def assertRollupsMatch(self):
+        """The daily stats equal a fresh count of the employees table"""
+        stored = {
+            (stat.day, stat.department_id, stat.role_id, stat.gender, stat.state_id): stat.count
+            for stat in DailyEmployeeStat.objects.filter(count__gt=0)
+        }
+        self.assertEqual(stored, dict(rollups.group_counts(Employee.objects.all())))
+
+
+class ConcurrentWriteTests(TransactionTestCase):
+    """Writers on separate connections wait for the write lock instead of failing"""
+
+    WRITERS = 6
+    BATCHES = 3
+    BATCH_SIZE = 10
+
+    def setUp(self):
+        lookups.clear()
+
+    def _write(self, start, errors):
+        try:
+            rows = list(benchmarks.employee_rows(self.BATCHES * self.BATCH_SIZE + 1, start=start))
+            # Bulk inserts as an import job runs them, and a form post as a web request does
+            for offset in range(0, self.BATCHES * self.BATCH_SIZE, self.BATCH_SIZE):
+                imports.insert_employees(rows[offset:offset + self.BATCH_SIZE])
+            response = Client().post('/', benchmarks._form_fields(rows[-1]))
+            if response.status_code != 302:
+                errors.append(f"form post answered {response.status_code}")
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    def _run_writers(self, start):
+        errors = []
+        threads = [
+            threading.Thread(target=self._write, args=(start + number * 1000, errors))
+            for number in range(self.WRITERS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_concurrent_writers(self):
+        per_run = self.WRITERS * (self.BATCHES * self.BATCH_SIZE + 1)
+        for run, journal_mode in enumerate(['delete', 'wal']):
+            with self.subTest(journal_mode=journal_mode):
+                with connection.cursor() as cursor:
+                    cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+                errors = self._run_writers(start=run * 100_000)
+                self.assertEqual(errors, [])
+                self.assertEqual(Employee.objects.count(), (run + 1) * per_run)
+                # No rollup increment was lost to a concurrent one
+                self.assertEqual(DailyEmployeeStat.objects.aggregate(total=Sum('count'))['total'], (run + 1) * per_run)
+
+
+class BenchmarkTests(EmployeeTestCase):
+    """The generator is reproducible and every benchmark scenario runs"""
+
+    def test_rows_are_reproducible(self):
+        self.assertEqual(list(benchmarks.employee_rows(5, seed=1)), list(benchmarks.employee_rows(5, seed=1)))
+        first = {row['employee_id'] for row in benchmarks.employee_rows(5)}
+        self.assertFalse(first & {row['employee_id'] for row in benchmarks.employee_rows(5, start=5)})
+
+    def test_scenarios(self):
+        benchmarks.generate_employees(30)
+        self.assertEqual(DailyEmployeeStat.objects.aggregate(total=Sum('count'))['total'], 30)
+        results = benchmarks.run_scenarios(self.superuser_client(), repeat=1)
+        self.assertEqual(set(results), {scenario.name for scenario in benchmarks.default_scenarios()})
+        for result in results.values():
+            self.assertGreater(result['queries'], 0)
+
+
+class ExportTests(EmployeeTestCase):
+    """The CSV export walks the table in id keyset batches"""
+
+    def test_batches_cover_every_row_once(self):
+        employees = _create(8)
+        rows = list(exports.iter_export_rows(batch_size=3))
+        self.assertEqual([row[0] for row in rows], [employee.employee_id for employee in employees])
+
+    def test_export_view_applies_filters(self):
+        _create(3, department='Finance')
+        _create(4, start=100, department='Logistics')
+        response = self.superuser_client().get('/export/csv/', {'department': 'Finance'})
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], exports.EXPORT_HEADERS)
+        self.assertEqual(len(rows) - 1, 3)
+        department = exports.EXPORT_FIELDS.index('department__name')
+        self.assertEqual({row[department] for row in rows[1:]}, {'Finance'})
+
+
+class RecordsPageTests(EmployeeTestCase):
+    """The records page pages by id cursor unless it shows ranked search results"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.superuser_client()
+        self.employees = _create(12, department='Finance')
+
+    def test_keyset_by_default(self):
+        response = self.client.get('/records/')
+        self.assertTrue(response.context['keyset'])
+        page = response.context['page_obj']
+        self.assertEqual(list(page), self.employees[:10])
+        response = self.client.get('/records/', {'after': page.next_cursor})
+        self.assertEqual(list(response.context['page_obj']), self.employees[10:])
+        self.assertEqual((response.context['total_count'], response.context['count_exact']), (12, True))
+
+    def test_filters_and_search(self):
+        self.employees[3].gender = 'Other'
+        self.employees[3].save()
+        response = self.client.get('/records/', {'gender': 'Other', 'department': 'Finance'})
+        self.assertEqual(list(response.context['page_obj']), [self.employees[3]])
+        # Searches keep relevance order on numbered pages
+        response = self.client.get('/records/', {'q': self.employees[5].employee_id})
+        self.assertFalse(response.context['keyset'])
+        self.assertEqual(list(response.context['page_obj']), [self.employees[5]])
+
+
+class SearchTests(EmployeeTestCase):
+    """Full-text search matches prefixes and close spellings, best matches first"""
+
+    def setUp(self):
+        super().setUp()
+        # The better match is created last, so id order cannot pass for rank order
+        self.surname, self.both, self.other = [
+            _create(1, start=number, first_name=first_name, surname=surname, other_name=None,
+                    email=f'person{number}@example.com', department='Finance', role='Analyst')[0]
+            for number, (first_name, surname) in enumerate([
+                ('Chidi', 'Okafor'), ('Okafor', 'Okafor'), ('Chidi', 'Bello'),
+            ])
+        ]
+
+    def test_ranked_by_relevance(self):
+        self.assertTrue(search.fts_enabled())
+        matches = list(search.ranked_search(Employee.objects.all(), 'okafor'))
+        self.assertEqual(matches, [self.both, self.surname])
+
+    def test_prefix_and_fuzzy_matches(self):
+        self.assertEqual(set(search.filter_search(Employee.objects.all(), 'oka')), {self.both, self.surname})
+        self.assertEqual(set(search.filter_search(Employee.objects.all(), 'okafro')), {self.both, self.surname})
+        self.assertFalse(search.filter_search(Employee.objects.all(), 'okafro', fuzzy=False).exists())
+
+    def test_edits_are_reindexed(self):
+        self.other.surname = 'Okafor'
+        self.other.save()
+        self.assertIn(self.other, search.filter_search(Employee.objects.all(), 'okafor'))
+
+
+class DashboardTests(EmployeeTestCase):
+    """Dashboard counts come from the rollups and are cached until any employee changes"""
+
+    def dashboard(self, **params):
+        return async_to_sync(stats.aget_dashboard_stats)(params)
+
+    def test_counts(self):
+        _create(4, department='Finance', gender='Female')
+        _create(2, start=100, department='Logistics', gender='Male')
+        response = self.superuser_client().get('/dashboard/')
+        self.assertEqual(response.context['total_employees'], 6)
+        self.assertEqual(response.context['departments'], [
+            {'department': 'Finance', 'count': 4}, {'department': 'Logistics', 'count': 2},
+        ])
+        self.assertEqual(self.dashboard(department='Logistics')['total_employees'], 2)
+        self.assertEqual(len(self.dashboard()['recent_employees']), 5)
+
+    def test_cache_follows_changes_from_any_process(self):
+        _create(3)
+        self.assertEqual(self.dashboard()['total_employees'], 3)
+        with mock.patch.object(stats, '_compute_dashboard_stats', wraps=stats._compute_dashboard_stats) as compute:
+            self.dashboard()
+            compute.assert_not_called()
+            # Bulk writes signal nothing to this process; the cache key still moves
+            _create(2, start=100)
+            self.assertEqual(self.dashboard()['total_employees'], 5)
+            bulk.delete_employees(Employee.objects.filter(pk=Employee.objects.earliest('id').pk))
+            self.assertEqual(self.dashboard()['total_employees'], 4)
+        self.assertEqual(compute.call_count, 2)
+
+    def test_cached_hit_reads_only_the_last_change(self):
+        _create(3)
+        self.dashboard()
+        with CaptureQueriesContext(connection) as queries:
+            self.dashboard()
+        self.assertEqual(len(queries), 2)
+
+
+class RollupTests(EmployeeTestCase):
+    """Daily stats follow every create, edit and delete"""
+
+    def test_single_changes(self):
+        employee = _create(5)[0]
+        self.assertRollupsMatch()
+        employee.department_id = lookups.get_id('department', 'Audit', create=True)
+        employee.gender = 'Female' if employee.gender != 'Female' else 'Male'
+        employee.save()
+        self.assertRollupsMatch()
+        employee.delete()
+        self.assertRollupsMatch()
+        self.assertEqual(DailyEmployeeStat.objects.aggregate(total=Sum('count'))['total'], 4)
+
+    def test_rebuild(self):
+        _create(6)
+        DailyEmployeeStat.objects.update(count=0)
+        rollups.rebuild_daily_stats()
+        self.assertRollupsMatch()
+
+
+class ImportTests(EmployeeTestCase):
+    """Invalid and duplicate rows are reported by row number; the rest are imported"""
+
+    def test_validation_and_duplicates(self):
+        existing = _create(1)[0]
+        rows = _rows(6, start=10)
+        rows[1]['email'] = 'not an email'
+        rows[2]['ward'] = 'Nowhere Ward'
+        rows[3]['employee_id'] = rows[0]['employee_id']
+        rows[4]['employee_id'] = existing.employee_id
+        rows[5]['date_of_birth'] = '31/12/1990'
+        result = imports.import_employees(rows, batch_size=4)
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(sorted({row_number for row_number, _ in result.errors}), [3, 4, 5, 6, 7])
+        messages = dict(result.errors)
+        self.assertIn("Invalid email", messages[3])
+        self.assertIn("Nowhere Ward", messages[4])
+        self.assertIn("more than once in the file", messages[5])
+        self.assertEqual(messages[6], f"Employee ID '{existing.employee_id}' already exists.")
+        self.assertIn("Invalid date of birth", messages[7])
+        self.assertEqual(Employee.objects.count(), 2)
+
+    def test_csv_headers_are_normalized(self):
+        file = io.BytesIO('\ufeffEmployee ID,First Name,DOB\nE-1,Ada,1990-01-02\n'.encode())
+        self.assertEqual(list(imports.read_rows(file, 'staff.csv')),
+                         [{'employee_id': 'E-1', 'first_name': 'Ada', 'date_of_birth': '1990-01-02'}])
+
+    def test_location_names_are_normalized(self):
+        row = _rows(1)[0]
+        data, errors = imports.clean_row({**row, 'state': row['state'].upper(), 'lga': row['lga'].lower()})
+        self.assertEqual(errors, [])
+        self.assertEqual((data['state'], data['lga']), (row['state'], row['lga']))
+
+    def test_rows_saved_after_the_uniqueness_check(self):
+        # Another process inserting the same ID between the check and the insert
+        existing = _create(1)[0]
+        rows = _rows(3, start=10)
+        rows[1]['employee_id'] = existing.employee_id
+        with mock.patch.object(uniqueness, 'existing_values', return_value=(set(), set())):
+            result = imports.import_employees(rows)
+        self.assertEqual(result.created, 2)
+        self.assertEqual(result.errors, [(3, f"Employee ID '{existing.employee_id}' already exists.")])
+
+
+class JobTests(EmployeeTestCase):
+    """The worker runs queued jobs; jobs abandoned by a stopped worker are requeued, then failed"""
+
+    def setUp(self):
+        super().setUp()
+        # A worker thread closes its connection after each job; here that is the test's transaction
+        self.enterContext(mock.patch.object(jobs, 'close_old_connections'))
+
+    def test_export_job(self):
+        media = self.use_temporary_media()
+        _create(3, department='Finance')
+        _create(2, start=100, department='Logistics')
+        job = jobs.enqueue('export_csv', {'department': 'Finance'})
+        jobs.run_job(jobs.claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.total), ('done', 3, 3))
+        with open(Path(media) / job.result_file.name, newline='') as file:
+            self.assertEqual(len(list(csv.reader(file))), 4)
+
+    def test_failed_job(self):
+        job = jobs.enqueue('bulk_update', {'ids': [], 'changes': {}})
+        with self.assertLogs('employees.jobs', 'ERROR'):
+            jobs.run_job(jobs.claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn("Choose at least one field", job.message)
+
+    def test_abandoned_jobs_are_recovered(self):
+        long_ago = timezone.now() - timedelta(seconds=jobs.STALE_JOB_TIMEOUT + 1)
+        job = jobs.enqueue('export_csv')
+        alive = jobs.enqueue('export_csv')
+        for claimed in (job, alive):
+            self.assertEqual(jobs.claim_next_job(), claimed)
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=long_ago)
+        with self.assertLogs('employees.jobs', 'WARNING') as logs:
+            self.assertEqual(jobs.recover_stale_jobs(), (1, 0))
+        self.assertIn("1 requeued, 0 failed", logs.output[0])
+
+        self.assertEqual(jobs.claim_next_job(), job)
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=long_ago)
+        with self.assertLogs('employees.jobs', 'WARNING'):
+            self.assertEqual(jobs.recover_stale_jobs(), (0, 1))
+        job.refresh_from_db()
+        alive.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, alive.status), ('failed', 2, 'running'))
+
+
+def _picture(width=640, height=480):
+    """PNG bytes of a plain picture"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 80, 40)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class ThumbnailTests(EmployeeTestCase):
+    """Uploads queue a thumbnail job; variants are resized and deleted with the original"""
+
+    def setUp(self):
+        super().setUp()
+        self.use_temporary_media()
+        self.enterContext(mock.patch.object(jobs, 'close_old_connections'))
+        self.employee = _create(1)[0]
+
+    def test_upload_queues_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employee.profile_picture.save('ada.png', ContentFile(_picture()))
+        name = self.employee.profile_picture.name
+        job = Job.objects.get(kind='thumbnails')
+        self.assertEqual(job.params, {'names': [name]})
+
+        jobs.run_job(jobs.claim_next_job())
+        for path in images.variant_names(name):
+            self.assertTrue(default_storage.exists(path), path)
+        with default_storage.open(images.variant_name(name, 'thumb', 'jpg')) as file:
+            self.assertEqual(Image.open(file).size, (100, 100))
+        with default_storage.open(images.variant_name(name, 'detail', 'webp')) as file:
+            self.assertEqual(Image.open(file).size, (400, 300))
+        self.assertEqual(images.variant_urls(name, 'thumb')['width'], 100)
+        # Existing variants are not written again
+        self.assertEqual(images.generate_variants(name), 0)
+
+    def test_delete_removes_variants(self):
+        self.employee.profile_picture.save('ada.png', ContentFile(_picture()))
+        name = self.employee.profile_picture.name
+        images.generate_variants(name)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employee.delete()
+        self.assertFalse(any(default_storage.exists(path) for path in [name, *images.variant_names(name)]))
+        self.assertIsNone(images.variant_urls(name, 'thumb'))
+
+
+class MetricsTests(EmployeeTestCase):
+    """Every request is measured, streamed ones once their body is consumed"""
+
+    def setUp(self):
+        super().setUp()
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+        self.client = self.superuser_client()
+        _create(3)
+
+    def test_requests_are_recorded(self):
+        self.client.get('/records/')
+        response = self.client.get('/export/csv/')
+        size = len(b''.join(response.streaming_content))
+        text = self.client.get('/metrics/').content.decode()
+
+        self.assertIn('employees_http_requests_total{view="view_records",method="GET",status="200"} 1', text)
+        self.assertIn(f'employees_http_response_size_bytes_sum{{view="export_employees_csv"}} {size}', text)
+        self.assertIn('employees_db_queries_per_request_count{view="view_records"} 1', text)
+        self.assertEqual(metrics.registry.requests[('export_employees_csv', 'GET', '200')], 1)
+
+    def test_query_recorder(self):
+        recorder = metrics.QueryRecorder(lambda: 0)
+        with connection.execute_wrapper(recorder):
+            for employee in Employee.objects.all():
+                Employee.objects.filter(pk=employee.pk).exists()
+        self.assertEqual((recorder.count, recorder.duplicates), (4, 2))
+
+    @override_settings(SLOW_REQUEST_SECONDS=0)
+    def test_slow_requests_are_logged(self):
+        with self.assertLogs('employees.performance', 'WARNING') as logs:
+            Client().get('/')
+        self.assertIn("Slow request GET /", logs.output[0])
+        self.assertEqual(metrics.registry.slow_requests[('employee_form',)], 1)
+
+
+class BulkTests(EmployeeTestCase):
+    """Bulk edits and deletes keep rollups and the search index in step, chunk by chunk"""
+
+    def test_bulk_changes(self):
+        employees = _create(12)
+        bulk.update_employees(Employee.objects.filter(id__lte=employees[5].id),
+                              {'department': 'Audit', 'role': 'Clerk'}, chunk_size=4)
+        self.assertRollupsMatch()
+        self.assertEqual(search.filter_search(Employee.objects.all(), 'audit').count(), 6)
+        bulk.delete_employees(Employee.objects.filter(department__name='Audit'), chunk_size=4)
+        self.assertRollupsMatch()
+        self.assertEqual(Employee.objects.count(), 6)
+        self.assertFalse(search.filter_search(Employee.objects.all(), 'audit').exists())
+
+    def test_clean_changes(self):
+        self.assertEqual(bulk.clean_changes({'department': ' Audit ', 'role': ''}), {'department': 'Audit'})
+        for changes in [{}, {'state': 'Lagos'}, {'email': 'a@example.com'}]:
+            with self.assertRaises(ValueError):
+                bulk.clean_changes(changes)
+
+    def test_large_selections_go_to_the_job_worker(self):
+        client = self.superuser_client()
+        employees = _create(3)
+        ids = [employee.pk for employee in employees]
+        with mock.patch.object(views, 'BACKGROUND_BULK_THRESHOLD', 2):
+            client.post('/bulk-edit/', {'employee_ids': ids, 'department': 'Audit'})
+            client.post('/bulk-delete/', {'employee_ids': ids[:2]})
+        self.assertEqual(list(Job.objects.order_by('id').values_list('kind', flat=True)), ['bulk_update'])
+        self.assertEqual(Employee.objects.count(), 1)
+        self.assertNotEqual(Employee.objects.get().department.name, 'Audit')
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """Read-only views read employees through the replica alias, including streamed bodies"""
+
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        lookups.clear()
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        _create(3)
+        self.client = Client()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def tearDown(self):
+        connections.close_all()
+
+    def employee_queries(self, alias, path):
+        with CaptureQueriesContext(connections[alias]) as queries:
+            response = self.client.get(path)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries if '"employees"' in query['sql']]
+
+    def test_reads_use_the_replica(self):
+        for path in ['/records/', '/export/csv/', '/api/employees/']:
+            with self.subTest(path=path):
+                self.assertTrue(self.employee_queries('replica', path))
+                self.assertFalse(self.employee_queries('default', path))
+
+    def test_writes_use_default(self):
+        employee = Employee.objects.first()
+        with CaptureQueriesContext(connections['replica']) as queries:
+            self.client.post('/bulk-delete/', {'employee_ids': [employee.pk]})
+        self.assertFalse(Employee.objects.filter(pk=employee.pk).exists())
+        self.assertFalse([query for query in queries if query['sql'].startswith('DELETE')])
+
+
+class FragmentTests(EmployeeTestCase):
+    """Cached row and detail fragments follow `updated_at`, however the row was changed"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.superuser_client()
+        self.employee = _create(1)[0]
+
+    def touch(self, **changes):
+        # A plain UPDATE, as another process or a bulk edit would run it
+        Employee.objects.filter(pk=self.employee.pk).update(updated_at=timezone.now(), **changes)
+
+    def test_detail_fragment(self):
+        self.client.get(f'/employee/view/{self.employee.pk}/')
+        with self.assertNumQueries(1):
+            self.assertIsNotNone(async_to_sync(fragments.acached_detail)(self.employee.pk))
+
+        self.touch(first_name='Renamed')
+        self.assertIsNone(async_to_sync(fragments.acached_detail)(self.employee.pk))
+        self.assertContains(self.client.get(f'/employee/view/{self.employee.pk}/'), 'Renamed')
+
+    def test_row_fragments(self):
+        self.assertContains(self.client.get('/records/'), self.employee.first_name)
+        self.touch(first_name='Renamed')
+        self.assertContains(self.client.get('/records/'), 'Renamed')
+
+    def test_deleted_employee(self):
+        self.client.get(f'/employee/view/{self.employee.pk}/')
+        Employee.objects.filter(pk=self.employee.pk).delete()
+        self.assertEqual(self.client.get(f'/employee/view/{self.employee.pk}/').status_code, 404)
+
+
+class ProjectionTests(EmployeeTestCase):
+    """List pages load only the columns they render"""
+
+    def setUp(self):
+        super().setUp()
+        _create(2)
+
+    def test_projected_querysets(self):
+        for queryset in [Employee.objects.for_records(), Employee.objects.for_changelist()]:
+            employee = queryset.first()
+            self.assertIn('address', employee.get_deferred_fields())
+            # The lookup names come from the same query
+            with self.assertNumQueries(0):
+                employee.department.name, employee.role.name
+
+        employee = Employee.objects.for_fragment_keys().first()
+        self.assertEqual(
+            {field.attname for field in Employee._meta.concrete_fields} - employee.get_deferred_fields(),
+            {'id', 'updated_at'},
+        )
+
+    def test_records_page_skips_the_address(self):
+        client = self.superuser_client()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get('/records/').status_code, 200)
+        employee_queries = [query['sql'] for query in queries if 'FROM "employees"' in query['sql']]
+        self.assertTrue(employee_queries)
+        self.assertFalse([sql for sql in employee_queries if '"address"' in sql])
+
+
+class UniquenessTests(EmployeeTestCase):
+    """A Bloom filter never misses a value; its false positives are settled by the database"""
+
+    def test_no_false_negatives_and_few_false_positives(self):
+        bloom = uniqueness.BloomFilter(1000)
+        values = [f'EMP-{number}' for number in range(1000)]
+        for value in values:
+            bloom.add(value)
+        self.assertTrue(all(value in bloom for value in values))
+        false_positives = sum(f'OTHER-{number}' in bloom for number in range(10_000))
+        self.assertLess(false_positives, 10_000 * uniqueness.ERROR_RATE * 3)
+
+    def test_false_positives_are_checked(self):
+        employee = _create(1)[0]
+        index = uniqueness.build_index()
+        # A saturated filter answers "maybe" for every value
+        for bloom in index.filters.values():
+            bloom.bits[:] = b'\xff' * len(bloom.bits)
+        self.assertTrue(index.might_exist('employee_id', 'FREE-1'))
+        self.assertEqual(uniqueness.taken_fields({'employee_id': 'FREE-1', 'email': 'free@example.com'}), set())
+        self.assertEqual(uniqueness.taken_fields({'employee_id': employee.employee_id}), {'employee_id'})
+        self.assertEqual(uniqueness.taken_fields({'employee_id': employee.employee_id}, exclude=employee.pk), set())
+        self.assertEqual(
+            uniqueness.existing_values(['FREE-1', employee.employee_id], ['free@example.com']),
+            ({employee.employee_id}, {employee.email}),
+        )
+
+    def test_resaves_do_not_fill_the_filter(self):
+        bloom = uniqueness.BloomFilter(100)
+        for _ in range(3):
+            bloom.add('EMP-1')
+        self.assertEqual(bloom.count, 1)
+
+        employee = _create(1)[0]
+        index = uniqueness.build_index()
+        for _ in range(3):
+            employee.save()
+        self.assertEqual(index.filters['employee_id'].count, 1)
+
+    def test_database_answers_until_the_index_is_built(self):
+        employee = _create(1)[0]
+        self.assertIsNone(uniqueness.get_index())
+        uniqueness.start_build.assert_called_once_with('default')
+        self.assertEqual(uniqueness.taken_fields({'employee_id': employee.employee_id}), {'employee_id'})
+        self.assertEqual(uniqueness.existing_values([employee.employee_id], []), ({employee.employee_id}, {employee.email}))
+
+    def test_values_saved_during_a_build_are_kept(self):
+        uniqueness._begin_build('default')
+        employee = _create(1)[0]
+        employee.employee_id = 'SAVED-DURING-BUILD'
+        employee.save()
+        with mock.patch.object(uniqueness, '_build', return_value=uniqueness.UniquenessIndex(10)):
+            index = uniqueness._finish_build('default')
+        self.assertTrue(index.might_exist('employee_id', 'SAVED-DURING-BUILD'))
+        self.assertIs(uniqueness.get_index(), index)
+
+    def test_availability_endpoint(self):
+        employee = _create(1)[0]
+        for employee_id, available in [(employee.employee_id, False), ('FREE-1', True)]:
+            response = Client().get('/employee-id-available/', {'employee_id': employee_id})
+            self.assertEqual(response.json()['available'], available)
+
+
+class AuditTests(EmployeeTestCase):
+    """Bulk edits and deletes are logged per chunk with the old values of every employee"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_superuser('auditor', 'auditor@example.com', 'password')
+        self.employees = _create(5, department='Finance')
+
+    def test_bulk_edit(self):
+        unchanged = self.employees[0]
+        bulk.update_employees(Employee.objects.filter(pk=unchanged.pk), {'department': 'Audit'})
+        with audit.acting_as(self.user):
+            bulk.update_employees(Employee.objects.all(), {'department': 'Audit'}, chunk_size=3)
+
+        events = list(AuditEvent.objects.order_by('id'))[1:]
+        self.assertEqual([event.employee_count for event in events], [2, 2])
+        event = events[0]
+        self.assertEqual((event.action, event.actor), ('update', self.user))
+        self.assertEqual(event.changes['set'], {'department': 'Audit'})
+        self.assertEqual(event.changes_for(self.employees[1].pk), [('department', 'Finance', 'Audit')])
+        # Employees already in the department are left out
+        self.assertEqual(len(audit.history(unchanged.pk)), 1)
+
+    def test_bulk_delete(self):
+        target = self.employees[2]
+        with audit.acting_as(self.user):
+            bulk.delete_employees(Employee.objects.all(), chunk_size=2)
+        event = audit.history(target.pk)[0]
+        self.assertEqual((event.action, event.actor, event.employee_count), ('delete', self.user, 2))
+        old = dict((field, old) for field, old, _ in event.changes_for(target.pk))
+        self.assertEqual(old['employee_id'], target.employee_id)
+        self.assertEqual(old['department'], 'Finance')
+        self.assertEqual(AuditEvent.objects.aggregate(total=Sum('employee_count'))['total'], 5)
+
+    def test_events_are_append_only(self):
+        with audit.acting_as(self.user):
+            bulk.delete_employees(Employee.objects.all())
+        with self.assertRaises(DatabaseError):
+            AuditEvent.objects.update(action='update')
+
+
+class ApiTests(EmployeeTestCase):
+    """List and detail responses answer If-None-Match and If-Modified-Since with 304"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.superuser_client()
+        self.employees = _create(3)
+
+    def test_list_etag(self):
+        response = self.client.get('/api/employees/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 3)
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/employees/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Employee.objects.filter(pk=self.employees[0].pk).update(updated_at=timezone.now() + timedelta(seconds=1))
+        response = self.client.get('/api/employees/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_last_modified(self):
+        last_modified = self.client.get('/api/employees/')['Last-Modified']
+        self.assertEqual(self.client.get('/api/employees/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        self.employees[1].delete()
+        EmployeeTombstone.objects.update(deleted_at=timezone.now() + timedelta(seconds=1))
+        self.assertEqual(self.client.get('/api/employees/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_detail_etag(self):
+        url = f'/api/employees/{self.employees[0].pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # A write based on a stale tag is refused
+        response = self.client.patch(url, json.dumps({'first_name': 'Ada'}), content_type='application/json',
+                                     HTTP_IF_MATCH='"stale"')
+        self.assertEqual(response.status_code, 412)
+
+    def test_token_auth(self):
+        key = api.create_token(User.objects.get(username='admin'), 'sync')
+        client = Client(enforce_csrf_checks=True)
+        self.assertEqual(client.get('/api/employees/').status_code, 401)
+        self.assertEqual(client.get('/api/employees/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        response = client.patch(f'/api/employees/{self.employees[0].pk}/', json.dumps({'first_name': 'Ada'}),
+                                content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {key}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(audit.history(self.employees[0].pk)[0].actor.username, 'admin')
+
+
+class DeltaExportTests(EmployeeTestCase):
+    """Delta exports report deletes from tombstones, which outlive the audit log"""
+
+    def test_upserts_and_deletes_since_watermark(self):
+        kept, edited, deleted, bulk_deleted = _create(4)
+        deleted_pk = deleted.pk
+        since = timezone.now()
+        edited.first_name = 'Changed'
+        edited.save()
+        deleted.delete()
+        bulk.delete_employees(Employee.objects.filter(pk=bulk_deleted.pk))
+
+        with tempfile.TemporaryDirectory() as directory:
+            audit.archive_before(timezone.now() + timedelta(days=1), directory)
+        self.assertFalse(AuditEvent.objects.exists())
+
+        lines = [json.loads(line) for line in exports.stream_delta(since, 'jsonl') if line]
+        self.assertEqual(
+            [(line['op'], line['id']) for line in lines],
+            [('upsert', edited.pk), ('delete', deleted_pk), ('delete', bulk_deleted.pk)],
+        )
+        self.assertEqual(lines[0]['first_name'], 'Changed')
+        self.assertEqual(lines[2]['employee_id'], bulk_deleted.employee_id)
+
+
+class WarmUpTests(EmployeeTestCase):
+    """A forked worker opens its own connections and leaves the inherited ones alone"""
+
+    def test_forget_connections_keeps_the_handles(self):
+        results = []
+
+        def forget():
+            # A fresh thread has connections of its own to forget
+            connection = connections['default']
+            connection.ensure_connection()
+            handle = connection.connection
+            warmup.forget_connections()
+            results.append((connection.connection, handle in warmup._inherited_handles))
+            # Still open: nothing closed it on the parent's behalf
+            results.append(handle.execute('SELECT 1').fetchone())
+            warmup._inherited_handles.remove(handle)
+            handle.close()
+
+        thread = threading.Thread(target=forget)
+        thread.start()
+        thread.join()
+        self.assertEqual(results, [(None, True), (1,)])
+
+
+class ReportTests(EmployeeTestCase):
+    """Reports hold one file per department or state, split into parts past PART_ROWS"""
+
+    def setUp(self):
+        super().setUp()
+        self.use_temporary_media()
+        _create(5, department='Finance')
+        _create(3, start=5, department='Legal')
+        self.path = Path(settings.MEDIA_ROOT) / 'report.zip'
+
+    def test_plan_splits_large_shards(self):
+        files = reports.plan_files(Employee.objects.all(), 'department', part_rows=2)
+        self.assertEqual(
+            [(file['name'], file['rows']) for file in files][:3],
+            [('Finance (part 1 of 3)', 2), ('Finance (part 2 of 3)', 2), ('Legal (part 1 of 2)', 2)],
+        )
+        self.assertEqual(sum(file['rows'] for file in files), 8)
+
+    def test_xlsx_report(self):
+        from openpyxl import load_workbook
+
+        progress = mock.Mock()
+        # In-process; worker processes would not see the test's transaction
+        self.assertEqual(reports.generate(self.path, 'xlsx', 'department', workers=1, progress=progress), (2, 8))
+        progress.assert_called_with(8, 8)
+        with zipfile.ZipFile(self.path) as archive:
+            self.assertEqual(sorted(archive.namelist()), ['Finance.xlsx', 'Legal.xlsx'])
+            workbook = load_workbook(io.BytesIO(archive.read('Finance.xlsx')), read_only=True)
+            self.assertEqual(workbook.sheetnames, ['Finance'])
+            self.assertEqual(len(list(workbook['Finance'].values)), 6)
+
+    def test_pdf_report_in_parts(self):
+        count = reports.generate(self.path, 'pdf', 'department', {'department': 'Finance'}, workers=1, part_rows=3)
+        self.assertEqual(count, (2, 5))
+        with zipfile.ZipFile(self.path) as archive:
+            self.assertEqual(sorted(archive.namelist()), ['Finance (part 1 of 2).pdf', 'Finance (part 2 of 2).pdf'])
+            self.assertTrue(archive.read('Finance (part 1 of 2).pdf').startswith(b'%PDF'))
+
+    def test_unknown_options(self):
+        with self.assertRaises(ValueError):
+            reports.generate(self.path, 'csv', 'department')
+        with self.assertRaises(ValueError):
+            reports.generate(self.path, 'pdf', 'role')
+
+
+class StaticMediaTests(EmployeeTestCase):
+    """Static and public media files are served with validators, ranges and precompressed copies"""
+
+    def setUp(self):
+        super().setUp()
+        # Nothing collected: static files come from the app directories
+        self.static_root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(override_settings(STATIC_ROOT=self.static_root))
+        self.media_root = Path(self.use_temporary_media())
+        self.source = Path(settings.BASE_DIR) / 'employees' / 'static' / 'json' / 'full.json'
+        self.client = Client()
+
+    def test_uncollected_static_file(self):
+        response = self.client.get('/static/json/full.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.source.read_bytes())
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.STATIC_MAX_AGE}')
+        self.assertEqual(self.client.get('/static/json/full.json', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_ranges(self):
+        response = self.client.get('/static/json/full.json', HTTP_RANGE='bytes=2-11')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 2-11/{self.source.stat().st_size}')
+        self.assertEqual(b''.join(response.streaming_content), self.source.read_bytes()[2:12])
+
+        response = self.client.get('/static/json/full.json', HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), self.source.read_bytes()[-5:])
+        self.assertEqual(self.client.get('/static/json/full.json', HTTP_RANGE='bytes=999999999-').status_code, 416)
+        # A range of a changed file is answered with the whole file
+        response = self.client.get('/static/json/full.json', HTTP_RANGE='bytes=2-11', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_precompressed_copy(self):
+        path = self.static_root / 'app.css'
+        path.write_text('body { color: black; }\n' * 100)
+        self.assertEqual(assets.compress_file(str(path))[0], f'{path}.gz')
+
+        response = self.client.get('/static/app.css', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), path.read_bytes())
+        self.assertIn('Accept-Encoding', response['Vary'])
+        # Ranges are of the file itself
+        response = self.client.get('/static/app.css', HTTP_ACCEPT_ENCODING='gzip', HTTP_RANGE='bytes=0-3')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), b'body')
+
+    def test_public_media_only(self):
+        for directory in ['profile_pictures', 'private']:
+            (self.media_root / directory).mkdir()
+            (self.media_root / directory / 'picture.jpg').write_bytes(b'jpeg')
+        response = self.client.get('/media/profile_pictures/picture.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.MEDIA_MAX_AGE}')
+        self.assertEqual(self.client.get('/media/private/picture.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/media/profile_pictures/../private/picture.jpg').status_code, 404)
+
+
+class ColumnarSnapshotTests(EmployeeTestCase):
+    """The snapshot counts what the table holds and is refreshed from its watermark"""
+
+    def setUp(self):
+        super().setUp()
+        self.path = Path(self.enterContext(tempfile.TemporaryDirectory())) / 'employees.columns'
+        self.enterContext(override_settings(COLUMNAR_SNAPSHOT_PATH=self.path))
+        self.finance = _create(3, department='Finance', gender='Female')
+        self.legal = _create(2, start=3, department='Legal', gender='Male')
+
+    def test_counts_and_selections(self):
+        self.assertEqual(columnar.refresh(), (5, 5, 0, False))
+        snapshot = columnar.current_snapshot()
+        self.assertEqual(snapshot.counts(['department']), {('Finance',): 3, ('Legal',): 2})
+        mask = snapshot.select({'department': 'finance', 'gender': ['Female', 'Other']})
+        self.assertEqual(snapshot.count(mask), 3)
+        self.assertEqual(snapshot.count(snapshot.select({'department': 'Legal', 'gender': 'Female'})), 0)
+        self.assertEqual(sum(count for _, count in snapshot.hiring_cohorts(mask, 'year')), 3)
+        with self.assertRaises(ValueError):
+            snapshot.select({'email': 'x'})
+
+    def test_incremental_refresh(self):
+        columnar.refresh()
+        snapshot = columnar.current_snapshot()
+        self.assertFalse(columnar.changed_since(snapshot.watermark))
+
+        self.legal[0].delete()
+        bulk.update_employees(Employee.objects.filter(pk=self.finance[0].pk), {'department': 'Legal'})
+        self.assertTrue(columnar.changed_since(snapshot.watermark))
+        total, _, deleted, incremental = columnar.refresh()
+        self.assertEqual((total, deleted, incremental), (4, 1, True))
+        self.assertEqual(columnar.current_snapshot().counts(['department']), {('Finance',): 2, ('Legal',): 2})
+
+    def test_dashboard_uses_a_current_snapshot_only(self):
+        columnar.refresh()
+        with mock.patch.object(stats, '_snapshot_aggregates', wraps=stats._snapshot_aggregates) as scanned:
+            from_snapshot = stats._compute_dashboard_stats({})
+            self.assertEqual(scanned.call_count, 1)
+            Employee.objects.filter(pk=self.legal[0].pk).update(updated_at=timezone.now() + timedelta(seconds=1))
+            from_rollups = stats._compute_dashboard_stats({})
+            self.assertEqual(scanned.call_count, 1)
+        self.assertEqual(from_snapshot['total_employees'], 5)
+        self.assertEqual(from_snapshot['departments'], from_rollups['departments'])
+        self.assertEqual(from_snapshot['genders'], from_rollups['genders'])
@@ -0,0 +1,207 @@
+"""
+In-process index of taken employee IDs and emails.
+
+Each database alias gets a pair of Bloom filters, built from one pass over
+the table and kept current by the post_save signal and bulk imports. A
+filter never misses a value it was given, so "not in the filter" means the
+value is free without asking the database; "maybe" is settled by a single
+query covering every field at once.
+
+The pass runs in a background thread, started by employees/warmup.py or
+by the first check that needs the index; until it finishes, checks query
+the database directly. Values saved while it runs are added once it is
+done.
+
+Rows written by other processes are not in this process's filters. The
+unique constraints stay the final check, so callers must still handle
+IntegrityError on save.
+"""
+import hashlib
+import math
+import threading
+
+from django.db import connections
+from django.db.models import Q
+
+from .models import Employee
+
+FIELDS = ('employee_id', 'email')
+
+# False positive rate the filters are sized for
+ERROR_RATE = 0.01
+
+# Filters are sized for twice the rows present when built (at least this
+# many) and rebuilt once that many new values have been added
+MIN_CAPACITY = 10_000
+
+
+class BloomFilter:
+    """Set membership with no false negatives and about `error_rate` false positives"""
+
+    def __init__(self, capacity, error_rate=ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        """Add a value; only one that sets a new bit counts toward capacity, so re-adding is free"""
+        added = False
+        for position in self._positions(value):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        self.count += added
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class UniquenessIndex:
+    """Bloom filters of the employee IDs and emails stored on one database"""
+
+    def __init__(self, capacity):
+        self.filters = {field: BloomFilter(capacity) for field in FIELDS}
+
+    def add(self, employee_id, email):
+        self.filters['employee_id'].add(employee_id)
+        self.filters['email'].add(email)
+
+    def might_exist(self, field, value):
+        return value in self.filters[field]
+
+    @property
+    def full(self):
+        employee_ids = self.filters['employee_id']
+        return employee_ids.count > employee_ids.capacity
+
+
+_indexes = {}
+# Values saved while an alias's index is being built: {using: [(employee_id, email), ...]}
+_pending = {}
+_lock = threading.Lock()
+
+
+def _build(using):
+    total = Employee.objects.using(using).count()
+    index = UniquenessIndex(max(MIN_CAPACITY, 2 * total))
+    rows = Employee.objects.using(using).order_by().values_list('employee_id', 'email')
+    for employee_id, email in rows.iterator(chunk_size=10_000):
+        index.add(employee_id, email)
+    return index
+
+
+def _begin_build(using):
+    """Claim the build of an alias's index; False if one is already running"""
+    with _lock:
+        if using in _pending:
+            return False
+        _pending[using] = []
+        return True
+
+
+def _finish_build(using):
+    try:
+        index = _build(using)
+    except BaseException:
+        with _lock:
+            del _pending[using]
+        raise
+    with _lock:
+        for employee_id, email in _pending.pop(using):
+            index.add(employee_id, email)
+        _indexes[using] = index
+    return index
+
+
+def build_index(using='default'):
+    """Build and install the index of a database in this thread; None if another build is running"""
+    if _begin_build(using):
+        return _finish_build(using)
+    return None
+
+
+def _build_in_background(using):
+    try:
+        _finish_build(using)
+    finally:
+        # This thread's own connections; request threads have theirs
+        connections.close_all()
+
+
+def start_build(using='default'):
+    """Build the index of a database in a background thread, unless a build is running"""
+    if _begin_build(using):
+        threading.Thread(target=_build_in_background, args=[using], name='uniqueness-index', daemon=True).start()
+
+
+def get_index(using='default'):
+    """
+    The uniqueness index of a database, or None until its first build is
+    done. A full index stays in use while its replacement is built.
+    """
+    index = _indexes.get(using)
+    if index is None or index.full:
+        start_build(using)
+    return index
+
+
+def remember(employee_id, email, using='default'):
+    """Record a saved employee's ID and email; a no-op while no index is built or building"""
+    with _lock:
+        index = _indexes.get(using)
+        if index is not None:
+            index.add(employee_id, email)
+        if using in _pending:
+            _pending[using].append((employee_id, email))
+
+
+def taken_fields(values, exclude=None, using='default'):
+    """
+    The fields of `values` ({'employee_id': ..., 'email': ...}) already used
+    by another employee (other than the one with pk `exclude`).
+    """
+    index = get_index(using)
+    maybe = {
+        field: value for field, value in values.items()
+        if value and (index is None or index.might_exist(field, value))
+    }
+    if not maybe:
+        return set()
+
+    condition = Q()
+    for field, value in maybe.items():
+        condition |= Q(**{field: value})
+    employees = Employee.objects.using(using).filter(condition)
+    if exclude is not None:
+        employees = employees.exclude(pk=exclude)
+    taken = set()
+    for row in employees.values(*maybe):
+        taken.update(field for field, value in maybe.items() if row[field] == value)
+    return taken
+
+
+def existing_values(employee_ids, emails, using='default'):
+    """(taken IDs, taken emails) among the given ones, querying only for those the index cannot rule out"""
+    index = get_index(using)
+    if index is not None:
+        employee_ids = [value for value in employee_ids if index.might_exist('employee_id', value)]
+        emails = [value for value in emails if index.might_exist('email', value)]
+    taken_ids = set()
+    taken_emails = set()
+    if employee_ids or emails:
+        for employee_id, email in Employee.objects.using(using).filter(
+            Q(employee_id__in=employee_ids) | Q(email__in=emails)
+        ).values_list('employee_id', 'email'):
+            taken_ids.add(employee_id)
+            taken_emails.add(email)
+    return taken_ids, taken_emails
@@ -12,7 +12,24 @@ urlpatterns = [
     path('employee/delete/<int:employee_id>/', views.delete_employee, name='delete_employee'),
     path('access-denied/', views.access_denied, name='access_denied'),
     path('logout/', views.custom_logout, name='logout'),
+    path('search/autocomplete/', views.search_autocomplete, name='search_autocomplete'),
     path('export/csv/', views.export_employees_csv, name='export_employees_csv'),
+    path('export/delta/', views.export_employees_delta, name='export_employees_delta'),
+    path('export/reports/', views.export_reports, name='export_reports'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('bulk-delete/', views.bulk_delete_employees, name='bulk_delete_employees'),
+    path('bulk-edit/', views.bulk_edit_employees, name='bulk_edit_employees'),
+    path('import/', views.import_employees_file, name='import_employees_file'),
+    path('metrics/', views.performance_metrics, name='performance_metrics'),
+    path('employee-id-available/', views.employee_id_available, name='employee_id_available'),
+    path('locations/', views.location_states, name='location_states'),
+    path('locations/<str:state>/lgas/', views.location_lgas, name='location_lgas'),
+    path('locations/<str:state>/<path:lga>/wards/', views.location_wards, name='location_wards'),
+    path('api/employees/', views.api_employees, name='api_employees'),
+    path('api/employees/<int:employee_id>/', views.api_employee, name='api_employee'),
+    path('api/analytics/', views.api_analytics, name='api_analytics'),
+    path('jobs/', views.job_list, name='job_list'),
+    path('audit/', views.audit_log, name='audit_log'),
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/download/', views.job_download, name='job_download'),
 ]
\ No newline at end of file
@@ -1,14 +1,53 @@
-from .models import Employee
+from . import api, audit, bulk, columnar, fragments, jobs, lookups, metrics, uniqueness
+from .models import Employee, Job
+from .exports import DELTA_FORMATS, astream_delta, astream_employees_csv, last_change, stream_delta, stream_employees_csv
+from .filters import filter_employees, parse_date_range, search_employees
+from .imports import import_employees, read_rows
+from .locations import LocationError, get_index as get_locations
+from .pagination import aestimated_count, akeyset_paginate
+from .reports import REPORT_FORMATS, SHARD_FIELDS
+from .routers import reads_from_replica
+from .search import ranked_search
+from .stats import adepartment_choices, aget_dashboard_stats
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+from pathlib import Path
+from asgiref.sync import iscoroutinefunction, sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.forms import AuthenticationForm
+from django.core.cache import cache
 from django.core.paginator import Paginator
-import csv
-from django.http import HttpResponse
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, QueryDict, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
-from django.db.models import Count
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.middleware.csrf import CsrfViewMiddleware
+from django.views.decorators.cache import cache_control, never_cache
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import etag, require_http_methods
+
+# Bulk deletes and edits larger than this are handed to the background job worker
+BACKGROUND_BULK_THRESHOLD = 500
+
+# Browser cache lifetime of the location lookup endpoints
+LOCATION_CACHE_SECONDS = 60 * 60 * 24
+
+# Employee ID checks one client address may make per minute on the public form
+# (counted in the default cache, so per process unless that cache is shared)
+EMPLOYEE_ID_CHECKS_PER_MINUTE = 30
+
+def _form_choices():
+    """Department and role dropdown options of the employee forms"""
+    return {'department_choices': lookups.choices('department'), 'role_choices': lookups.choices('role')}
 
 def employee_form(request):
     if request.method == 'POST':
@@ -22,25 +61,47 @@ def employee_form(request):
             # Basic validation
             if not first_name:
                 messages.error(request, "First name is required.")
-                return render(request, 'employees/form.html')
+                return render(request, 'employees/form.html', _form_choices())
             
             if not surname:
                 messages.error(request, "Surname is required.")
-                return render(request, 'employees/form.html')
+                return render(request, 'employees/form.html', _form_choices())
             
             if not employee_id:
                 messages.error(request, "Employee ID is required.")
-                return render(request, 'employees/form.html')
+                return render(request, 'employees/form.html', _form_choices())
             
-            # Check for duplicate employee ID
-            if Employee.objects.filter(employee_id=employee_id).exists():
-                messages.error(request, f"Employee ID '{employee_id}' already exists.")
-                return render(request, 'employees/form.html')
+            # Validate the location against the state/LGA/ward hierarchy
+            try:
+                state, lga, ward = get_locations().clean(
+                    request.POST.get('state'), request.POST.get('lga'), request.POST.get('ward')
+                )
+            except LocationError as e:
+                messages.error(request, str(e))
+                return render(request, 'employees/form.html', _form_choices())
             
-            # Check for duplicate email
-            if Employee.objects.filter(email=email).exists():
+            # Department, role and location are stored as lookup table ids; only
+            # names offered by the form are accepted here, admins add new ones
+            try:
+                lookup_ids = lookups.lookup_ids({
+                    'department': request.POST.get('department', '').strip(),
+                    'role': request.POST.get('role'),
+                    'state': state,
+                    'lga': lga,
+                    'ward': ward,
+                })
+            except lookups.UnknownLookupError as e:
+                messages.error(request, str(e))
+                return render(request, 'employees/form.html', _form_choices())
+            
+            # Check for duplicate employee ID and email (one query at most, see uniqueness.py)
+            taken = uniqueness.taken_fields({'employee_id': employee_id, 'email': email})
+            if 'employee_id' in taken:
+                messages.error(request, f"Employee ID '{employee_id}' already exists.")
+                return render(request, 'employees/form.html', _form_choices())
+            if 'email' in taken:
                 messages.error(request, f"Email '{email}' is already registered.")
-                return render(request, 'employees/form.html')
+                return render(request, 'employees/form.html', _form_choices())
             
             # Create and save employee
             employee = Employee(
@@ -50,26 +111,26 @@ def employee_form(request):
                 employee_id=employee_id,
                 email=email,
                 contact_number=request.POST.get('contactnumber', '').strip(),
-                department=request.POST.get('department', '').strip(),
                 date_of_birth=request.POST.get('dob'),
                 gender=request.POST.get('gender'),
                 address=request.POST.get('address', '').strip(),
-                state=request.POST.get('state'),
-                lga=request.POST.get('lga'),
-                ward=request.POST.get('ward'),
-                role=request.POST.get('role'),
-                profile_picture=request.FILES.get('profile_picture')
+                profile_picture=request.FILES.get('profile_picture'),
+                **lookup_ids,
             )
             
             employee.save()
             messages.success(request, f"Employee {first_name} {surname} added successfully!")
             return redirect('success_page')
-            
+
+        except IntegrityError:
+            # Saved by another process since this one's uniqueness index was built
+            messages.error(request, "That employee ID or email is already registered.")
+            return render(request, 'employees/form.html', _form_choices())
         except Exception as e:
             messages.error(request, f"Error saving employee: {str(e)}")
-            return render(request, 'employees/form.html')
+            return render(request, 'employees/form.html', _form_choices())
     
-    return render(request, 'employees/form.html')
+    return render(request, 'employees/form.html', _form_choices())
 
 def success_page(request):
     """Shows success message after form submission"""
@@ -108,6 +169,16 @@ def access_denied(request):
 
 def superuser_required(view_func):
     """Decorator that checks if user is superuser, else redirect to access denied"""
+    if iscoroutinefunction(view_func):
+        async def _async_wrapped_view(request, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_superuser:
+                return redirect('access_denied')
+            # Templates read request.user synchronously, which would query from the event loop
+            request.user = user
+            return await view_func(request, *args, **kwargs)
+        return _async_wrapped_view
+
     def _wrapped_view(request, *args, **kwargs):
         if not request.user.is_superuser:
             return redirect('access_denied')
@@ -124,10 +195,23 @@ def custom_logout(request):
 @login_required
 @superuser_required
 def edit_employee(request, employee_id):
-    employee = get_object_or_404(Employee, id=employee_id)
+    employee = get_object_or_404(Employee.objects.with_lookups(), id=employee_id)
     
     if request.method == 'POST':
         try:
+            # Only values that change need checking against other employees
+            changed = {
+                field: request.POST.get(name)
+                for field, name in (('employee_id', 'employeeid'), ('email', 'email'))
+                if request.POST.get(name) != getattr(employee, field)
+            }
+            taken = uniqueness.taken_fields(changed, exclude=employee.pk)
+            if taken:
+                for field in sorted(taken):
+                    label = 'Employee ID' if field == 'employee_id' else 'Email'
+                    messages.error(request, f"{label} '{changed[field]}' is already used by another employee.")
+                return render(request, 'employees/edit_form.html', {'employee': employee, **_form_choices()})
+
             # Update all fields
             employee.first_name = request.POST.get('firstname')
             employee.surname = request.POST.get('surname')
@@ -135,28 +219,36 @@ def edit_employee(request, employee_id):
             employee.employee_id = request.POST.get('employeeid')
             employee.email = request.POST.get('email')
             employee.contact_number = request.POST.get('contactnumber')
-            employee.department = request.POST.get('department')
             employee.date_of_birth = request.POST.get('dob')
             employee.gender = request.POST.get('gender')
             employee.address = request.POST.get('address')
-            employee.state = request.POST.get('state')
-            employee.lga = request.POST.get('lga')
-            employee.ward = request.POST.get('ward')
-            employee.role = request.POST.get('role')
+            state, lga, ward = get_locations().clean(
+                request.POST.get('state'), request.POST.get('lga'), request.POST.get('ward')
+            )
+            for field, pk in lookups.lookup_ids({
+                'department': request.POST.get('department'),
+                'role': request.POST.get('role'),
+                'state': state,
+                'lga': lga,
+                'ward': ward,
+            }, create=True).items():
+                setattr(employee, field, pk)
             
             employee.save()
             messages.success(request, 'Employee updated successfully!')
             return redirect('view_records')
-            
+
+        except IntegrityError:
+            messages.error(request, "That employee ID or email is already used by another employee.")
         except Exception as e:
             messages.error(request, f'Error updating employee: {str(e)}')
     
-    return render(request, 'employees/edit_form.html', {'employee': employee})
+    return render(request, 'employees/edit_form.html', {'employee': employee, **_form_choices()})
 
 @login_required
 @superuser_required
 def delete_employee(request, employee_id):
-    employee = get_object_or_404(Employee, id=employee_id)
+    employee = get_object_or_404(Employee.objects.select_related('department', 'role'), id=employee_id)
     
     if request.method == 'POST':
         try:
@@ -173,156 +265,612 @@ def delete_employee(request, employee_id):
 
 @login_required
 @superuser_required
-def view_employee(request, employee_id):
-    """View individual employee details"""
-    employee = get_object_or_404(Employee, id=employee_id)
-    return render(request, 'employees/view_employee.html', {'employee': employee})
+async def view_employee(request, employee_id):
+    """View individual employee details, rendered from the fragment cache when possible"""
+    detail = await fragments.acached_detail(employee_id)
+    if detail is None:
+        try:
+            employee = await Employee.objects.with_lookups().aget(id=employee_id)
+        except Employee.DoesNotExist:
+            raise Http404("No Employee matches the given query.")
+        detail = await fragments.arender_detail(employee)
+    return render(request, 'employees/view_employee.html', {'employee_id': employee_id, 'detail': detail})
 
 @login_required
 @superuser_required
-def view_records(request):
-    """Displays all employee records with pagination"""
-    employees_list = Employee.objects.all().order_by('id')
-    
-    # Pagination - 10 records per page
-    paginator = Paginator(employees_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
+@reads_from_replica
+async def view_records(request):
+    """
+    Displays employee records with server-side search, filters and pagination.
+    Pages are keyset paginated by id, except searches (ordered by relevance)
+    and ?page= links, which use numbered pages; ?paging=keyset|offset picks one.
+    Neither runs an exact COUNT(*) past pagination.COUNT_CAP rows.
+    """
+    filters = {key: request.GET.get(key, '') for key in ('q', 'gender', 'department', 'role')}
+    paging = request.GET.get('paging') if request.GET.get('paging') in ('keyset', 'offset') else ''
+    keyset = paging == 'keyset' or not (paging or filters['q'] or request.GET.get('page'))
+
+    # Query string without paging parameters, used to build pagination links
+    query = request.GET.copy()
+    for key in ('page', 'after', 'before'):
+        query.pop(key, None)
+
     context = {
-        'page_obj': page_obj,
-        'records': page_obj,  # Keep for backward compatibility
+        'filters': filters,
+        'paging': paging,
+        'query_string': query.urlencode(),
+        'department_choices': await lookups.achoices('department'),
+        'role_choices': await lookups.achoices('role'),
     }
+
+    # Only id and updated_at are needed to find each row's cached fragment
+    employees = Employee.objects.for_fragment_keys()
+
+    if keyset:
+        # The search box looks terms up in the FTS index while the queryset is built
+        employees_list = await sync_to_async(search_employees)(employees, request.GET)
+        # Keyset mode - cursor on id, no OFFSET and no exact COUNT(*)
+        page_obj = await akeyset_paginate(
+            employees_list,
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+            per_page=10,
+        )
+        total_count, count_exact = await aestimated_count(employees_list, filtered=any(filters.values()))
+        context.update({
+            'keyset': True,
+            'page_obj': page_obj,
+            'records': page_obj.object_list,
+            'total_count': total_count,
+            'count_exact': count_exact,
+        })
+    else:
+        # Search results are ordered by relevance, everything else by id
+        employees_list = await sync_to_async(search_employees)(employees, request.GET, ranked=True)
+        if not filters['q']:
+            employees_list = employees_list.order_by('id')
+
+        # Pagination - 10 records per page. Paginator counts and slices
+        # synchronously, so the count and the page rows are loaded here.
+        # The count stops at COUNT_CAP rows, which also bounds the OFFSET
+        paginator = Paginator(employees_list, 10)
+        paginator.count, count_exact = await aestimated_count(employees_list)
+        page_obj = paginator.get_page(request.GET.get('page'))
+        page_obj.object_list = [employee async for employee in page_obj.object_list]
+        context.update({
+            'keyset': False,
+            'page_obj': page_obj,
+            'records': page_obj,  # Keep for backward compatibility
+            'total_count': paginator.count,
+            'count_exact': count_exact,
+        })
+
+    context['rows'] = await fragments.arecord_rows(page_obj.object_list, using=employees_list.db)
     return render(request, 'employees/records.html', context)
 
 @login_required
 @superuser_required
-def export_employees_csv(request):
-    """Export employees to CSV"""
-    response = HttpResponse(content_type='text/csv')
+@reads_from_replica
+def search_autocomplete(request):
+    """JSON autocomplete for the employee search box, best matches first"""
+    query = request.GET.get('q', '').strip()
+    results = []
+    if query:
+        matches = ranked_search(Employee.objects.all(), query)
+        for employee in matches.values('id', 'employee_id', 'first_name', 'surname', 'department__name')[:10]:
+            results.append({
+                'id': employee['id'],
+                'employee_id': employee['employee_id'],
+                'name': f"{employee['first_name']} {employee['surname']}",
+                'department': employee['department__name'],
+            })
+    return JsonResponse({'results': results})
+
+@login_required
+@superuser_required
+@reads_from_replica
+async def export_employees_csv(request):
+    """Export employees to CSV, streamed in keyset batches (or queued with ?background=1)"""
+    if request.GET.get('background'):
+        params = {key: request.GET.get(key, '') for key in ('department', 'date_from', 'date_to')}
+        job = await sync_to_async(jobs.enqueue)('export_csv', params, user=request.user)
+        messages.success(request, f"Export queued as job #{job.pk}. The file will appear below when it is ready.")
+        return redirect('job_list')
+
+    # The department filter is looked up by name while the queryset is built
+    employees = await sync_to_async(filter_employees)(Employee.objects.all(), request.GET)
+    # Each server type streams its own kind of iterator without buffering the file
+    stream = astream_employees_csv if isinstance(request, ASGIRequest) else stream_employees_csv
+    response = StreamingHttpResponse(stream(employees), content_type='text/csv')
     response['Content-Disposition'] = f'attachment; filename="employees_{timezone.now().strftime("%Y%m%d_%H%M")}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Employee ID', 'First Name', 'Surname', 'Other Name', 'Email', 
-        'Contact Number', 'Department', 'Role', 'Gender', 'Date of Birth',
-        'Address', 'State', 'LGA', 'Ward', 'Date Created'
-    ])
-    
-    employees = Employee.objects.all().order_by('id')
-    for employee in employees:
-        writer.writerow([
-            employee.employee_id,
-            employee.first_name,
-            employee.surname,
-            employee.other_name or '',
-            employee.email,
-            employee.contact_number,
-            employee.department,
-            employee.role,
-            employee.gender,
-            employee.date_of_birth,
-            employee.address,
-            employee.state,
-            employee.lga,
-            employee.ward,
-            employee.created_at.strftime("%Y-%m-%d %H:%M")
-        ])
-    
     return response
+
 @login_required
 @superuser_required
-def dashboard(request):
+def export_reports(request):
+    """Queue XLSX or PDF reports of the filtered employees, one file per department or state (?format=, ?by=)"""
+    report_format = request.GET.get('format', 'xlsx')
+    by = request.GET.get('by', 'department')
+    if report_format not in REPORT_FORMATS or by not in SHARD_FIELDS:
+        messages.error(request, f"Reports are {' or '.join(REPORT_FORMATS)} files by {' or '.join(SHARD_FIELDS)}.")
+        return redirect('job_list')
+
+    params = {key: request.GET.get(key, '') for key in ('department', 'date_from', 'date_to')}
+    job = jobs.enqueue('reports', {**params, 'format': report_format, 'by': by}, user=request.user)
+    messages.success(request, f"Reports queued as job #{job.pk}. The ZIP will appear below when it is ready.")
+    return redirect('job_list')
+
+@login_required
+@superuser_required
+async def export_employees_delta(request):
+    """Employees created or updated since ?since=, then tombstones of deleted ones, as CSV or JSON Lines"""
+    # Read from 'default': a snapshot replica would miss changes made before the returned watermark
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in DELTA_FORMATS:
+        return JsonResponse({'error': f"Unknown format '{export_format}' (use {' or '.join(DELTA_FORMATS)})."}, status=400)
+    try:
+        since = api.parse_updated_since(request.GET.get('since'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if since is None:
+        return JsonResponse({'error': "Pass the watermark of the previous sync as ?since=."}, status=400)
+
+    # Taken before reading, so rows saved while the export streams come again next time
+    watermark = timezone.now()
+    stream = astream_delta if isinstance(request, ASGIRequest) else stream_delta
+    content_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(stream(since, export_format), content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="employees_delta_{watermark.strftime("%Y%m%d_%H%M%S")}.{export_format}"'
+    )
+    response['X-Watermark'] = watermark.isoformat()
+    return response
+
+@login_required
+@superuser_required
+@reads_from_replica
+async def dashboard(request):
     """Enhanced employee statistics dashboard with charts data"""
     # Handle filters
     department_filter = request.GET.get('department')
     date_from = request.GET.get('date_from')
     date_to = request.GET.get('date_to')
     
-    # Base queryset
-    employees_queryset = Employee.objects.all()
-    
-    # Apply filters
-    if department_filter:
-        employees_queryset = employees_queryset.filter(department=department_filter)
-    
-    if date_from:
-        employees_queryset = employees_queryset.filter(created_at__gte=date_from)
-    
-    if date_to:
-        employees_queryset = employees_queryset.filter(created_at__lte=date_to)
-    
-    # Calculate statistics based on filtered data
-    total_employees = employees_queryset.count()
-    
-    # Department data for bar chart
-    departments = employees_queryset.values('department').annotate(
-        count=Count('id')
-    ).filter(department__isnull=False).exclude(department='').order_by('-count')
-    
-    # Enhanced gender data for doughnut chart
-    gender_data = []
-    for choice in ['Male', 'Female', 'Other']:
-        count = employees_queryset.filter(gender=choice).count()
-        if count > 0:
-            percentage = round((count / total_employees) * 100, 1) if total_employees > 0 else 0
-            gender_data.append({
-                'gender': choice, 
-                'count': count,
-                'percentage': percentage
-            })
-    
-    # Role distribution for horizontal bar chart
-    roles = employees_queryset.values('role').annotate(
-        count=Count('id')
-    ).filter(role__isnull=False).exclude(role='').order_by('-count')[:8]  # Increased to 8 for better chart
-    
-    recent_employees = employees_queryset.select_related().order_by('-created_at')[:5]
-    
-    # Monthly hiring trend for line chart (last 6 months)
-    from django.db.models.functions import TruncMonth
-    from datetime import datetime, timedelta
-    
-    six_months_ago = timezone.now() - timedelta(days=180)
-    monthly_hires = employees_queryset.filter(
-        created_at__gte=six_months_ago
-    ).annotate(
-        month=TruncMonth('created_at')
-    ).values('month').annotate(
-        count=Count('id')
-    ).order_by('month')
-    
-    # Get unique departments for filter dropdown
-    department_choices = Employee.objects.values_list('department', flat=True).distinct()
-    
-    context = {
-        'total_employees': total_employees,
-        'departments': departments,
-        'genders': gender_data,
-        'roles': roles,
-        'recent_employees': recent_employees,
-        'monthly_hires': list(monthly_hires),
-        'department_choices': department_choices,
+    # All aggregates come from the cached single-pass stats engine
+    context = (await aget_dashboard_stats(request.GET)).copy()
+    context.update({
+        'department_choices': await adepartment_choices(),
         'applied_filters': {
             'department': department_filter,
             'date_from': date_from,
             'date_to': date_to,
         }
-    }
+    })
     return render(request, 'employees/dashboard.html', context)
 
+def _bulk_params(request):
+    """Selection of a bulk form: the checked ids, or every record matching the page filters"""
+    if request.POST.get('scope') == 'all':
+        return {'filters': QueryDict(request.POST.get('filters', '')).dict()}
+    return {'ids': request.POST.getlist('employee_ids')}
+
+def _records_redirect(request):
+    """Back to the records page with the filters the bulk form was submitted from"""
+    filters = request.POST.get('filters', '')
+    return redirect(f"{reverse('view_records')}?{filters}" if filters else 'view_records')
+
 @login_required
 @superuser_required
 def bulk_delete_employees(request):
-    """Bulk delete employees"""
+    """Bulk delete the selected employees (or all employees matching the filters)"""
     if request.method == 'POST':
-        employee_ids = request.POST.getlist('employee_ids')
-        if employee_ids:
-            employees = Employee.objects.filter(id__in=employee_ids)
-            count = employees.count()
-            employees.delete()
-            messages.success(request, f"Successfully deleted {count} employees.")
-        else:
+        params = _bulk_params(request)
+        employees = bulk.select_employees(params)
+        count = employees.count()
+        if not count:
             messages.error(request, "No employees selected for deletion.")
+        elif count > BACKGROUND_BULK_THRESHOLD:
+            # Large selections are deleted by the job worker
+            job = jobs.enqueue('bulk_delete', params, user=request.user)
+            messages.success(request, f"Deleting {count} employees in background job #{job.pk}.")
+            return redirect('job_list')
+        else:
+            deleted = bulk.delete_employees(employees)
+            messages.success(request, f"Successfully deleted {deleted} employees.")
     
-    return redirect('view_records')
+    return _records_redirect(request)
+
+@login_required
+@superuser_required
+def bulk_edit_employees(request):
+    """Reassign department, role or location of the selected employees (or all matching the filters)"""
+    if request.method == 'POST':
+        params = _bulk_params(request)
+        try:
+            changes = bulk.clean_changes({field: request.POST.get(field) for field in bulk.BULK_EDIT_FIELDS})
+        except ValueError as e:
+            messages.error(request, str(e))
+            return _records_redirect(request)
+
+        employees = bulk.select_employees(params)
+        count = employees.count()
+        if not count:
+            messages.error(request, "No employees selected for editing.")
+        elif count > BACKGROUND_BULK_THRESHOLD:
+            job = jobs.enqueue('bulk_update', {**params, 'changes': changes}, user=request.user)
+            messages.success(request, f"Updating {count} employees in background job #{job.pk}.")
+            return redirect('job_list')
+        else:
+            updated = bulk.update_employees(employees, changes)
+            messages.success(request, f"Successfully updated {updated} employees.")
+
+    return _records_redirect(request)
+
+@login_required
+@superuser_required
+def import_employees_file(request):
+    """Bulk import employees from an uploaded CSV or Excel file"""
+    result = None
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, "Choose a CSV or Excel file to import.")
+        elif request.POST.get('background'):
+            # Keep the upload under MEDIA_ROOT until the worker has imported it
+            name = default_storage.save(f'imports/{upload.name}', upload)
+            job = jobs.enqueue('import', {'file': name}, user=request.user)
+            messages.success(request, f"Import queued as job #{job.pk}.")
+            return redirect('job_list')
+        else:
+            try:
+                result = import_employees(read_rows(upload, upload.name))
+                if result.created:
+                    messages.success(request, f"Imported {result.created} employees.")
+                if result.errors:
+                    messages.error(request, f"{result.failed} rows were rejected.")
+            except Exception as e:
+                messages.error(request, f"Error importing file: {str(e)}")
+
+    return render(request, 'employees/import.html', {
+        'result': result,
+        'errors': result.errors[:200] if result else [],
+    })
+
+@login_required
+@superuser_required
+def job_list(request):
+    """Recent background jobs with their progress"""
+    recent_jobs = list(Job.objects.select_related('created_by')[:50])
+    return render(request, 'employees/jobs.html', {
+        'jobs': recent_jobs,
+        'has_active_jobs': any(job.status in ('queued', 'running') for job in recent_jobs),
+    })
+
+@login_required
+@superuser_required
+def audit_log(request):
+    """Change history of one employee (?employee=<pk>) or of the last hours (?hours=N)"""
+    employee_pk = request.GET.get('employee', '')
+    if employee_pk.isdigit():
+        employee_pk = int(employee_pk)
+        events = list(audit.history(employee_pk))
+        for event in events:
+            event.fields = event.changes_for(employee_pk)
+        return render(request, 'employees/audit_log.html', {
+            'events': events,
+            'employee': Employee.objects.filter(pk=employee_pk).only('first_name', 'surname').first(),
+            'employee_pk': employee_pk,
+        })
+
+    try:
+        hours = max(1, min(int(request.GET.get('hours', 1)), 24 * 31))
+    except ValueError:
+        hours = 1
+    events = list(audit.recent_events(timezone.now() - timedelta(hours=hours)))
+    for event in events:
+        event.fields = sorted(event.changes.get('set', {}))
+    return render(request, 'employees/audit_log.html', {'events': events, 'hours': hours})
+
+@login_required
+@superuser_required
+def job_status(request, job_id):
+    """JSON status of one background job, for polling"""
+    job = get_object_or_404(Job, id=job_id)
+    return JsonResponse({
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'total': job.total,
+        'percent': job.percent,
+        'message': job.message,
+        'download_url': reverse('job_download', args=[job.id]) if job.result_file else None,
+    })
+
+@login_required
+@superuser_required
+def job_download(request, job_id):
+    """Download the file produced by a finished export job"""
+    job = get_object_or_404(Job, id=job_id, status='done')
+    if not job.result_file:
+        raise Http404("This job did not produce a file.")
+    return FileResponse(job.result_file.open('rb'), as_attachment=True, filename=Path(job.result_file.name).name)
+
+@login_required
+@superuser_required
+def performance_metrics(request):
+    """Request metrics of this process in the Prometheus text format"""
+    return HttpResponse(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+def _locations_etag(request, *args, **kwargs):
+    # The hierarchy only changes on deploy, so its file hash identifies every response
+    return get_locations().version
+
+@etag(_locations_etag)
+@cache_control(public=True, max_age=LOCATION_CACHE_SECONDS)
+def location_states(request):
+    """JSON list of states"""
+    return JsonResponse({'states': get_locations().states()})
+
+@etag(_locations_etag)
+@cache_control(public=True, max_age=LOCATION_CACHE_SECONDS)
+def location_lgas(request, state):
+    """JSON list of the LGAs of one state"""
+    try:
+        return JsonResponse({'state': state, 'lgas': get_locations().lgas(state)})
+    except LocationError as e:
+        return JsonResponse({'error': str(e)}, status=404)
+
+@etag(_locations_etag)
+@cache_control(public=True, max_age=LOCATION_CACHE_SECONDS)
+def location_wards(request, state, lga):
+    """JSON list of the wards of one LGA"""
+    try:
+        return JsonResponse({'state': state, 'lga': lga, 'wards': get_locations().wards(state, lga)})
+    except LocationError as e:
+        return JsonResponse({'error': str(e)}, status=404)
+
+
+def _rate_limited(request, scope, limit, window=60):
+    """Count a request of the client address against `limit` per `window` seconds; True once over it"""
+    key = f"rate:{scope}:{request.META.get('REMOTE_ADDR', '')}:{int(time.time() // window)}"
+    cache.add(key, 0, window)
+    try:
+        return cache.incr(key) > limit
+    except ValueError:
+        # Expired between add() and incr()
+        return False
+
+@never_cache
+def employee_id_available(request):
+    """
+    JSON answer to "is this employee ID free?" for live validation on the
+    employee form. The form is public, so anonymous clients are rate limited
+    to keep them from enumerating IDs.
+    """
+    if not request.user.is_superuser and _rate_limited(request, 'employee_id', EMPLOYEE_ID_CHECKS_PER_MINUTE):
+        response = JsonResponse({'error': "Too many checks; try again in a minute."}, status=429)
+        response['Retry-After'] = '60'
+        return response
+    employee_id = request.GET.get('employee_id', '').strip()
+    if not employee_id:
+        return JsonResponse({'error': "Pass an employee_id."}, status=400)
+    available = 'employee_id' not in uniqueness.taken_fields({'employee_id': employee_id})
+    return JsonResponse({'employee_id': employee_id, 'available': available})
+
+
+class _CsrfCheck(CsrfViewMiddleware):
+    def _reject(self, request, reason):
+        return reason
+
+def _csrf_failure(request):
+    """Why a session request fails the CSRF check, or None if it passes"""
+    check = _CsrfCheck(lambda request: None)
+    check.process_request(request)
+    return check.process_view(request, None, (), {})
+
+def api_superuser_required(view_func):
+    """
+    superuser_required for JSON endpoints: 401/403 answers instead of redirects.
+    Clients send `Authorization: Bearer <API token>` or use a session, whose
+    writes still need a CSRF token.
+    """
+    @csrf_exempt
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        authorization = request.headers.get('Authorization')
+        if authorization:
+            scheme, _, key = authorization.partition(' ')
+            user = api.token_user(key.strip()) if scheme.lower() == 'bearer' and key.strip() else None
+            if user is None:
+                return JsonResponse({'error': "Invalid API token."}, status=401)
+            request.user = user
+        elif not request.user.is_authenticated:
+            return JsonResponse({'error': "Authentication required."}, status=401)
+        elif reason := _csrf_failure(request):
+            return JsonResponse({'error': f"CSRF verification failed: {reason}"}, status=403)
+        if not request.user.is_superuser:
+            return JsonResponse({'error': "Superuser access required."}, status=403)
+        # AuditActorMiddleware saw the request before a token replaced its user
+        with audit.acting_as(request.user):
+            return view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+def _json_body(request):
+    try:
+        return json.loads(request.body)
+    except ValueError:
+        return None
+
+def _tag(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Clients may keep the response but must revalidate it
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+def _conditional(request, build_response, etag, last_modified=None):
+    """Answer If-None-Match / If-Modified-Since with a 304, or build the response"""
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is None:
+        response = build_response()
+    return _tag(response, etag, last_modified)
+
+def _conflict(taken, values):
+    labels = {'employee_id': 'Employee ID', 'email': 'Email'}
+    return JsonResponse({'errors': [
+        f"{labels[field]} '{values[field]}' is already registered." for field in sorted(taken)
+    ]}, status=409)
+
+@reads_from_replica
+def _api_employee_list(request):
+    try:
+        fields = api.parse_fields(request.GET.get('fields'))
+        page = api.page(
+            api.employee_queryset(request.GET), fields,
+            after=request.GET.get('after'),
+            limit=api.parse_limit(request.GET.get('limit')),
+            updated_since=api.parse_updated_since(request.GET.get('updated_since')),
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    def build_response():
+        next_url = None
+        next_params = page.next_params()
+        if next_params:
+            query = request.GET.copy()
+            for key, value in next_params.items():
+                query[key] = value
+            next_url = f"{reverse('api_employees')}?{query.urlencode()}"
+        watermark = page.watermark
+        return JsonResponse({
+            'results': page.rows(),
+            'next': next_url,
+            'watermark': watermark.isoformat() if watermark else None,
+        })
+    return _conditional(request, build_response, page.etag, last_change())
+
+def _api_create_employee(request):
+    data, errors = api.clean_payload(_json_body(request))
+    if errors:
+        return JsonResponse({'errors': errors}, status=400)
+    taken = uniqueness.taken_fields({'employee_id': data['employee_id'], 'email': data['email']})
+    if taken:
+        return _conflict(taken, data)
+    try:
+        employee = Employee.objects.create(**api.model_values(data))
+    except IntegrityError:
+        return JsonResponse({'errors': ["That employee ID or email is already registered."]}, status=409)
+
+    row, etag, updated_at = api.get_row(employee.pk, api.API_FIELDS)
+    response = _tag(JsonResponse(row, status=201), etag, updated_at)
+    response['Location'] = reverse('api_employee', args=[employee.pk])
+    return response
+
+@api_superuser_required
+@require_http_methods(['GET', 'POST'])
+def api_employees(request):
+    """JSON list of employees (keyset paginated, ?fields=, ?updated_since=) or create one"""
+    if request.method == 'POST':
+        return _api_create_employee(request)
+    return _api_employee_list(request)
+
+@reads_from_replica
+def _api_employee_detail(request, employee_id):
+    try:
+        fields = api.parse_fields(request.GET.get('fields'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    found = api.get_row(employee_id, fields)
+    if found is None:
+        return JsonResponse({'error': "Employee not found."}, status=404)
+    row, etag, updated_at = found
+    return _conditional(request, lambda: JsonResponse(row), etag, updated_at)
+
+@api_superuser_required
+@require_http_methods(['GET', 'PATCH', 'DELETE'])
+def api_employee(request, employee_id):
+    """JSON detail of one employee; PATCH updates some fields, DELETE removes it"""
+    if request.method == 'GET':
+        return _api_employee_detail(request, employee_id)
+
+    employee = Employee.objects.filter(id=employee_id).first()
+    if employee is None:
+        return JsonResponse({'error': "Employee not found."}, status=404)
+    # If-Match / If-Unmodified-Since keep a client from overwriting a change it has not seen
+    precondition = get_conditional_response(
+        request, etag=api.row_etag(employee.pk, employee.updated_at),
+        last_modified=int(employee.updated_at.timestamp()),
+    )
+    if precondition is not None:
+        return precondition
+
+    if request.method == 'DELETE':
+        employee.delete()
+        return HttpResponse(status=204)
+
+    data, errors = api.clean_payload(_json_body(request), current=api.current_values(employee))
+    if errors:
+        return JsonResponse({'errors': errors}, status=400)
+    changed = {field: data[field] for field in ('employee_id', 'email') if data[field] != getattr(employee, field)}
+    taken = uniqueness.taken_fields(changed, exclude=employee.pk)
+    if taken:
+        return _conflict(taken, changed)
+    for field, value in api.model_values(data).items():
+        setattr(employee, field, value)
+    try:
+        employee.save()
+    except IntegrityError:
+        return JsonResponse({'errors': ["That employee ID or email is already used by another employee."]}, status=409)
+
+    row, etag, updated_at = api.get_row(employee.pk, api.API_FIELDS)
+    return _tag(JsonResponse(row), etag, updated_at)
+
+
+@require_http_methods(['GET'])
+@api_superuser_required
+def api_analytics(request):
+    """
+    Ad-hoc counts over the columnar snapshot: ?report=counts&by=department,gender,
+    ?report=ages&bucket=10 or ?report=cohorts&period=month, narrowed by any
+    category column (?state=Lagos) and date_from/date_to on the hire day
+    """
+    snapshot = columnar.current_snapshot()
+    if snapshot is None:
+        return JsonResponse({'error': "No columnar snapshot yet; run manage.py refresh_columnar_snapshot."}, status=503)
+
+    report = request.GET.get('report', 'counts')
+    date_from, date_to = parse_date_range(request.GET)
+    equals = {column: request.GET[column] for column in columnar.CATEGORY_COLUMNS if request.GET.get(column)}
+    mask = snapshot.select(equals, hired_from=date_from, hired_to=date_to)
+
+    try:
+        if report == 'counts':
+            by = [column.strip() for column in request.GET.get('by', 'department').split(',') if column.strip()]
+            counts = snapshot.counts(by, mask)
+            rows = [{**dict(zip(by, key)), 'count': count} for key, count in counts.most_common()]
+        elif report == 'ages':
+            bucket = request.GET.get('bucket', '10')
+            if not bucket.isdigit() or int(bucket) < 1:
+                raise ValueError("bucket must be a whole number of years")
+            bucket = int(bucket)
+            rows = [{'age': age, 'count': count} for age, count in snapshot.age_distribution(mask, bucket)]
+        elif report == 'cohorts':
+            period = request.GET.get('period', 'month')
+            if period not in columnar.PERIODS:
+                raise ValueError(f"period must be one of {', '.join(columnar.PERIODS)}")
+            rows = [{'period': start.isoformat(), 'count': count} for start, count in snapshot.hiring_cohorts(mask, period)]
+        else:
+            raise ValueError("report must be counts, ages or cohorts")
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'snapshot': {'watermark': snapshot.watermark.isoformat(), 'employees': snapshot.rows},
+        'matching': snapshot.count(mask),
+        'rows': rows,
+    })
@@ -0,0 +1,121 @@
+"""
+Preparation of a freshly started worker for its first request.
+
+Workers are recycled often, and a new one would otherwise load the
+URLconf and views, compile templates, connect to the database and fill
+its in-process caches while its first user waits. wsgi.py and asgi.py
+call warm_up() when WARM_UP_ON_START is set. The URLconf and the
+persistent database connections are set up in the importing thread, which
+is the one a threadless WSGI worker serves requests from. The rest runs
+in a background thread, so the worker starts accepting requests at once.
+
+Servers that import the application once and then fork workers (gunicorn
+--preload, uWSGI without lazy-apps) would hand every worker the same
+database handles. So a fork first waits for the background part to
+finish, and each forked worker then drops the inherited connections and
+opens its own; the primed caches are inherited as they are.
+
+`manage.py startup_profile` measures the difference.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import async_to_sync
+from django.db import connections
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+from . import locations, lookups, stats, uniqueness
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / 'templates'
+
+# Seconds each step took in this process
+timings = {}
+
+_thread = None
+_fork_hooks_registered = False
+
+# Database handles inherited over a fork, kept referenced so that garbage
+# collection never closes them on the parent's behalf
+_inherited_handles = []
+
+
+def _timed(name, step):
+    start = time.perf_counter()
+    step()
+    timings[name] = time.perf_counter() - start
+
+
+def open_connections():
+    """Connect the databases whose connections outlive a request (CONN_MAX_AGE > 0)"""
+    for alias in connections:
+        if connections[alias].settings_dict['CONN_MAX_AGE']:
+            connections[alias].ensure_connection()
+
+
+def forget_connections():
+    """Drop this thread's connections without closing them, e.g. handles inherited over a fork"""
+    for connection in connections.all(initialized_only=True):
+        if connection.connection is not None:
+            _inherited_handles.append(connection.connection)
+        # The next query reconnects
+        connection.connection = None
+
+
+def _after_fork_in_child():
+    forget_connections()
+    _timed('connections', open_connections)
+
+
+def load_urls():
+    """Import the URLconf, and with it every view module"""
+    get_resolver().url_patterns
+
+
+def compile_templates():
+    """Compile the app's templates into the cached template loader"""
+    for path in sorted(TEMPLATE_DIR.rglob('*.html')):
+        get_template(path.relative_to(TEMPLATE_DIR).as_posix())
+
+
+def prime_caches():
+    """Fill the per-process lookups, indexes and the unfiltered dashboard"""
+    locations.get_index()
+    lookups.preload()
+    for field in lookups.NAMED_FIELDS:
+        lookups.choices(field)
+    uniqueness.build_index()
+    async_to_sync(stats.aget_dashboard_stats)({})
+
+
+def _warm_up_in_background():
+    try:
+        _timed('templates', compile_templates)
+        _timed('caches', prime_caches)
+    finally:
+        # This thread's own connections; request threads have theirs
+        connections.close_all()
+
+
+def warm_up(background=True):
+    """Prepare this worker for its first request"""
+    global _thread, _fork_hooks_registered
+    if not _fork_hooks_registered:
+        os.register_at_fork(before=wait, after_in_child=_after_fork_in_child)
+        _fork_hooks_registered = True
+    _timed('connections', open_connections)
+    _timed('urls', load_urls)
+    if not background:
+        _timed('templates', compile_templates)
+        _timed('caches', prime_caches)
+        return
+    _thread = threading.Thread(target=_warm_up_in_background, name='warm-up', daemon=True)
+    _thread.start()
+
+
+def wait(timeout=None):
+    """Block until the background part of warm_up() is done"""
+    if _thread is not None:
+        _thread.join(timeout)